@@ -0,0 +1,154 @@
+'''
+/ai/llm/cache.py
+-> two-tier (memory LRU + on-disk SQLite) cache for deterministic model responses
+'''
+
+from collections import OrderedDict
+import threading
+import hashlib
+import sqlite3
+import time
+import re
+import os
+
+from utilities.metrics.setup import llmCacheLookups
+from utilities.tracing.setup import getLogger
+
+# ==================================================
+# global vars
+# ==================================================
+
+CACHE_DIR = os.path.dirname(os.path.abspath(__file__))
+DISK_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, 'llm_cache.db'))
+
+MEMORY_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", 2048))
+MEMORY_TTL = int(os.getenv("LLM_CACHE_MEMORY_TTL", 6 * 3600))
+DISK_TTL = int(os.getenv("LLM_CACHE_DISK_TTL", 30 * 24 * 3600))
+
+# seconds between deletions of expired disk rows (also done when the file is opened)
+PRUNE_INTERVAL = 3600
+
+log = getLogger('llm.cache')
+
+# ==================================================
+# key helpers
+# ==================================================
+
+def normalizePrompt(prompt):
+    """
+    Collapse whitespace so prompts differing only in spacing share one entry.
+    Case is kept: it can change the model's output (e.g. names in descriptions).
+    """
+    return re.sub(r'\s+', ' ', prompt).strip()
+
+def makeKey(*parts):
+    return hashlib.sha256('\x1f'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+# ==================================================
+# cache
+# ==================================================
+
+class ResponseCache:
+    """
+    LRU memory tier with TTL in front of a persistent SQLite tier.
+    Entries are grouped by namespace so several models can share one file.
+    The memory tier has its own lock: a memory hit never waits behind disk I/O.
+    """
+
+    def __init__(self, namespace, diskPath=DISK_PATH, maxEntries=MEMORY_MAX_ENTRIES,
+                 memoryTTL=MEMORY_TTL, diskTTL=DISK_TTL):
+        self.namespace = namespace
+        self.diskPath = diskPath
+        self.maxEntries = maxEntries
+        self.memoryTTL = memoryTTL
+        self.diskTTL = diskTTL
+
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+
+        # one shared connection, used under its own lock
+        self.disk = None
+        self.diskLock = threading.Lock()
+        self.lastPrune = 0.0
+
+    def getDisk(self):
+        """
+        Shared connection (call with diskLock held). Expired rows are pruned when it is opened.
+        """
+        if self.disk is None:
+            disk = sqlite3.connect(self.diskPath, check_same_thread=False, timeout=5)
+            disk.execute("PRAGMA journal_mode = WAL")
+            disk.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            disk.commit()
+            self.disk = disk
+            self.pruneDisk()
+        return self.disk
+
+    def pruneDisk(self):
+        """
+        Delete expired rows of every namespace (call with diskLock held).
+        """
+        now = time.time()
+        self.lastPrune = now
+        pruned = self.disk.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+        self.disk.commit()
+        if pruned:
+            log.info("LLM cache: pruned %d expired responses.", pruned)
+
+    def rememberInMemory(self, key, value):
+        with self.lock:
+            self.memory[key] = (time.time() + self.memoryTTL, value)
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.maxEntries:
+                self.memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry:
+                expiresAt, value = entry
+                if expiresAt > now:
+                    self.memory.move_to_end(key)
+                    llmCacheLookups.inc(namespace=self.namespace, result='memory')
+                    return value
+                del self.memory[key]
+
+        try:
+            with self.diskLock:
+                row = self.getDisk().execute(
+                    "SELECT value FROM responses WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (self.namespace, key, now)
+                ).fetchone()
+        except sqlite3.Error as e:
+            log.warning("LLM cache read error: %s", e)
+            row = None
+
+        if row:
+            llmCacheLookups.inc(namespace=self.namespace, result='disk')
+            self.rememberInMemory(key, row[0])
+            return row[0]
+
+        llmCacheLookups.inc(namespace=self.namespace, result='miss')
+        return None
+
+    def set(self, key, value):
+        self.rememberInMemory(key, value)
+
+        try:
+            with self.diskLock:
+                disk = self.getDisk()
+                disk.execute(
+                    "INSERT OR REPLACE INTO responses (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, value, time.time() + self.diskTTL)
+                )
+                disk.commit()
+                if time.time() - self.lastPrune > PRUNE_INTERVAL:
+                    self.pruneDisk()
+        except sqlite3.Error as e:
+            log.warning("LLM cache write error: %s", e)
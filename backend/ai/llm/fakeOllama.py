@@ -0,0 +1,332 @@
+'''
+/ai/llm/fakeOllama.py
+-> stand-in for the Ollama /api/generate endpoint: canned or rule-based outputs, with injected latency and failures
+
+usage (from /backend):
+    python -m ai.llm.fakeOllama --port 11435 --latency lognormal:600,0.5 --tokens-per-second 40 \
+        --error-rate 0.01 --timeout-rate 0.005 --parallel 4 --max-queue 32 --responses canned.json
+
+then point the backend at it with OLLAMA_URL=http://localhost:11435/api/generate
+(both the SQL model and the router model are served).
+
+canned responses file, by model and by user prompt (the text inside <PROMPT>, or the whole prompt):
+    {"sql-agent-lastro": {"fado e saudade": "DESC: ...\\nQUERY: SELECT ..."},
+     "context-router-lastro": {"do mesmo autor": "author-equal"}}
+prompts without a canned response are answered from rules.
+'''
+
+from datetime import datetime, timezone
+import threading
+import argparse
+import random
+import json
+import time
+import re
+
+from flask import Flask, Response, request, jsonify
+
+from ai.llm.setup import MODEL_NAME, MERGE_CONNECTORS, NOISE_WORDS
+from ai.llm.router import classifyContextualIntent, normalizeRouterPrompt
+from ai.llm.generateRouterModel import CUSTOM_MODEL_NAME as ROUTER_MODEL_NAME
+
+# ==================================================
+# global vars
+# ==================================================
+
+DEFAULT_PORT = 11435
+
+# words left out of the rule-based SQL (besides the connectors and noise words of the prompt formatter)
+RULE_STOPWORDS = MERGE_CONNECTORS | NOISE_WORDS | {
+    'a', 'o', 'as', 'os', 'um', 'uma', 'nos', 'nas', 'dos', 'das', 'para', 'por', 'sobre',
+    'quero', 'mostra-me', 'procura', 'video', 'videos', 'projeto', 'mais', 'ou',
+}
+
+tokenPattern = re.compile(r'\s*\S+')
+promptPattern = re.compile(r'<PROMPT>(.*?)</PROMPT>', re.S)
+previousPattern = re.compile(r'<PREV_SQL>(.*?)</PREV_SQL>', re.S)
+yearPattern = re.compile(r'^(19|20)\d{2}$')
+
+# ==================================================
+# latency distributions
+# ==================================================
+
+class Latency:
+    """
+    Delay in seconds drawn from a distribution given as 'kind:args' (milliseconds):
+    'constant:200', 'uniform:100,900', 'normal:400,80', 'lognormal:400,0.6' (median, sigma).
+    """
+
+    def __init__(self, spec):
+        kind, _, args = spec.partition(':')
+        self.kind = kind
+        self.args = [float(arg) for arg in args.split(',') if arg]
+
+        expected = {'constant': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+        if expected.get(kind) != len(self.args):
+            raise ValueError(f"invalid latency '{spec}'")
+
+    def sample(self, rnd):
+        if self.kind == 'constant':
+            ms = self.args[0]
+        elif self.kind == 'uniform':
+            ms = rnd.uniform(*self.args)
+        elif self.kind == 'normal':
+            ms = rnd.gauss(*self.args)
+        else:
+            median, sigma = self.args
+            ms = median * rnd.lognormvariate(0, sigma)
+        return max(ms, 0.0) / 1000
+
+# ==================================================
+# responses
+# ==================================================
+
+def userPrompt(prompt):
+    match = promptPattern.search(prompt)
+    return (match.group(1) if match else prompt).strip()
+
+def ruleRouterOutput(prompt):
+    """
+    Router label from the rule-based classifier ('none-none' when ambiguous).
+    """
+    intent = classifyContextualIntent(prompt)
+    if not intent or not intent[0]:
+        return 'none-none'
+    return f"{intent[0]}-{intent[1]}"
+
+def ruleSQLOutput(prompt):
+    """
+    DESC/QUERY pair matching every significant word of the prompt in the title or keywords,
+    plus a year filter. MERGE prompts extend the previous query.
+    """
+    text = userPrompt(prompt)
+    words = [word for word in normalizeRouterPrompt(text).split() if word not in RULE_STOPWORDS]
+
+    years = [word for word in words if yearPattern.match(word)]
+    terms = [word.replace("'", "''") for word in words if not yearPattern.match(word)]
+
+    conditions = [f"(title LIKE '%{term}%' OR keywords LIKE '%{term}%')" for term in terms]
+    if years:
+        conditions.append(f"date LIKE '%{years[0]}%'")
+
+    previous = previousPattern.search(prompt)
+    if previous and '<ACTION>MERGE</ACTION>' in prompt:
+        base = previous.group(1).strip().split('\n')[-1].rstrip(';')
+        query = f"{base} AND {' AND '.join(conditions)};" if conditions else f"{base};"
+    elif conditions:
+        query = f"SELECT * FROM projects WHERE {' AND '.join(conditions)};"
+    else:
+        query = "SELECT * FROM projects ORDER BY RANDOM() LIMIT 10;"
+
+    return f"DESC: Projetos sobre {text}\nQUERY: {query}"
+
+def splitTokens(text):
+    return tokenPattern.findall(text) or ['']
+
+# ==================================================
+# server
+# ==================================================
+
+class FakeOllama:
+    """
+    Request admission (parallel slots plus a bounded queue, like OLLAMA_NUM_PARALLEL and
+    OLLAMA_MAX_QUEUE), response lookup and fault injection. Counters are exposed at /fake/stats.
+    """
+
+    def __init__(self, canned=None, latency='constant:0', tokensPerSecond=0.0, errorRate=0.0,
+                 errorStatus=500, timeoutRate=0.0, hangSeconds=120.0, parallel=4, maxQueue=64, seed=None):
+        self.canned = {model: {normalizeRouterPrompt(p): r for p, r in responses.items()}
+                       for model, responses in (canned or {}).items()}
+        self.latency = Latency(latency)
+        self.tokensPerSecond = tokensPerSecond
+        self.errorRate = errorRate
+        self.errorStatus = errorStatus
+        self.timeoutRate = timeoutRate
+        self.hangSeconds = hangSeconds
+        self.maxQueue = maxQueue
+
+        self.rnd = random.Random(seed)
+        self.rndLock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(parallel)
+        self.statsLock = threading.Lock()
+        self.stats = {"requests": 0, "completed": 0, "errors": 0, "timeouts": 0,
+                      "rejected": 0, "waiting": 0, "running": 0, "maxRunning": 0, "maxWaiting": 0}
+
+    def count(self, key, delta=1):
+        with self.statsLock:
+            self.stats[key] += delta
+            if key in ('running', 'waiting'):
+                peak = 'max' + key[0].upper() + key[1:]
+                self.stats[peak] = max(self.stats[peak], self.stats[key])
+
+    def draw(self):
+        """
+        (fault, time to first token) for one request; fault is 'error', 'timeout' or None.
+        """
+        with self.rndLock:
+            roll = self.rnd.random()
+            delay = self.latency.sample(self.rnd)
+
+        if roll < self.errorRate:
+            return 'error', delay
+        if roll < self.errorRate + self.timeoutRate:
+            return 'timeout', delay
+        return None, delay
+
+    def respond(self, model, prompt):
+        canned = self.canned.get(model, {})
+        key = normalizeRouterPrompt(userPrompt(prompt))
+        if key in canned:
+            return canned[key]
+        if model == ROUTER_MODEL_NAME:
+            return ruleRouterOutput(userPrompt(prompt))
+        return ruleSQLOutput(prompt)
+
+    def admit(self):
+        """
+        Take a slot, waiting in the queue when all are busy. False when the queue is full.
+        """
+        # the check and the increment in one critical section: concurrent requests can't overshoot maxQueue
+        with self.statsLock:
+            if self.stats["waiting"] >= self.maxQueue:
+                self.stats["rejected"] += 1
+                return False
+            self.stats["waiting"] += 1
+            self.stats["maxWaiting"] = max(self.stats["maxWaiting"], self.stats["waiting"])
+        self.slots.acquire()
+        self.count('waiting', -1)
+        self.count('running')
+        return True
+
+    def release(self):
+        self.count('running', -1)
+        self.slots.release()
+
+    def tokenDelay(self):
+        return 1 / self.tokensPerSecond if self.tokensPerSecond > 0 else 0.0
+
+def chunkLine(model, text, done=False, **extra):
+    return json.dumps({
+        "model": model,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "response": text,
+        "done": done,
+        **extra
+    }) + '\n'
+
+def doneFields(start, tokens):
+    # Ollama reports durations in nanoseconds
+    return {"done_reason": "stop", "total_duration": int((time.perf_counter() - start) * 1e9), "eval_count": tokens}
+
+def createApp(fake):
+    app = Flask(__name__)
+
+    @app.route('/', methods=['GET'])
+    def index():
+        return "Ollama is running"
+
+    @app.route('/api/tags', methods=['GET'])
+    def tags():
+        return jsonify({"models": [{"name": name, "model": name} for name in (MODEL_NAME, ROUTER_MODEL_NAME)]})
+
+    @app.route('/fake/stats', methods=['GET'])
+    def stats():
+        with fake.statsLock:
+            return jsonify(dict(fake.stats))
+
+    @app.route('/api/generate', methods=['POST'])
+    def generate():
+        data = request.get_json(silent=True) or {}
+        model = data.get('model', MODEL_NAME)
+        prompt = data.get('prompt', '')
+        stream = data.get('stream', True)
+
+        fake.count('requests')
+
+        if not fake.admit():
+            return jsonify({"error": "server busy, please try again. maximum pending requests exceeded"}), 503
+
+        start = time.perf_counter()
+        fault, firstTokenDelay = fake.draw()
+
+        if fault == 'error':
+            time.sleep(firstTokenDelay)
+            fake.release()
+            fake.count('errors')
+            return jsonify({"error": "injected failure"}), fake.errorStatus
+
+        if fault == 'timeout':
+            # hold the slot without answering, like a stuck runner
+            time.sleep(fake.hangSeconds)
+            fake.release()
+            fake.count('timeouts')
+            return jsonify({"error": "injected timeout"}), 504
+
+        tokens = splitTokens(fake.respond(model, prompt))
+
+        if not stream:
+            try:
+                time.sleep(firstTokenDelay + fake.tokenDelay() * len(tokens))
+            finally:
+                fake.release()
+            fake.count('completed')
+            return jsonify({
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "response": ''.join(tokens),
+                "done": True,
+                **doneFields(start, len(tokens))
+            })
+
+        def generateChunks():
+            time.sleep(firstTokenDelay)
+            for token in tokens:
+                yield chunkLine(model, token)
+                time.sleep(fake.tokenDelay())
+            yield chunkLine(model, '', done=True, **doneFields(start, len(tokens)))
+            fake.count('completed')
+
+        response = Response(generateChunks(), mimetype='application/x-ndjson')
+        # released when the response is closed, also if the stream is dropped before it starts
+        response.call_on_close(fake.release)
+        return response
+
+    return app
+
+# ==================================================
+# main
+# ==================================================
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for load tests and benchmarks.")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--responses", help="JSON file of canned responses, by model and prompt")
+    parser.add_argument("--latency", default='constant:0',
+                        help="time to first token, in ms: constant:X, uniform:A,B, normal:MEAN,SD, lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="generation rate (0: instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests left hanging")
+    parser.add_argument("--hang", type=float, default=120.0, help="seconds a hanging request is held")
+    parser.add_argument("--parallel", type=int, default=4, help="requests generated at once")
+    parser.add_argument("--max-queue", type=int, default=64, help="waiting requests before answering 503")
+    parser.add_argument("--seed", type=int)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parseArgs()
+
+    canned = None
+    if args.responses:
+        with open(args.responses, encoding='utf-8') as f:
+            canned = json.load(f)
+
+    fake = FakeOllama(
+        canned=canned, latency=args.latency, tokensPerSecond=args.tokens_per_second,
+        errorRate=args.error_rate, errorStatus=args.error_status, timeoutRate=args.timeout_rate,
+        hangSeconds=args.hang, parallel=args.parallel, maxQueue=args.max_queue, seed=args.seed
+    )
+
+    print(f"Fake Ollama on http://{args.host}:{args.port}/api/generate")
+    createApp(fake).run(host=args.host, port=args.port, threaded=True)
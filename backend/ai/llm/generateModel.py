@@ -18,9 +18,11 @@ COLUMN_DESCRIPTIONS = """
   instruments - Lista de instrumentos utilizados
   """
 
-def create_modelfile():
-    
-    modelfile_content = f'''FROM {BASE_MODEL}
+def render_modelfile():
+    """
+    Modelfile content: base model, parameters and system prompt of the SQL agent.
+    """
+    return f'''FROM {BASE_MODEL}
 PARAMETER temperature 0.0
 PARAMETER num_ctx 2048
 
@@ -78,9 +80,10 @@ DESC: [Match user intent exactly - describe what they're looking for in casual P
 QUERY: SELECT * FROM projects WHERE ... (or just SELECT * FROM projects ORDER BY ...)
 """
 '''
-    
+
+def create_modelfile():
     with open('Modelfile', 'w', encoding='utf-8') as f:
-        f.write(modelfile_content)
+        f.write(render_modelfile())
 
 # create_modelfile_codellama7b_optimized()
 def create_model():    
@@ -9,8 +9,52 @@ import sys
 BASE_MODEL = 'llama3.2:3b'
 CUSTOM_MODEL_NAME = 'context-router-lastro'
 
-def create_modelfile():
-    modelfile_content = f'''FROM {BASE_MODEL}
+# labelled examples, also used by the rule-based router in front of the model (ai/llm/router.py)
+ROUTER_EXAMPLES = [
+    ("mesmo autor", "author-equal"),
+    ("autor diferente", "author-different"),
+    ("outro autor", "author-different"),
+    ("mesma categoria", "category-equal"),
+    ("vídeos parecidos", "category-equal"),
+    ("mais como este", "category-equal"),
+    ("categoria diferente", "category-different"),
+    ("mesmo local", "location-equal"),
+    ("local diferente", "location-different"),
+    ("no mesmo lugar", "location-equal"),
+    ("em outro sítio", "location-different"),
+    ("sítio parecido", "location-equal"),
+    ("mesma data", "date-equal"),
+    ("mesmo ano", "date-equal"),
+    ("data diferente", "date-different"),
+    ("com os mesmos instrumentos", "instruments-equal"),
+    ("instrumentos parecidos", "instruments-equal"),
+    ("instrumentos diferentes", "instruments-different"),
+
+    ("maria", "none-none"),
+    ("bia maria", "none-none"),
+    ("carlos", "none-none"),
+    ("fado", "none-none"),
+    ("lisboa", "none-none"),
+    ("2023", "none-none"),
+    ("guitarra", "none-none"),
+    ("mar", "none-none"),
+    ("flores e mar", "none-none"),
+    ("projetos em Viana do Castelo", "none-none"),
+    ("vídeos que falam de maçã", "none-none"),
+    ("videos sobre dança", "none-none"),
+    ("dança no alentejo", "none-none"),
+]
+
+def formatExamples():
+    labelled = [f'"{prompt}" -> {label}' for prompt, label in ROUTER_EXAMPLES if label != 'none-none']
+    unlabelled = [f'"{prompt}" -> {label}' for prompt, label in ROUTER_EXAMPLES if label == 'none-none']
+    return "\n".join(labelled) + "\n\n" + "\n".join(unlabelled)
+
+def render_modelfile():
+    """
+    Modelfile content: base model, parameters, labels and examples of the router.
+    """
+    return f'''FROM {BASE_MODEL}
 PARAMETER temperature 0.0
 PARAMETER num_predict 10
 PARAMETER num_ctx 1024
@@ -32,45 +76,15 @@ Labels:
 - none-none
 
 Examples:
-"mesmo autor" -> author-equal
-"autor diferente" -> author-different
-"outro autor" -> author-different
-"mesma categoria" -> category-equal
-"vídeos parecidos" -> category-equal
-"mais como este" -> category-equal
-"categoria diferente" -> category-different
-"mesmo local" -> location-equal
-"local diferente" -> location-different
-"no mesmo lugar" -> location-equal
-"em outro sítio" -> location-different
-"sítio parecido" -> location-equal
-"mesma data" -> date-equal
-"mesmo ano" -> date-equal
-"data diferente" -> date-different
-"com os mesmos instrumentos" -> instruments-equal
-"instrumentos parecidos" -> instruments-equal
-"instrumentos diferentes" -> instruments-different
-
-"maria" -> none-none
-"bia maria" -> none-none
-"carlos" -> none-none
-"fado" -> none-none
-"lisboa" -> none-none
-"2023" -> none-none
-"guitarra" -> none-none
-"mar" -> none-none
-"flores e mar" -> none-none
-"projetos em Viana do Castelo" -> none-none
-"vídeos que falam de maçã" -> none-none
-"videos sobre dança" -> none-none
-"dança no alentejo" -> none-none
+{formatExamples()}
 
 Default: none-none
 """
 '''
-    
+
+def create_modelfile():
     with open('Modelfile', 'w', encoding='utf-8') as f:
-        f.write(modelfile_content)
+        f.write(render_modelfile())
 
 # create_modelfile_codellama7b_optimized()
 def create_model():    
@@ -0,0 +1,103 @@
+'''
+/ai/llm/router.py
+-> deterministic pre-classifier for contextual intents, in front of the router model
+'''
+
+import unicodedata
+import re
+
+from ai.llm.generateRouterModel import ROUTER_EXAMPLES
+
+# ==================================================
+# global vars
+# ==================================================
+
+# words pointing at a project field (accents stripped, lowercase)
+FIELD_WORDS = {
+    'author': {'autor', 'autora', 'autores', 'autoras', 'autoria', 'criador', 'criadora', 'artista', 'artistas'},
+    'category': {'categoria', 'categorias', 'genero', 'generos', 'tipo', 'estilo'},
+    'location': {'local', 'locais', 'lugar', 'lugares', 'sitio', 'sitios', 'localizacao', 'regiao', 'zona'},
+    'date': {'data', 'datas', 'ano', 'anos', 'epoca', 'altura'},
+    'instruments': {'instrumento', 'instrumentos'},
+}
+
+EQUAL_WORDS = {
+    'mesmo', 'mesma', 'mesmos', 'mesmas', 'igual', 'iguais',
+    'parecido', 'parecida', 'parecidos', 'parecidas',
+    'semelhante', 'semelhantes', 'similar', 'similares',
+}
+
+DIFFERENT_WORDS = {
+    'diferente', 'diferentes', 'outro', 'outra', 'outros', 'outras',
+    'noutro', 'noutra', 'noutros', 'noutras',
+    'distinto', 'distinta', 'distintos', 'distintas',
+}
+
+# words referring to the project being viewed ("deste", "aqui", ...)
+DEICTIC_WORDS = {
+    'este', 'esta', 'estes', 'estas', 'deste', 'desta', 'destes', 'destas',
+    'isto', 'disto', 'aqui', 'daqui', 'dele', 'dela', 'deles', 'delas', 'como',
+}
+
+# "videos parecidos", "mais como este": similarity without a field means same category
+GENERIC_SIMILAR_PATTERN = re.compile(
+    r'^(mais )?(videos|projetos)? ?(parecidos|semelhantes|similares)$|^mais (como|assim|destes) ?(este|isto)?$'
+)
+
+# ==================================================
+# methods
+# ==================================================
+
+def normalizeRouterPrompt(prompt):
+    """
+    Lowercase, strip accents and punctuation, collapse whitespace.
+    """
+    text = unicodedata.normalize('NFKD', prompt.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[^\w\s-]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def parseLabel(label):
+    """
+    'field-operator' -> (field, operator); 'none-none' -> (None, None).
+    """
+    field, operator = label.split('-')
+    if field == 'none':
+        return (None, None)
+    return (field, operator)
+
+EXAMPLE_LABELS = {normalizeRouterPrompt(prompt): parseLabel(label) for prompt, label in ROUTER_EXAMPLES}
+
+def classifyContextualIntent(prompt):
+    """
+    Resolve common phrasings without the router model.
+    Returns (field, operator), (None, None) when confidently not contextual,
+    or None when the prompt is ambiguous and must go to the model.
+    """
+    text = normalizeRouterPrompt(prompt)
+
+    if text in EXAMPLE_LABELS:
+        return EXAMPLE_LABELS[text]
+
+    words = set(text.split())
+
+    fields = [field for field, fieldWords in FIELD_WORDS.items() if words & fieldWords]
+    isEqual = bool(words & EQUAL_WORDS)
+    isDifferent = bool(words & DIFFERENT_WORDS)
+
+    # exactly one field and one direction: "do mesmo artista", "noutra altura"...
+    if len(fields) == 1 and isEqual != isDifferent:
+        return (fields[0], 'equal' if isEqual else 'different')
+
+    # a field pointed at the current project: "deste autor", "desta altura"
+    if len(fields) == 1 and not isEqual and not isDifferent and words & DEICTIC_WORDS:
+        return (fields[0], 'equal')
+
+    if not fields and GENERIC_SIMILAR_PATTERN.match(text):
+        return ('category', 'equal')
+
+    # plain search terms: no field, no comparison and no reference to the current project
+    if not fields and not isEqual and not isDifferent and not (words & DEICTIC_WORDS):
+        return (None, None)
+
+    return None
@@ -2,10 +2,19 @@
 
 import requests
 from dotenv import load_dotenv
+import json
+import time
 import os
 
+from ai.llm.cache import ResponseCache, normalizePrompt, makeKey
+from ai.llm.generateModel import render_modelfile
+from utilities.metrics.setup import llmRequests, llmSeconds, llmFirstChunkSeconds
+from utilities.tracing.setup import getLogger, span
+
 load_dotenv()
 
+log = getLogger('llm')
+
 # ==================================================
 # global vars
 # ==================================================
@@ -13,6 +22,11 @@ load_dotenv()
 MODEL_NAME = 'sql-agent-lastro'
 OLLAMA_URL = os.getenv("OLLAMA_URL")
 
+# temperature 0.0: identical prompts give identical outputs, so they can be cached.
+# keyed on the SQL agent's own definition (base model, parameters, system prompt), so editing it invalidates them
+MODEL_FINGERPRINT = makeKey(MODEL_NAME, render_modelfile())
+responseCache = ResponseCache(MODEL_NAME)
+
 MERGE_CONNECTORS = {'e', 'com', 'em', 'de', 'na', 'no', 'do', 'da', 'à', 'ao', 'sem', 'que'}
 NOISE_WORDS = {'enganei-me', 'queria', 'dizer', 'são', 'interessantes', 'vamos', 'ver', 'vídeos', 'projetos', 'mostra'}
 
@@ -41,7 +55,7 @@ def process_prompt_for_action(currentPrompt, previousQueries):
         return 'RESET'
 
 
-def queryLLM(currentPrompt, previousQueries):
+def formatPrompt(currentPrompt, previousQueries):
     action = process_prompt_for_action(currentPrompt, previousQueries)
 
     # Only include PREV_SQL if action is MERGE
@@ -58,8 +72,68 @@ def queryLLM(currentPrompt, previousQueries):
             f"<PROMPT>{currentPrompt}</PROMPT>"
         )
 
-    print(f"DEBUG ACTION: {action}")
-    print(f"DEBUG PROMPT INJECTED:\n{formattedPrompt}")
+    log.debug("Prompt action: %s", action)
+    log.debug("Prompt injected:\n%s", formattedPrompt)
+
+    return formattedPrompt
+
+def queryLLM(currentPrompt, previousQueries):
+    formattedPrompt = formatPrompt(currentPrompt, previousQueries)
+
+    cacheKey = makeKey(MODEL_FINGERPRINT, normalizePrompt(formattedPrompt))
+    cached = responseCache.get(cacheKey)
+    if cached is not None:
+        llmRequests.inc(mode='blocking', cache='hit')
+        return cached
+
+    llmRequests.inc(mode='blocking', cache='miss')
+    start = time.perf_counter()
+    outcome = 'error'
+
+    try:
+        with span('llm.generate', model=MODEL_NAME):
+            response = requests.post(
+                OLLAMA_URL,
+                json={
+                    'model': MODEL_NAME,
+                    'prompt': formattedPrompt,
+                    'stream': False,
+                    'keep_alive': -1,
+                },
+                timeout=60
+            )
+        
+        if response.status_code == 200:
+            result = response.json()
+            responseCache.set(cacheKey, result['response'])
+            outcome = 'ok'
+            return result['response']
+        else:
+            raise Exception(f"Ollama API error: {response.status_code}")
+            
+    except Exception as e:
+        raise Exception(f"Failed to generate SQL: {str(e)}")
+
+    finally:
+        llmSeconds.observe(time.perf_counter() - start, mode='blocking', outcome=outcome)
+
+def streamLLM(currentPrompt, previousQueries):
+    """
+    Same as queryLLM, but yields the output text chunk by chunk as Ollama generates it.
+    Cached outputs are yielded at once; complete outputs are added to the cache.
+    """
+    formattedPrompt = formatPrompt(currentPrompt, previousQueries)
+
+    cacheKey = makeKey(MODEL_FINGERPRINT, normalizePrompt(formattedPrompt))
+    cached = responseCache.get(cacheKey)
+    if cached is not None:
+        llmRequests.inc(mode='stream', cache='hit')
+        yield cached
+        return
+
+    llmRequests.inc(mode='stream', cache='miss')
+    start = time.perf_counter()
+    outcome = 'error'
 
     try:
         response = requests.post(
@@ -67,17 +141,37 @@ def queryLLM(currentPrompt, previousQueries):
             json={
                 'model': MODEL_NAME,
                 'prompt': formattedPrompt,
-                'stream': False,
+                'stream': True,
                 'keep_alive': -1,
             },
+            stream=True,
             timeout=60
         )
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result['response']
-        else:
+
+        if response.status_code != 200:
             raise Exception(f"Ollama API error: {response.status_code}")
-            
+
+        chunks = []
+        with response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+
+                part = json.loads(line)
+                chunk = part.get('response', '')
+                if chunk:
+                    if not chunks:
+                        llmFirstChunkSeconds.observe(time.perf_counter() - start)
+                    chunks.append(chunk)
+                    yield chunk
+
+                if part.get('done'):
+                    responseCache.set(cacheKey, ''.join(chunks))
+                    outcome = 'ok'
+                    break
+
     except Exception as e:
-        raise Exception(f"Failed to generate SQL: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Failed to generate SQL: {str(e)}")
+
+    finally:
+        llmSeconds.observe(time.perf_counter() - start, mode='stream', outcome=outcome)
\ No newline at end of file
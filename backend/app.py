@@ -3,26 +3,66 @@
 -> main file of the flask app
 '''
 
-from flask import Flask, Response, jsonify, request
+from flask import Flask, Response, abort, jsonify, request, stream_with_context
 import json
+import random
 
-from dataGen.queries import handleQuery
+from dataGen.queries import handleQuery, handleQueryStream
 from dataGen.suggestions import getSuggestions
+from dataGen.similarity import SIMILARITY_FIELDS, getSimilarProjects
 
 from database.setup import initDatabase
-from database.fetchData import fetchCSV
-from database.models import Project, Interaction
+from database.reportBuilder import ReportBuilder
+from database.models import ImportJob
+from database.catalog import getCatalog, parseFields, compileSerializer, dumpCompact
+from database.pagination import PageRequest, isPageRequest, streamProjectsPage, streamActivity
 
 from utilities.scheduler.setup import initScheduler, cleanScheduler
+from utilities.jobs.setup import initJobs, startImport, getLocalJob
 from utilities.cors.setup import initCors
 from utilities.ratelimit.setup import initRateLimiter, limiter
+from utilities.httpcache.setup import payloadResponse
+from utilities.metrics.setup import initMetrics
+from utilities.tracing.setup import initTracing, streamWithTrace
 
 app = Flask(__name__)
 
+initTracing(app)
+# before initDatabase: a first-boot import runs as a job
+initJobs(app)
 initDatabase(app)
 initCors(app)
 initRateLimiter(app)
 initScheduler(app)
+initMetrics(app)
+
+# ==================================================
+# helpers
+# ==================================================
+
+def getCatalogProjectOr404(project_id):
+    project = getCatalog().get(project_id)
+    if project is None:
+        abort(404)
+    return project
+
+def formatSSE(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def parsePageOr400():
+    try:
+        return PageRequest.fromArgs(request.args)
+    except ValueError:
+        abort(400)
+
+def parseFieldsOr400():
+    try:
+        return parseFields(request.args.get('fields'))
+    except ValueError:
+        abort(400)
+
+def streamJSON(chunks):
+    return Response(chunks, mimetype='application/json; charset=utf-8')
 
 # ==================================================
 # routes
@@ -30,41 +70,144 @@ initScheduler(app)
 
 @app.route('/projects', methods=['GET'])
 def get_projects():
-    data = [project.serialize() for project in Project.query.all()]
-    json_str = json.dumps(data, ensure_ascii=False, indent=2)
-    return Response(json_str, mimetype='application/json; charset=utf-8')
+    fields = parseFieldsOr400()
+
+    # no listing parameters: the whole catalog, pre-serialized and compressed once per version and field set
+    # (a field set not among the recently used ones is streamed, and kept for the next requests)
+    if not isPageRequest(request.args):
+        catalog = getCatalog()
+        payload = catalog.projectsPayload(fields)
+        if payload is None:
+            return streamJSON(catalog.streamProjects(fields))
+        return payloadResponse(payload)
+
+    page = parsePageOr400()
+    return streamJSON(streamProjectsPage(getCatalog(), page, compileSerializer(fields)))
 
 @app.route('/projects/<int:project_id>', methods=['GET'])
 def get_project(project_id):
-    return jsonify(Project.query.get_or_404(project_id).serialize())
+    fields = parseFieldsOr400()
+    return jsonify(getCatalogProjectOr404(project_id).serialize(fields))
 
 @app.route('/random-projects/<int:count>', methods=['GET'])
 def get_random_projects(count):
-    from sqlalchemy import func
-    data = [project.serialize() for project in Project.query.order_by(func.random()).limit(min(count,Project.query.count())).all()]
-    json_str = json.dumps(data, ensure_ascii=False, indent=2)
-    return Response(json_str, mimetype='application/json; charset=utf-8')
+    serialize = compileSerializer(parseFieldsOr400())
+    records = getCatalog().records
+    data = [serialize(project) for project in random.sample(records, min(count, len(records)))]
+    return Response(dumpCompact(data), mimetype='application/json; charset=utf-8')
 
 @app.route('/suggestions/<int:project_id>', methods=['GET'])
 def get_suggestions(project_id):
-    return jsonify(getSuggestions(Project.query.get_or_404(project_id)))
+    return jsonify(getSuggestions(getCatalogProjectOr404(project_id)))
+
+@app.route('/similar/<int:project_id>', methods=['GET'])
+def get_similar(project_id):
+    getCatalogProjectOr404(project_id)
+
+    k = request.args.get('k', 10, type=int)
+    match = request.args.get('match')
+    exclude = request.args.get('exclude')
+
+    if k < 1 or any(field and field not in SIMILARITY_FIELDS for field in (match, exclude)):
+        abort(400)
+
+    catalog = getCatalog()
+    data = []
+    for pid, score in getSimilarProjects(project_id, k=min(k, 100), match=match, exclude=exclude):
+        record = catalog.get(pid)
+        data.append({
+            "id": record.id,
+            "title": record.title,
+            "author": record.author,
+            "category": record.category,
+            "score": round(score, 4)
+        })
+
+    return jsonify(data)
 
 @app.route('/query', methods=['POST'])
 @limiter.limit("20 per minute")
 def handle_query():
     return jsonify(handleQuery(request.json))
 
+@app.route('/query/stream', methods=['POST'])
+@limiter.limit("20 per minute")
+def handle_query_stream():
+    data = request.json
+
+    def generate():
+        try:
+            for event, payload in handleQueryStream(data):
+                yield formatSSE(event, payload)
+        except Exception as e:
+            yield formatSSE('error', {"message": str(e)})
+
+    return Response(
+        stream_with_context(streamWithTrace(generate())),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/fetch-csv')
 @limiter.limit("20 per minute")
 def fetch_csv():
-    return fetchCSV()
+    # the import runs in the background; a running import is joined instead of restarted
+    jobId, joined = startImport('http')
+    return jsonify({
+        "jobId": jobId,
+        "joined": joined,
+        "status": f"/import-jobs/{jobId}",
+        "events": f"/import-jobs/{jobId}/events",
+        "result": f"/import-jobs/{jobId}/result"
+    }), 202
+
+@app.route('/import-jobs/<job_id>', methods=['GET'])
+def get_import_job(job_id):
+    return jsonify(ImportJob.query.get_or_404(job_id).serialize())
+
+@app.route('/import-jobs/<job_id>/result', methods=['GET'])
+def get_import_job_result(job_id):
+    job = ImportJob.query.get_or_404(job_id)
+
+    if job.status == 'running' or not job.report:
+        return jsonify(job.serialize()), 202
+
+    if request.args.get('format') == 'json':
+        return Response(job.report, mimetype='application/json; charset=utf-8')
+
+    return Response(ReportBuilder.fromJSON(job.report).renderHTML(), mimetype='text/html; charset=utf-8')
+
+@app.route('/import-jobs/<job_id>/events', methods=['GET'])
+def get_import_job_events(job_id):
+    # live stream of the report: HTML by default, NDJSON events with ?format=json
+    job = getLocalJob(job_id)
+
+    # running in another worker, or no longer in memory: the stored result is the best we have
+    if job is None:
+        return get_import_job_result(job_id)
+
+    asJSON = request.args.get('format') == 'json'
+    events = job.subscribe()
+
+    def generate():
+        if not asJSON:
+            yield job.reporter.getStyles()
+
+        while (event := events.get()) is not None:
+            if asJSON:
+                yield json.dumps(event, ensure_ascii=False, default=str) + '\n'
+            else:
+                yield job.reporter.renderEventHTML(event)
+
+    mimetype = 'application/x-ndjson' if asJSON else 'text/html'
+    return Response(generate(), mimetype=f'{mimetype}; charset=utf-8', headers={'X-Accel-Buffering': 'no'})
 
 @app.route('/user-activity', methods=['GET'])
 @limiter.limit("20 per minute")
 def get_user_activity():
-    data = [interaction.serialize() for interaction in Interaction.query.all()]
-    json_str = json.dumps(data, ensure_ascii=False, indent=2)
-    return Response(json_str, mimetype='application/json; charset=utf-8')
+    # streamed in keyset batches: constant memory however large the table grows
+    page = parsePageOr400() if isPageRequest(request.args) else None
+    return streamJSON(streamActivity(page))
 
 @app.route('/')
 def home():
@@ -0,0 +1,213 @@
+'''
+/benchmarks/catalog.py
+-> synthetic catalog generator: sheet-like rows with Portuguese text, as a CSV and as a projects database
+'''
+
+from datetime import date, datetime
+import random
+import sqlite3
+import csv
+import os
+
+# ==================================================
+# global vars
+# ==================================================
+
+# columns of the Google Sheet, as read by fetchCSV
+SHEET_COLUMNS = [
+    'Link', 'Tema', 'Nome', 'Categorias', 'Realizador', 'Som', 'Produção', 'Apoio',
+    'Assistência', 'Pesquisa', 'Região', 'Distrito/Ilha', 'Concelho', 'Local', 'Instrumentos',
+    'Palavras Chave', 'Conceitos-chave', 'História (textos que acompanham vídeos)',
+    'Outras Informações', 'Biografias'
+]
+
+FIRST_NAMES = [
+    'Maria', 'João', 'Ana', 'José', 'Manuel', 'Rosa', 'António', 'Beatriz', 'Francisco', 'Teresa',
+    'Joaquim', 'Conceição', 'Luís', 'Fernanda', 'Carlos', 'Inês', 'Rui', 'Graça', 'Tiago', 'Lurdes'
+]
+
+LAST_NAMES = [
+    'Silva', 'Santos', 'Ferreira', 'Pereira', 'Oliveira', 'Costa', 'Rodrigues', 'Martins', 'Sousa',
+    'Fernandes', 'Gonçalves', 'Gomes', 'Lopes', 'Marques', 'Alves', 'Almeida', 'Ribeiro', 'Pinto',
+    'Carvalho', 'Teixeira', 'Moreira', 'Correia', 'Mendes', 'Nunes', 'Soares', 'Vieira', 'Monteiro'
+]
+
+GROUPS = [
+    'Rancho Folclórico', 'Grupo de Cantares', 'Tuna', 'Banda Filarmónica', 'Grupo de Bombos',
+    'Cantadeiras', 'Grupo Etnográfico', 'Coro Paroquial'
+]
+
+CATEGORIES = [
+    'Música', 'Dança', 'Artesanato', 'Gastronomia', 'Tradição Oral', 'Poesia', 'Teatro',
+    'Festas e Romarias', 'Ofícios', 'Religiosidade Popular', 'Cante Alentejano', 'Fado'
+]
+
+INSTRUMENTS = [
+    'viola braguesa', 'viola amarantina', 'viola campaniça', 'cavaquinho', 'concertina', 'adufe',
+    'gaita de foles', 'bombo', 'caixa', 'guitarra portuguesa', 'rabeca', 'pandeireta', 'ferrinhos',
+    'bandolim', 'acordeão', 'flauta', 'reque-reque', 'castanholas', 'voz'
+]
+
+# region -> district/island -> municipalities
+PLACES = {
+    'Minho': {'Braga': ['Barcelos', 'Vila Verde', 'Guimarães'], 'Viana do Castelo': ['Ponte de Lima', 'Arcos de Valdevez']},
+    'Trás-os-Montes': {'Bragança': ['Miranda do Douro', 'Vinhais', 'Mogadouro'], 'Vila Real': ['Chaves', 'Montalegre']},
+    'Beira': {'Guarda': ['Sabugal', 'Seia'], 'Castelo Branco': ['Idanha-a-Nova', 'Monsanto'], 'Viseu': ['Lamego', 'Tondela']},
+    'Alentejo': {'Évora': ['Évora', 'Reguengos de Monsaraz'], 'Beja': ['Serpa', 'Mértola', 'Castro Verde'], 'Portalegre': ['Marvão']},
+    'Algarve': {'Faro': ['Loulé', 'Tavira', 'Monchique', 'Aljezur']},
+    'Açores': {'São Miguel': ['Ponta Delgada', 'Povoação'], 'Terceira': ['Angra do Heroísmo'], 'Pico': ['Lajes do Pico']},
+    'Madeira': {'Madeira': ['Funchal', 'Santana', 'Machico']},
+}
+
+VILLAGES = ['Aldeia Nova', 'Vale de Cima', 'Souto', 'Outeiro', 'Ribeira', 'Casal', 'Fonte Santa', 'Carvalhal', 'Lugar do Monte']
+
+KEYWORDS = [
+    'saudade', 'romaria', 'desgarrada', 'cante', 'janeiras', 'malhão', 'vira', 'chula', 'corridinho',
+    'fandango', 'pão', 'forno comunitário', 'vindima', 'desfolhada', 'matança', 'procissão', 'promessa',
+    'lenda', 'mouros', 'pastorícia', 'transumância', 'tecelagem', 'olaria', 'cestaria', 'bordado',
+    'linho', 'lã', 'mar', 'pesca', 'sal', 'azeite', 'vinho', 'cortiça', 'ceifa', 'moinho', 'amor',
+    'trabalho', 'emigração', 'infância', 'casamento', 'Natal', 'São João', 'Santo António', 'entrudo'
+]
+
+TITLE_PATTERNS = [
+    'Cantar das {kw} em {place}', 'A {kw} de {place}', '{category} em {place}', 'Memórias da {kw}',
+    'Moda da {kw}', 'Toque de {instrument}', 'Histórias de {place}', 'O {kw} e a {kw2}', '{name} e a {kw}'
+]
+
+SENTENCES = [
+    'Recolha realizada em {place}, junto de {name}, que aprendeu esta moda com os avós.',
+    'A {kw} era cantada durante o trabalho no campo e nas noites de inverno.',
+    'Nesta aldeia, a tradição da {kw} mantém-se viva graças ao grupo local.',
+    'O toque de {instrument} acompanhava as festas e romarias da região.',
+    '{name} recorda os tempos da {kw2}, quando toda a comunidade se juntava.',
+    'Esta gravação documenta uma prática que se tornou rara nas últimas décadas.',
+    'Os versos falam de {kw}, de {kw2} e da vida de quem partiu para longe.',
+]
+
+PRODUCERS = ['MPAGDP', 'Associação Cultural Lastro', 'Câmara Municipal', 'Junta de Freguesia']
+SUPPORTS = ['DGArtes', 'Fundação Calouste Gulbenkian', 'Direção Regional de Cultura', 'INATEL']
+
+# ==================================================
+# generation
+# ==================================================
+
+def personName(rnd):
+    return f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}"
+
+def people(rnd, maxCount, groupChance=0.0):
+    names = [personName(rnd) for _ in range(rnd.randint(1, maxCount))]
+    if rnd.random() < groupChance:
+        names.append(f"{rnd.choice(GROUPS)} de {rnd.choice(VILLAGES)}")
+    return names
+
+def joinValues(rnd, values):
+    # the sheet mixes ", ", " e " and line breaks; normalizeString unifies them on import
+    if len(values) == 2 and rnd.random() < 0.3:
+        return ' e '.join(values)
+    return ', '.join(values)
+
+def paragraph(rnd, count, context):
+    return ' '.join(rnd.choice(SENTENCES).format(**context) for _ in range(count))
+
+def generateRow(rnd, index):
+    region = rnd.choice(list(PLACES))
+    district = rnd.choice(list(PLACES[region]))
+    municipality = rnd.choice(PLACES[region][district])
+    village = rnd.choice(VILLAGES)
+
+    authors = people(rnd, 3, groupChance=0.25)
+    keywords = rnd.sample(KEYWORDS, rnd.randint(1, 5))
+    concepts = rnd.sample(KEYWORDS, rnd.randint(0, 3))
+    instruments = rnd.sample(INSTRUMENTS, rnd.randint(0, 4))
+    categories = rnd.sample(CATEGORIES, rnd.randint(1, 2))
+
+    context = {
+        'place': rnd.choice([village, municipality]), 'name': authors[0], 'kw': keywords[0],
+        'kw2': rnd.choice(KEYWORDS), 'instrument': rnd.choice(INSTRUMENTS), 'category': categories[0]
+    }
+    title = rnd.choice(TITLE_PATTERNS).format(**context)
+    if rnd.random() < 0.5:
+        title += f" ({rnd.randint(1, 9)})"
+
+    return {
+        'Link': f"https://vimeo.com/{100000000 + index}",
+        'Tema': title,
+        'Nome': ', '.join(authors),
+        'Categorias': joinValues(rnd, categories),
+        'Realizador': personName(rnd),
+        'Som': personName(rnd) if rnd.random() < 0.7 else '',
+        'Produção': rnd.choice(PRODUCERS),
+        'Apoio': ', '.join(rnd.sample(SUPPORTS, rnd.randint(0, 2))),
+        'Assistência': personName(rnd) if rnd.random() < 0.3 else '',
+        'Pesquisa': joinValues(rnd, people(rnd, 2)) if rnd.random() < 0.5 else '',
+        'Região': region,
+        'Distrito/Ilha': district,
+        'Concelho': municipality,
+        'Local': village if rnd.random() < 0.6 else '',
+        'Instrumentos': joinValues(rnd, instruments),
+        'Palavras Chave': ', '.join(keywords),
+        'Conceitos-chave': ', '.join(concepts),
+        'História (textos que acompanham vídeos)': paragraph(rnd, rnd.randint(1, 4), context),
+        'Outras Informações': paragraph(rnd, 1, context) if rnd.random() < 0.3 else '',
+        'Biografias': paragraph(rnd, rnd.randint(0, 2), context),
+    }
+
+def generateRows(count, seed=1):
+    """
+    'count' sheet rows, deterministic for a given seed.
+    """
+    rnd = random.Random(seed)
+    return [generateRow(rnd, index) for index in range(count)]
+
+def publishDate(rnd):
+    return date(rnd.randint(2010, 2024), rnd.randint(1, 12), rnd.randint(1, 28))
+
+# ==================================================
+# output
+# ==================================================
+
+def writeCSV(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SHEET_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def writeDatabase(path, rows, seed=1):
+    """
+    Fresh projects database holding 'rows' as fetchCSV would have stored them
+    (same field normalization), so re-importing the matching CSV finds them unchanged.
+    The search, tag and suggestion tables are left to initDatabase.
+    """
+    import pandas as pd
+    from sqlalchemy import create_engine
+
+    from database.setup import db
+    from database.fetchData import PROJECT_FIELDS, buildProjectFields, cleanLink
+    import database.models
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    db.metadata.create_all(create_engine(f"sqlite:///{path}"))
+
+    rnd = random.Random(seed)
+    createdAt = datetime(2024, 1, 1).isoformat(sep=' ')
+    columns = ['id'] + PROJECT_FIELDS + ['date', 'created_at']
+
+    records = []
+    for row in rows:
+        link = cleanLink(row['Link'])
+        fields = buildProjectFields(pd.Series(row), link)
+        pid = int(link.split('/')[-1])
+        records.append([pid] + [fields[field] for field in PROJECT_FIELDS] + [publishDate(rnd).isoformat(), createdAt])
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.executemany(
+            f"INSERT INTO projects ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            records
+        )
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,377 @@
+'''
+/benchmarks/run.py
+-> benchmark suite over synthetic catalogs, with JSON output to compare runs across commits
+
+usage (from /backend):
+    python -m benchmarks.run --sizes 1000,10000 --out bench.json
+    python -m benchmarks.run --sizes 100000 --cases executeQueriesSQL,applyFallback --repeat 50
+
+Each size runs in its own process (the database path, catalog and indexes are per process).
+The LLM and Vimeo are stubbed: only this backend's own work is measured.
+'''
+
+from contextlib import redirect_stdout
+from datetime import datetime, date
+import subprocess
+import statistics
+import platform
+import argparse
+import tempfile
+import random
+import sqlite3
+import json
+import time
+import sys
+import os
+import io
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ==================================================
+# global vars
+# ==================================================
+
+DEFAULT_SIZES = [1000, 10000]
+DEFAULT_REPEAT = 20
+DEFAULT_SEED = 1
+
+# canned model outputs for the stubbed LLM, by prompt
+LLM_OUTPUTS = {
+    'fado e saudade': (
+        "DESC: Projetos sobre a saudade\n"
+        "QUERY: SELECT * FROM projects WHERE keywords LIKE '%saudade%';\n"
+        "DESC: Projetos com guitarra portuguesa\n"
+        "QUERY: SELECT * FROM projects WHERE instruments LIKE '%guitarra portuguesa%';"
+    ),
+    'cante no alentejo em 2015': (
+        "DESC: Cante alentejano em 2015\n"
+        "QUERY: SELECT * FROM projects WHERE category LIKE '%Cante%' AND location LIKE '%Alentejo%' AND date LIKE '%2015%';"
+    ),
+    'projetos inexistentes': (
+        "DESC: Nada a ver\n"
+        "QUERY: SELECT * FROM projects WHERE title LIKE '%xyzzy%';"
+    ),
+}
+
+# ==================================================
+# measuring
+# ==================================================
+
+def measure(fn, repeat, warmup=1):
+    """
+    Run 'fn' warmup + repeat times (stdout silenced). Returns timing stats in milliseconds.
+    """
+    timings = []
+
+    with redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        "runs": len(timings),
+        "min": round(timings[0], 4),
+        "median": round(statistics.median(timings), 4),
+        "p95": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        "mean": round(statistics.fmean(timings), 4),
+        "max": round(timings[-1], 4),
+    }
+
+def measureOnce(fn):
+    return measure(fn, repeat=1, warmup=0)
+
+# ==================================================
+# worker (one catalog size, own process)
+# ==================================================
+
+def prepareFiles(workdir, size, seed):
+    """
+    Synthetic database and matching CSVs (unchanged, and with 1% of the rows edited).
+    Generated once per (size, seed) and reused by later runs.
+    """
+    from benchmarks.catalog import generateRows, writeCSV, writeDatabase
+
+    base = os.path.join(workdir, f"catalog-{size}-{seed}")
+    paths = {"template": base + ".template.db", "csv": base + ".csv", "csvChanged": base + ".changed.csv"}
+
+    if all(os.path.exists(path) for path in paths.values()):
+        return paths
+
+    rows = generateRows(size, seed)
+    writeDatabase(paths["template"], rows, seed)
+    writeCSV(paths["csv"], rows)
+
+    rnd = random.Random(seed)
+    for row in rnd.sample(rows, max(1, size // 100)):
+        row['Tema'] = row['Tema'] + ' (revisto)'
+    writeCSV(paths["csvChanged"], rows)
+
+    return paths
+
+def copyDatabase(source, target):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+def runWorker(args):
+    size, seed, repeat = args.size, args.seed, args.repeat
+    selected = set(args.cases.split(',')) if args.cases else None
+
+    # everything the app persists goes to the work directory (set before any app module is imported)
+    dbPath = os.path.join(args.workdir, f"run-{size}-{seed}-{os.getpid()}.db")
+    os.environ["LASTRO_DB_PATH"] = dbPath
+    os.environ["LLM_CACHE_PATH"] = os.path.join(args.workdir, f"llm-{os.getpid()}.db")
+    os.environ["VIMEO_CACHE_PATH"] = os.path.join(args.workdir, f"vimeo-{os.getpid()}.db")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    with redirect_stdout(io.StringIO()):
+        paths = prepareFiles(args.workdir, size, seed)
+
+    copyDatabase(paths["template"], dbPath)
+
+    results = {"rows": size, "cases": {}, "skipped": []}
+
+    def wanted(name):
+        group = name.split('.')[0]
+        return not selected or name in selected or group in selected
+
+    def record(name, stats):
+        results["cases"][name] = stats
+        print(f"  {size:>8} {name:<40} median {stats['median']:>10.3f}ms  p95 {stats['p95']:>10.3f}ms", file=sys.stderr)
+
+    # the suggestion sets are built (and measured) explicitly below, not in the background
+    import dataGen.suggestionSets as suggestionSets
+    ensureSuggestionSets = suggestionSets.ensureSuggestionSets
+    suggestionSets.ensureSuggestionSets = lambda catalog: None
+
+    # app startup: full-text and tag indexes, catalog and /projects payload
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        from app import app
+    record("startup", {"runs": 1, "median": round((time.perf_counter() - start) * 1000, 4), "p95": 0})
+
+    from utilities.ratelimit.setup import limiter
+    limiter.enabled = False
+
+    import dataGen.queries as queries
+    import dataGen.suggestions as suggestions
+    import database.fetchData as fetchData
+    from database.setup import executeQueriesSQL
+    from database.catalog import getCatalog, Catalog
+    from dataGen.queryFallback import applyFallback
+    from dataGen.similarity import rebuildSimilarityIndex, getSimilarProjects
+    from dataGen.ranking import rebuildRankedIndex, searchRanked
+
+    # stubs: model outputs and Vimeo dates
+    queries.queryLLM = lambda prompt, previousQueries: LLM_OUTPUTS[prompt]
+    fetchData.getVimeoDates = lambda pids: {pid: date(2020, 1, 1) for pid in pids}
+
+    catalog = getCatalog()
+    rnd = random.Random(seed)
+    sampleIds = [record.id for record in rnd.sample(catalog.records, min(50, len(catalog)))]
+    sampleProjects = [catalog.get(pid) for pid in sampleIds]
+    client = app.test_client()
+
+    def cycle(items):
+        state = {"i": 0}
+        def next_():
+            item = items[state["i"] % len(items)]
+            state["i"] += 1
+            return item
+        return next_
+
+    # ---------- raw SQL
+    if wanted("executeQueriesSQL"):
+        for name, sql in [
+            ("like", "SELECT * FROM projects WHERE keywords LIKE '%saudade%';"),
+            ("likeShortTerm", "SELECT * FROM projects WHERE author LIKE '%Jo%';"),
+            ("dateAndInstrument", "SELECT * FROM projects WHERE instruments LIKE '%adufe%' AND date LIKE '%2018%';"),
+            ("random", "SELECT * FROM projects ORDER BY RANDOM() LIMIT 100;"),
+        ]:
+            record(f"executeQueriesSQL.{name}", measure(lambda: executeQueriesSQL([sql]), repeat))
+
+    # ---------- handleQuery (stubbed LLM)
+    if wanted("handleQuery"):
+        for name, prompt in [("twoGroups", 'fado e saudade'), ("dateFilter", 'cante no alentejo em 2015'),
+                             ("noResultsFallback", 'projetos inexistentes')]:
+            data = {"currentPrompt": prompt, "previousQueries": []}
+            record(f"handleQuery.{name}", measure(lambda: queries.handleQuery(dict(data)), repeat))
+
+        data = {"currentPrompt": "vídeos de fado com saudade e viola", "previousQueries": [], "mode": "ranked"}
+        record("handleQuery.ranked", measure(lambda: queries.handleQuery(dict(data)), repeat))
+
+    # ---------- fallback levels
+    if wanted("applyFallback"):
+        for name, sql in [
+            ("singleTerm", "SELECT * FROM projects WHERE title LIKE '%romaria%';"),
+            ("singleTermRanked", "SELECT * FROM projects WHERE title LIKE '%tradicao viva%';"),
+            ("multiTerm", "SELECT * FROM projects WHERE title LIKE '%olaria%' OR title LIKE '%linho%';"),
+            ("random", "SELECT * FROM projects WHERE id = 0;"),
+        ]:
+            record(f"applyFallback.{name}", measure(lambda: applyFallback([sql]), repeat))
+
+    # ---------- precomputed structures
+    if wanted("suggestionSets.rebuild"):
+        record("suggestionSets.rebuild", measureOnce(lambda: suggestionSets.rebuildSuggestionSets(catalog)))
+
+    if wanted("similarity"):
+        record("similarity.rebuild", measureOnce(lambda: rebuildSimilarityIndex(catalog)))
+        nextId = cycle(sampleIds)
+        record("similarity.topK", measure(lambda: getSimilarProjects(nextId(), k=10), repeat))
+        record("similarity.matchExclude", measure(
+            lambda: getSimilarProjects(nextId(), k=10, match='category', exclude='author'), repeat
+        ))
+
+    if wanted("ranked"):
+        record("ranked.rebuild", measureOnce(lambda: rebuildRankedIndex(catalog)))
+        record("ranked.search", measure(lambda: searchRanked("saudade viola romaria"), repeat))
+
+    # ---------- suggestions
+    if wanted("getSuggestions"):
+        nextProject = cycle(sampleProjects)
+
+        if suggestionSets.readStoredVersion() == catalog.version:
+            record("getSuggestions.precomputed", measure(lambda: suggestions.getSuggestions(nextProject()), repeat))
+        else:
+            results["skipped"].append("getSuggestions.precomputed")
+
+        precomputed = suggestions.getPrecomputedSuggestions
+        suggestions.getPrecomputedSuggestions = lambda project: None
+        record("getSuggestions.live", measure(lambda: suggestions.getSuggestions(nextProject()), repeat))
+        suggestions.getPrecomputedSuggestions = precomputed
+
+    # ---------- /projects
+    if wanted("projects"):
+        record("projects.serialize", measure(
+            lambda: Catalog(catalog.version, catalog.records).projectsPayload(), max(1, repeat // 10)
+        ))
+        record("projects.endpoint", measure(lambda: client.get('/projects'), repeat))
+
+        etag = client.get('/projects', headers={"Accept-Encoding": "br"}).headers.get("ETag")
+        record("projects.notModified", measure(
+            lambda: client.get('/projects', headers={"Accept-Encoding": "br", "If-None-Match": etag}), repeat
+        ))
+
+    # ---------- import (last: it changes the catalog)
+    # the suggestion sets rebuild it ends with is measured on its own above
+    fetchData.rebuildSuggestionSets = lambda catalog: None
+
+    if wanted("fetchCSV"):
+        with app.app_context():
+            record("fetchCSV.unchanged", measureOnce(lambda: fetchData.fetchCSV(source=paths["csv"])))
+            record("fetchCSV.changed", measureOnce(lambda: fetchData.fetchCSV(source=paths["csvChanged"])))
+
+    fetchData.rebuildSuggestionSets = suggestionSets.rebuildSuggestionSets
+
+    suggestionSets.ensureSuggestionSets = ensureSuggestionSets
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(dbPath + suffix):
+            os.remove(dbPath + suffix)
+
+    return results
+
+# ==================================================
+# driver
+# ==================================================
+
+def gitCommit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    import numpy
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlite": sqlite3.sqlite_version,
+        "numpy": numpy.__version__,
+        "cpus": os.cpu_count(),
+    }
+
+def runSizes(args):
+    report = {
+        "commit": gitCommit(),
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "environment": environment(),
+        "settings": {"repeat": args.repeat, "seed": args.seed, "cases": args.cases},
+        "sizes": {},
+    }
+
+    for size in args.sizes:
+        print(f"catalog of {size} projects", file=sys.stderr)
+
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            resultPath = f.name
+
+        command = [
+            sys.executable, "-m", "benchmarks.run", "--worker",
+            "--size", str(size), "--seed", str(args.seed), "--repeat", str(args.repeat),
+            "--workdir", args.workdir, "--result", resultPath,
+        ]
+        if args.cases:
+            command += ["--cases", args.cases]
+
+        completed = subprocess.run(command, cwd=BACKEND_DIR)
+
+        if completed.returncode == 0:
+            with open(resultPath) as f:
+                report["sizes"][str(size)] = json.load(f)
+        else:
+            report["sizes"][str(size)] = {"rows": size, "error": f"worker exited with {completed.returncode}"}
+
+        os.remove(resultPath)
+
+    output = json.dumps(report, indent=2)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+        print(f"results written to {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Benchmark the backend over synthetic catalogs.")
+    parser.add_argument("--sizes", default=','.join(map(str, DEFAULT_SIZES)),
+                        type=lambda value: [int(size) for size in value.split(',')],
+                        help="catalog sizes, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--cases", help="comma-separated case names or groups (default: all)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per case")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "lastro-bench"),
+                        help="where generated catalogs are cached")
+    parser.add_argument("--out", help="JSON output file (default: stdout)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parseArgs()
+    os.makedirs(args.workdir, exist_ok=True)
+
+    if args.worker:
+        sys.path.insert(0, BACKEND_DIR)
+        result = runWorker(args)
+        with open(args.result, 'w') as f:
+            json.dump(result, f)
+    else:
+        runSizes(args)
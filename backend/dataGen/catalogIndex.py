@@ -0,0 +1,81 @@
+'''
+/dataGen/catalogIndex.py
+-> shared pieces of the in-memory catalog indexes: CSR postings, top-k, one build per catalog version
+'''
+
+import threading
+import time
+
+import numpy as np
+
+from utilities.tracing.setup import getLogger
+
+# ==================================================
+# global vars
+# ==================================================
+
+log = getLogger('catalogIndex')
+
+# ==================================================
+# arrays
+# ==================================================
+
+def toCSR(postings, dtype=np.int32):
+    """
+    List of per-row value lists -> (indptr, values): row r holds values[indptr[r]:indptr[r + 1]].
+    """
+    indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(p) for p in postings])
+    values = np.fromiter((value for p in postings for value in p), dtype=dtype, count=indptr[-1])
+    return indptr, values
+
+def topK(scores, candidates, k):
+    """
+    The k best of 'candidates' (positions in 'scores'): best score first, position order between ties.
+    """
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+# ==================================================
+# build and access
+# ==================================================
+
+class CatalogIndex:
+    """
+    Holder of one index of the current catalog, built by 'build(catalog)' on first use and
+    after each catalog version change. Callers that find it stale together wait for a
+    single build instead of each running their own.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self.current = None
+        self.lock = threading.Lock()
+
+    def rebuild(self, catalog, onlyIfStale=False):
+        with self.lock:
+            index = self.current
+            if onlyIfStale and index is not None and index.version == catalog.version:
+                return index
+
+            start = time.time()
+            index = self.build(catalog)
+            self.current = index
+
+        log.info("%s built in %.0fms.", index.describe(), (time.time() - start) * 1000)
+        return index
+
+    def get(self):
+        """
+        Index of the current catalog, rebuilt when the catalog version changed.
+        """
+        from database.catalog import getCatalog
+
+        catalog = getCatalog()
+        index = self.current
+
+        if index is None or index.version != catalog.version:
+            index = self.rebuild(catalog, onlyIfStale=True)
+
+        return index
@@ -10,7 +10,8 @@ import random
 # ==================================================
 
 def describeDirectSuggestion(query, field=None):
-    if "where" not in query.lower():
+    # query is None for precomputed suggestions (always filtered by the field)
+    if query is not None and "where" not in query.lower():
         return "Todos os vídeos da MPAGDP"
 
     templates_map = {
@@ -4,57 +4,109 @@
 '''
 
 from database.setup import db, executeQueriesSQL, recordInteraction
+from database.queryBuilder import Query, contains, notContains, hasAllTags, lacksAllTags
 from database.models import serializeProjectMinimal
-from ai.llm.setup import queryLLM
-from dataGen.queryFallback import applyFallback
+from ai.llm.setup import OLLAMA_URL, queryLLM, streamLLM
+from ai.llm.router import classifyContextualIntent, normalizeRouterPrompt
+from ai.llm.cache import ResponseCache, makeKey
+from ai.llm.generateRouterModel import CUSTOM_MODEL_NAME as ROUTER_MODEL_NAME, render_modelfile as renderRouterModelfile
+from dataGen.queryFallback import applyFallback, buildMultiTermFallback
+from dataGen.ranking import RankedResults, queryWords, searchRanked
+from utilities.metrics.setup import routerRequests, routerSeconds, parseSeconds, serializeSeconds, keywordExpansions
+from utilities.tracing.setup import getLogger, span, annotate
 import requests
 import random
 
+# ==================================================
+# global vars
+# ==================================================
+
+log = getLogger('queries')
+
+# memoized router model outputs, invalidated when the router's Modelfile (base model,
+# parameters, prompt, labels or examples) changes
+routerCache = ResponseCache(ROUTER_MODEL_NAME)
+ROUTER_FINGERPRINT = makeKey(ROUTER_MODEL_NAME, renderRouterModelfile())
+
+# the router model is served by the same Ollama instance as the SQL model
+ROUTER_URL = OLLAMA_URL or 'http://localhost:11434/api/generate'
+
 # ==================================================
 # methods
 # ==================================================
 
+def parseRouterOutput(output):
+    """
+    Parse the router model output format 'field-operator'.
+    Returns (field, operator), or None if the output is not a valid label.
+    """
+    if '-' in output:
+        parts = output.split('-')
+        if len(parts) == 2:
+            field, operator = parts
+
+            # Validate field
+            if field in ['category', 'author', 'location', 'date', 'instruments']:
+                # Validate operator
+                if operator in ['equal', 'different']:
+                    return (field, operator)
+            elif field == 'none' and operator == 'none':
+                return (None, None)
+
+    return None
+
 def detectContextualIntent(prompt):
     """
-    Use the router model to detect if the user prompt contains contextual references.
+    Detect if the user prompt contains contextual references.
+    Common phrasings are resolved by the rule-based router, model outputs are memoized,
+    and only the remaining prompts reach the router model.
     Returns tuple: (field, operator) where:
     - field: 'category', 'author', 'location', 'date', or None
     - operator: 'equal', 'different', or None
     """
+    ruled = classifyContextualIntent(prompt)
+    if ruled is not None:
+        log.debug("Router rules resolved %r to %s", prompt, ruled)
+        routerRequests.inc(source='rules')
+        return ruled
+
+    cacheKey = makeKey(ROUTER_FINGERPRINT, normalizeRouterPrompt(prompt))
+    cached = routerCache.get(cacheKey)
+    if cached is not None:
+        routerRequests.inc(source='cache')
+        return parseRouterOutput(cached) or (None, None)
+
     try:
-        response = requests.post(
-            'http://localhost:11434/api/generate',
-            json={
-                'model': 'context-router-lastro',
-                'prompt': prompt,
-                'stream': False,
-                'keep_alive': -1
-            },
-            timeout=30
-        )
+        with routerSeconds.time(), span('router.model'):
+            response = requests.post(
+                ROUTER_URL,
+                json={
+                    'model': ROUTER_MODEL_NAME,
+                    'prompt': prompt,
+                    'stream': False,
+                    'keep_alive': -1
+                },
+                timeout=30
+            )
+
+        routerRequests.inc(source='model' if response.status_code == 200 else 'error')
 
         if response.status_code == 200:
             output = response.json().get('response', '').strip().lower()
-            print(f"DEBUG: Router model output: '{output}'")
-
-            # Parse output format: "field-operator"
-            if '-' in output:
-                parts = output.split('-')
-                if len(parts) == 2:
-                    field, operator = parts
-
-                    # Validate field
-                    if field in ['category', 'author', 'location', 'date', 'instruments']:
-                        # Validate operator
-                        if operator in ['equal', 'different']:
-                            return (field, operator)
-                    elif field == 'none' and operator == 'none':
-                        return (None, None)
-
-            print(f"DEBUG: Router model output invalid format: '{output}'")
+            log.debug("Router model output: %r", output)
+
+            # temperature 0.0: the same prompt always gives the same label
+            routerCache.set(cacheKey, output)
+
+            parsed = parseRouterOutput(output)
+            if parsed is not None:
+                return parsed
+
+            log.warning("Router model output invalid format: %r", output)
             return (None, None)
     except Exception as e:
-        print(f"DEBUG: Router model error: {e}")
+        log.warning("Router model error: %s", e)
+        routerRequests.inc(source='error')
         return (None, None)
 
     return (None, None)
@@ -75,31 +127,31 @@ def buildContextualQuery(contextType, operator, project):
     if operator == 'equal':
         queries = {
             'category': {
-                'query': f"SELECT * FROM projects WHERE category LIKE '%{project.category}%';",
+                'query': Query(hasAllTags('category', project.category)),
                 'description': f"Projetos do género {project.category}",
                 'field': 'category',
                 'value': project.category
             },
             'author': {
-                'query': f"SELECT * FROM projects WHERE author LIKE '%{project.author}%';",
+                'query': Query(hasAllTags('author', project.author)),
                 'description': f"Projetos de {project.author}",
                 'field': 'author',
                 'value': project.author
             },
             'location': {
-                'query': f"SELECT * FROM projects WHERE location LIKE '%{project.location}%';",
+                'query': Query(hasAllTags('location', project.location)),
                 'description': f"Projetos em {project.location}",
                 'field': 'location',
                 'value': project.location
             },
             'date': {
-                'query': f"SELECT * FROM projects WHERE date LIKE '%{year}%';",
+                'query': Query(contains('date', year)),
                 'description': f"Projetos de {year}",
                 'field': 'date',
                 'value': year
             },
             'instruments': {
-                'query': f"SELECT * FROM projects WHERE instruments LIKE '%{project.instruments}%';",
+                'query': Query(hasAllTags('instruments', project.instruments)),
                 'description': f"Projetos com {project.instruments}",
                 'field': 'instruments',
                 'value': project.instruments
@@ -108,31 +160,31 @@ def buildContextualQuery(contextType, operator, project):
     else:  # operator == 'different'
         queries = {
             'category': {
-                'query': f"SELECT * FROM projects WHERE category NOT LIKE '%{project.category}%';",
+                'query': Query(lacksAllTags('category', project.category)),
                 'description': f"Projetos de género diferente de {project.category}",
                 'field': 'category',
                 'value': project.category
             },
             'author': {
-                'query': f"SELECT * FROM projects WHERE author NOT LIKE '%{project.author}%';",
+                'query': Query(lacksAllTags('author', project.author)),
                 'description': f"Projetos de outros autores (não {project.author})",
                 'field': 'author',
                 'value': project.author
             },
             'location': {
-                'query': f"SELECT * FROM projects WHERE location NOT LIKE '%{project.location}%';",
+                'query': Query(lacksAllTags('location', project.location)),
                 'description': f"Projetos de outras localizações (não {project.location})",
                 'field': 'location',
                 'value': project.location
             },
             'date': {
-                'query': f"SELECT * FROM projects WHERE date NOT LIKE '%{year}%';",
+                'query': Query(notContains('date', year)),
                 'description': f"Projetos de outros anos (não {year})",
                 'field': 'date',
                 'value': year
             },
             'instruments': {
-                'query': f"SELECT * FROM projects WHERE instruments NOT LIKE '%{project.instruments}%';",
+                'query': Query(lacksAllTags('instruments', project.instruments)),
                 'description': f"Projetos com outros instrumentos (não {project.instruments})",
                 'field': 'instruments',
                 'value': project.instruments
@@ -141,125 +193,284 @@ def buildContextualQuery(contextType, operator, project):
 
     return queries.get(contextType)
 
-def stripQueries(text):
+def splitLines(chunks):
+    """
+    Turn a stream of text chunks into complete lines, as soon as each line ends.
+    """
+    buffer = ''
 
-    result = {
-        "queries": [],
-        "descriptions": [],
-        "results": []
-    }
+    for chunk in chunks:
+        buffer += chunk
+        while '\n' in buffer:
+            line, buffer = buffer.split('\n', 1)
+            yield line
 
-    lines = text.strip().split('\n')
-    i = 0
+    if buffer:
+        yield buffer
 
-    while i < len(lines):
-        line = lines[i].strip()
+def parseModelLines(lines):
+    """
+    Parse model output lines into ('desc', text) and ('query', sql) items, lazily,
+    so a streamed output can be acted on line by line.
+    """
+    awaitingQuery = False
+
+    for line in lines:
+        line = line.strip()
+
+        # 'QUERY:' alone on its line: the SQL is on the next line
+        if awaitingQuery:
+            awaitingQuery = False
+            # Make sure next line is actual SQL, not another tag
+            if line and not line.startswith('DESC:') and not line.startswith('QUERY:'):
+                yield ('query', line if line.endswith(';') else line + ';')
+            continue
 
         if not line:
-            i += 1
             continue
 
         # isolate query
         if line.startswith('QUERY:'):
             query = line[6:].strip()
 
-            # If query is empty or just whitespace, check the next line
             if not query:
-                i += 1
-                if i < len(lines):
-                    next_line = lines[i].strip()
-                    # Make sure next line is actual SQL, not another tag
-                    if next_line and not next_line.startswith('DESC:') and not next_line.startswith('QUERY:'):
-                        query = next_line
-
-            if query:
-                if not query.endswith(';'):
-                    query += ';'
-                result["queries"].append(query)
+                awaitingQuery = True
+                continue
+
+            if not query.endswith(';'):
+                query += ';'
+            yield ('query', query)
 
         # isolate description
         elif line.startswith('DESC:'):
-            result["descriptions"].append(line[5:].strip())
+            yield ('desc', line[5:].strip())
 
-        i += 1
+def stripQueries(text):
+
+    result = {
+        "queries": [],
+        "descriptions": [],
+        "results": []
+    }
+
+    with parseSeconds.time(), span('parse'):
+        for kind, value in parseModelLines(text.strip().split('\n')):
+            if kind == 'query':
+                result["queries"].append(value)
+            else:
+                result["descriptions"].append(value)
 
     return result
 
-# ==================================================
-# main
-# ==================================================
+def serializeResults(rawResults):
+    """
+    Shuffle each result group and minimize its payload for explore results.
+    Ranked groups keep their order and get each project's score.
+    """
+    serialized = []
 
-def handleQuery(data):
-    print(data)
+    with serializeSeconds.time(), span('serialize', groups=len(rawResults)):
+        for queryResult in rawResults:
+            if isinstance(queryResult, RankedResults):
+                serialized.append([
+                    {**serializeProjectMinimal(project), "score": score}
+                    for project, score in zip(queryResult, queryResult.scores)
+                ])
+                continue
 
-    currentPrompt = data["currentPrompt"]
+            random.shuffle(queryResult)
+            serialized.append([serializeProjectMinimal(project) for project in queryResult])
+
+    return serialized
+
+def getContextualIntent(data):
+    """
+    If the user is on a project page and uses a contextual reference,
+    returns (project, contextType, contextOperator), otherwise None.
+    """
     currentProjectId = data.get("currentProjectId")
 
-    contextProject = None
-    contextType = None
-    contextOperator = None
+    if not currentProjectId:
+        return None
 
-    # Check if user is on a project page and uses contextual references
-    if currentProjectId:
-        contextType, contextOperator = detectContextualIntent(currentPrompt)
+    contextType, contextOperator = detectContextualIntent(data["currentPrompt"])
 
-    # If contextual intent detected, build query directly in Python (fast path)
-    if contextType and contextOperator:
-        from database.models import Project
-        project = Project.query.get(currentProjectId)
+    if not (contextType and contextOperator):
+        return None
 
-        if project:
-            print(f"DEBUG: Contextual intent '{contextType}-{contextOperator}' detected! Building query directly.")
+    try:
+        projectId = int(currentProjectId)
+    except (TypeError, ValueError):
+        return None
 
-            contextProject = {
-                "title": project.title,
-                "author": project.author,
-                "id": project.id
-            }
+    from database.catalog import getCatalog
+    project = getCatalog().get(projectId)
 
-            # Build SQL query directly without LLM
-            queryInfo = buildContextualQuery(contextType, contextOperator, project)
+    if not project:
+        return None
 
-            result = {
-                "queries": [queryInfo['query']],
-                "descriptions": [queryInfo['description']],
-            }
+    return (project, contextType, contextOperator)
 
-            rawResults = executeQueriesSQL(result["queries"])
+def handleContextualQuery(project, contextType, contextOperator):
+    """
+    Build and run the contextual query directly in Python, without the LLM (fast path).
+    """
+    log.debug("Contextual intent %s-%s detected, building query directly", contextType, contextOperator)
+    annotate(path='contextual', contextType=contextType, contextOperator=contextOperator)
 
-            # Check if any results were found
-            has_results = any(len(queryResult) > 0 for queryResult in rawResults)
+    contextProject = {
+        "title": project.title,
+        "author": project.author,
+        "id": project.id
+    }
 
-            # Apply fallback system if no results
-            if not has_results:
-                print("DEBUG: No contextual results found - applying fallback system")
-                fallback_result = applyFallback(result["queries"])
+    # Build SQL query directly without LLM
+    queryInfo = buildContextualQuery(contextType, contextOperator, project)
 
-                # Update result with fallback data
-                result["queries"] = fallback_result["queries"]
-                result["descriptions"] = fallback_result["descriptions"]
-                rawResults = fallback_result["results"]
-                result["fallback_applied"] = True
-                result["fallback_level"] = fallback_result["fallback_level"]
-            else:
-                result["fallback_applied"] = False
+    result = {
+        "queries": [queryInfo['query']],
+        "descriptions": [queryInfo['description']],
+    }
 
-            # Shuffle results before serialization
-            for queryResult in rawResults:
-                random.shuffle(queryResult)
+    rawResults = executeQueriesSQL(result["queries"])
 
-            result["results"] = [
-                [serializeProjectMinimal(p) for p in queryResult]
-                for queryResult in rawResults
-            ]
-            result["contextProject"] = contextProject
+    # Check if any results were found
+    has_results = any(len(queryResult) > 0 for queryResult in rawResults)
 
-            return result
+    # Apply fallback system if no results
+    if not has_results:
+        log.debug("No contextual results found - applying fallback system")
+        rawResults = applyFallbackToResult(result)
+    else:
+        result["fallback_applied"] = False
+
+        # "same X" results: closest projects to the current one first
+        if contextOperator == 'equal':
+            rawResults = [rankBySimilarity(project.id, queryResult) for queryResult in rawResults]
+
+    result["results"] = serializeResults(rawResults)
+    result["contextProject"] = contextProject
+
+    return result
+
+def rankBySimilarity(projectId, rows):
+    from dataGen.similarity import getSimilarityIndex
+
+    rowsById = {row['id']: row for row in rows}
+    return [rowsById[pid] for pid in getSimilarityIndex().rank(projectId, list(rowsById))]
+
+def applyFallbackToResult(result):
+    """
+    Replace the result queries/descriptions with the fallback ones.
+    Returns the fallback raw results.
+    """
+    fallback_result = applyFallback(result["queries"])
+
+    # Update result with fallback data
+    result["queries"] = fallback_result["queries"]
+    result["descriptions"] = fallback_result["descriptions"]
+    result["fallback_applied"] = True
+    result["fallback_level"] = fallback_result["fallback_level"]
+
+    return fallback_result["results"]
+
+def buildKeywordExpansion(queries, rawResults):
+    """
+    With 2 or fewer main terms and less than 10 total projects, look for a keyword
+    search group joining all terms.
+    Returns (queryInfo, results) or None.
+    """
+    from dataGen.queryFallback import extractTermsFromQueries, buildMultiTermFallback, hasDuplicateProjects
+
+    # Count total projects and main terms
+    total_projects = sum(len(queryResult) for queryResult in rawResults)
+    extracted = extractTermsFromQueries(queries)
+    main_terms = extracted['terms']
+    date_filter = extracted['dateTerm']
+
+    log.debug("Total projects: %d, main terms count: %d", total_projects, len(main_terms))
+
+    if not (len(main_terms) <= 2 and len(main_terms) > 0 and total_projects < 10):
+        keywordExpansions.inc(outcome='not_needed')
+        return None
+
+    log.debug("Checking keyword expansion group for terms: %s", main_terms)
+
+    # Build keyword search with OR joining all terms
+    keyword_query_info = buildMultiTermFallback(main_terms, date_filter)
+    keyword_results = executeQueriesSQL([keyword_query_info['query']])[0]
+
+    # Only add if we got results from keyword search and they're not duplicates
+    if not keyword_results:
+        keywordExpansions.inc(outcome='empty')
+        return None
+
+    # Check if keyword results are duplicate of existing results
+    existingGroups = [{'results': r} for r in rawResults]
+    if hasDuplicateProjects(keyword_results, existingGroups):
+        log.debug("Skipping keyword expansion - duplicate projects (%d projects)", len(keyword_results))
+        keywordExpansions.inc(outcome='duplicate')
+        return None
+
+    log.debug("Adding keyword expansion with %d additional projects", len(keyword_results))
+    keywordExpansions.inc(outcome='hit')
+    return (keyword_query_info, keyword_results)
+
+# ==================================================
+# main
+# ==================================================
+
+def handleRankedQuery(data):
+    """
+    Ranked search path: one BM25 lookup over the prompt, without the LLM.
+    The query text sent back (and later used as PREV_SQL) is the equivalent keywords search.
+    """
+    words, year = queryWords(data["currentPrompt"])
+    annotate(path='ranked', words=words, year=year)
+
+    if not words:
+        result = {"queries": [], "descriptions": []}
+        rawResults = applyFallbackToResult(result)
+        result["results"] = serializeResults(rawResults)
+        return result
+
+    queryInfo = buildMultiTermFallback(words, year)
+    result = {
+        "queries": [queryInfo['query']],
+        "descriptions": [f"Resultados mais relevantes para '{' '.join(words)}'"],
+    }
+
+    rawResults = [searchRanked(' '.join(words), year=year)]
+
+    if not rawResults[0]:
+        log.debug("No ranked results found - applying fallback system")
+        rawResults = applyFallbackToResult(result)
+    else:
+        result["fallback_applied"] = False
+
+    result["results"] = serializeResults(rawResults)
+
+    return result
+
+def handleQuery(data):
+    log.debug("Query request: %s", data)
+
+    currentPrompt = data["currentPrompt"]
+
+    # Ranked search requested: BM25 lookup instead of the LLM
+    if data.get("mode") == "ranked":
+        return handleRankedQuery(data)
+
+    # If contextual intent detected, build query directly in Python (fast path)
+    contextual = getContextualIntent(data)
+    if contextual:
+        return handleContextualQuery(*contextual)
 
     # Default path: Use LLM for normal queries
-    print("DEBUG: Using LLM for query generation")
+    log.debug("Using LLM for query generation")
+    annotate(path='llm')
     modelOutput = queryLLM(currentPrompt, data["previousQueries"])
-    print(modelOutput)
+    log.debug("Model output: %s", modelOutput)
 
     #interactionId = recordInteraction(data,modelOutput)
 
@@ -271,61 +482,115 @@ def handleQuery(data):
 
     # Apply fallback system if no results
     if not has_results:
-        print("DEBUG: No results found - applying fallback system")
-        fallback_result = applyFallback(result["queries"])
-
-        # Update result with fallback data
-        result["queries"] = fallback_result["queries"]
-        result["descriptions"] = fallback_result["descriptions"]
-        rawResults = fallback_result["results"]
-        result["fallback_applied"] = True
-        result["fallback_level"] = fallback_result["fallback_level"]
+        log.debug("No results found - applying fallback system")
+        rawResults = applyFallbackToResult(result)
     else:
         result["fallback_applied"] = False
 
         # Check if we should add keyword expansion
-        # Count total projects and main terms
-        from dataGen.queryFallback import extractTermsFromQueries, buildMultiTermFallback, hasDuplicateProjects
-
-        total_projects = sum(len(queryResult) for queryResult in rawResults)
-        extracted = extractTermsFromQueries(result["queries"])
-        main_terms = extracted['terms']
-        date_filter = extracted['dateTerm']
-
-        print(f"DEBUG: Total projects: {total_projects}, Main terms count: {len(main_terms)}")
-
-        # If 2 or fewer main terms and less than 10 total projects, add keyword search
-        if len(main_terms) <= 2 and len(main_terms) > 0 and total_projects < 10:
-            print(f"DEBUG: Checking keyword expansion group for terms: {main_terms}")
-
-            # Build keyword search with OR joining all terms
-            keyword_query_info = buildMultiTermFallback(main_terms, date_filter)
-            keyword_results = executeQueriesSQL([keyword_query_info['query']])[0]
-
-            # Only add if we got results from keyword search and they're not duplicates
-            if keyword_results and len(keyword_results) > 0:
-                # Check if keyword results are duplicate of existing results
-                existingGroups = [{'results': r} for r in rawResults]
-                isDuplicate = hasDuplicateProjects(keyword_results, existingGroups)
-
-                if isDuplicate:
-                    print(f"DEBUG: Skipping keyword expansion - duplicate projects ({len(keyword_results)} projects)")
-                else:
-                    print(f"DEBUG: Adding keyword expansion with {len(keyword_results)} additional projects")
-                    result["queries"].append(keyword_query_info['query'])
-                    result["descriptions"].append(keyword_query_info['description'])
-                    rawResults.append(keyword_results)
-
-    # Shuffle results before serialization
-    for queryResult in rawResults:
-        random.shuffle(queryResult)
-
-    # Minimize payload for explore results
-    result["results"] = [
-        [serializeProjectMinimal(project) for project in queryResult]
-        for queryResult in rawResults
-    ]
+        expansion = buildKeywordExpansion(result["queries"], rawResults)
+        if expansion:
+            keyword_query_info, keyword_results = expansion
+            result["queries"].append(keyword_query_info['query'])
+            result["descriptions"].append(keyword_query_info['description'])
+            rawResults.append(keyword_results)
+
+    # Shuffle and minimize payload for explore results
+    result["results"] = serializeResults(rawResults)
 
     #print(result)
 
-    return result
\ No newline at end of file
+    return result
+
+def handleQueryStream(data):
+    """
+    Streaming variant of handleQuery. Yields (event, payload) tuples:
+    - 'desc': a description, as soon as the model generates it
+    - 'group': a query with its results, as soon as the query line is parsed and run
+    - 'fallback': the fallback groups, replacing all previous groups (no results found)
+    - 'done': final flags (fallback_applied, fallback_level, contextProject)
+    """
+    log.debug("Query stream request: %s", data)
+
+    currentPrompt = data["currentPrompt"]
+
+    if data.get("mode") == "ranked":
+        yield from streamFinalResult(handleRankedQuery(data))
+        return
+
+    contextual = getContextualIntent(data)
+    if contextual:
+        result = handleContextualQuery(*contextual)
+        yield from streamFinalResult(result)
+        return
+
+    log.debug("Using LLM for query generation (streaming)")
+    annotate(path='llm-stream')
+
+    queries = []
+    descriptions = []
+    rawResults = []
+
+    for kind, value in parseModelLines(splitLines(streamLLM(currentPrompt, data["previousQueries"]))):
+        if kind == 'desc':
+            descriptions.append(value)
+            yield ('desc', {"index": len(descriptions) - 1, "description": value})
+            continue
+
+        queryResult = executeQueriesSQL([value])[0]
+        queries.append(value)
+        rawResults.append(queryResult)
+
+        index = len(queries) - 1
+        yield ('group', {
+            "index": index,
+            "query": value,
+            "description": descriptions[index] if index < len(descriptions) else None,
+            "results": serializeResults([list(queryResult)])[0]
+        })
+
+    result = {"queries": queries, "descriptions": descriptions}
+
+    if not any(len(queryResult) > 0 for queryResult in rawResults):
+        log.debug("No results found - applying fallback system")
+        fallbackResults = applyFallbackToResult(result)
+        yield ('fallback', {
+            "queries": result["queries"],
+            "descriptions": result["descriptions"],
+            "results": serializeResults(fallbackResults)
+        })
+    else:
+        result["fallback_applied"] = False
+
+        expansion = buildKeywordExpansion(queries, rawResults)
+        if expansion:
+            keyword_query_info, keyword_results = expansion
+            yield ('group', {
+                "index": len(queries),
+                "query": keyword_query_info['query'],
+                "description": keyword_query_info['description'],
+                "results": serializeResults([keyword_results])[0]
+            })
+
+    yield ('done', {
+        "fallback_applied": result["fallback_applied"],
+        "fallback_level": result.get("fallback_level")
+    })
+
+def streamFinalResult(result):
+    """
+    Emit an already complete result (contextual fast path) as stream events.
+    """
+    for index, query in enumerate(result["queries"]):
+        yield ('group', {
+            "index": index,
+            "query": query,
+            "description": result["descriptions"][index] if index < len(result["descriptions"]) else None,
+            "results": result["results"][index]
+        })
+
+    yield ('done', {
+        "fallback_applied": result["fallback_applied"],
+        "fallback_level": result.get("fallback_level"),
+        "contextProject": result.get("contextProject")
+    })
@@ -5,6 +5,11 @@
 
 import re
 
+from database.queryBuilder import Query, contains, allOf, anyOf
+from utilities.tracing.setup import getLogger, span
+
+log = getLogger('fallback')
+
 # ==================================================
 # Constants
 # ==================================================
@@ -29,7 +34,7 @@ def extractTermsFromQuery(query):
     Also detect if there's a date filter.
 
     Args:
-        query: SQL query string
+        query: SQL query string (or built Query)
 
     Returns:
         dict: {
@@ -44,6 +49,10 @@ def extractTermsFromQuery(query):
         'hasDateFilter': False
     }
 
+    # Built queries carry their predicates: no need to parse the SQL text
+    if isinstance(query, Query):
+        return extractTermsFromPredicates(query.predicates(), result)
+
     # Extract all terms between LIKE '%term%'
     # Pattern: LIKE '%something%' or LIKE "%something%"
     termPattern = r"LIKE\s+['\"]%([^%]+?)%['\"]"
@@ -67,6 +76,28 @@ def extractTermsFromQuery(query):
 
     return result
 
+def extractTermsFromPredicates(predicates, result):
+    """
+    Same extraction as extractTermsFromQuery, from a built query's predicates.
+    """
+    for predicate in predicates:
+        if predicate.op not in ('contains', 'notContains'):
+            continue
+
+        value = str(predicate.value)
+
+        if predicate.op == 'contains' and 'date' in predicate.columns and not result['dateTerm'] and re.match(r'^\d{4}', value):
+            result['dateTerm'] = value[:4]
+            result['hasDateFilter'] = True
+
+        term = value.strip()
+        # Skip if it's a year (4 digits)
+        if term and not re.match(r'^\d{4}$', term):
+            if term not in result['terms']:
+                result['terms'].append(term)
+
+    return result
+
 def extractTermsFromQueries(queries):
     """
     Extract all unique terms from a list of queries.
@@ -105,6 +136,12 @@ def extractTermsFromQueries(queries):
 # Fallback Level Methods
 # ==================================================
 
+def dateCondition(dateFilter):
+    """
+    Optional year/date filter shared by every fallback query (None when no filter).
+    """
+    return contains('date', dateFilter) if dateFilter else None
+
 def buildSingleTermFallback(term, dateFilter=None):
     """
     Level 1 Fallback: Single non-date term found.
@@ -124,13 +161,7 @@ def buildSingleTermFallback(term, dateFilter=None):
     queries = []
 
     for column in SEARCHABLE_COLUMNS:
-        baseQuery = f"SELECT * FROM projects WHERE {column} LIKE '%{term}%'"
-
-        # Add date filter if provided
-        if dateFilter:
-            baseQuery += f" AND date LIKE '%{dateFilter}%'"
-
-        baseQuery += ";"
+        query = Query(allOf(contains(column, term), dateCondition(dateFilter)))
 
         # Build description based on column
         columnDescriptions = {
@@ -148,7 +179,7 @@ def buildSingleTermFallback(term, dateFilter=None):
         }
 
         queries.append({
-            'query': baseQuery,
+            'query': query,
             'description': columnDescriptions.get(column, f"Projetos com '{term}' em {column}"),
             'column': column
         })
@@ -166,12 +197,7 @@ def buildKeywordsFallback(term, dateFilter=None):
     Returns:
         dict: Single query for keywords search
     """
-    query = f"SELECT * FROM projects WHERE keywords LIKE '%{term}%'"
-
-    if dateFilter:
-        query += f" AND date LIKE '%{dateFilter}%'"
-
-    query += ";"
+    query = Query(allOf(contains('keywords', term), dateCondition(dateFilter)))
 
     return {
         'query': query,
@@ -192,15 +218,9 @@ def buildMultiTermFallback(terms, dateFilter=None):
         dict: Query joining all terms with OR
     """
     # Build OR conditions for all terms
-    conditions = [f"keywords LIKE '%{term}%'" for term in terms]
-    whereClause = " OR ".join(conditions)
-
-    query = f"SELECT * FROM projects WHERE ({whereClause})"
+    conditions = anyOf(*[contains('keywords', term) for term in terms])
 
-    if dateFilter:
-        query += f" AND date LIKE '%{dateFilter}%'"
-
-    query += ";"
+    query = Query(allOf(conditions, dateCondition(dateFilter)))
 
     termsStr = "', '".join(terms)
     return {
@@ -222,26 +242,17 @@ def buildSplitWordsFallback(term, dateFilter=None, maxWords=5):
     Returns:
         dict: Query with split words joined by OR, or None if single word
     """
-    # Split by spaces and filter out stop words/very short words
-    words = [w.strip() for w in term.split() if len(w.strip()) > 2]
+    # Split by spaces and filter out very short words (limited to maxWords)
+    words = splitTermWords(term, maxWords)
 
     # Only use this fallback if we have multiple meaningful words
-    if len(words) <= 1:
+    if not words:
         return None
 
-    # Limit to maxWords
-    words = words[:maxWords]
-
     # Build OR conditions for all words
-    conditions = [f"keywords LIKE '%{word}%'" for word in words]
-    whereClause = " OR ".join(conditions)
+    conditions = anyOf(*[contains('keywords', word) for word in words])
 
-    query = f"SELECT * FROM projects WHERE ({whereClause})"
-
-    if dateFilter:
-        query += f" AND date LIKE '%{dateFilter}%'"
-
-    query += ";"
+    query = Query(allOf(conditions, dateCondition(dateFilter)))
 
     wordsStr = "', '".join(words)
     return {
@@ -251,6 +262,36 @@ def buildSplitWordsFallback(term, dateFilter=None, maxWords=5):
         'words': words
     }
 
+def buildRankedFallback(text, dateFilter=None, terms=None):
+    """
+    BM25 lookup over the project text (keywords and infoPool included).
+
+    Args:
+        text: Free text to search
+        dateFilter: Optional year to filter by
+        terms: Terms shown in the query text (defaults to the text's words)
+
+    Returns:
+        dict: Group with ranked results, or None when nothing matches
+    """
+    from dataGen.ranking import searchRanked
+
+    year = dateFilter if dateFilter and re.fullmatch(r'\d{4}', str(dateFilter)) else None
+    results = searchRanked(text, year=year)
+
+    if not results:
+        return None
+
+    # the shown query is the equivalent keywords search (sent back to the LLM as PREV_SQL)
+    shownQuery = buildMultiTermFallback(terms or text.split(), dateFilter)
+
+    return {
+        'query': shownQuery['query'],
+        'description': f"Resultados mais relevantes para '{text}'",
+        'results': results,
+        'column': 'ranked'
+    }
+
 def buildRandomFallback():
     """
     Final Fallback: Return 100 random projects.
@@ -259,11 +300,75 @@ def buildRandomFallback():
         dict: Query for random projects
     """
     return {
-        'query': "SELECT * FROM projects ORDER BY RANDOM() LIMIT 100;",
+        'query': Query(suffix="ORDER BY RANDOM() LIMIT 100"),
         'description': "Sem potenciais resultados para a sua pesquisa. Continue a Explorar!",
         'column': 'random'
     }
 
+# ==================================================
+# Single-pass Level 1 Engine
+# ==================================================
+
+def splitTermWords(term, maxWords=5):
+    """
+    Meaningful words of a multi-word term, as used by buildSplitWordsFallback.
+    Returns an empty list for single-word terms.
+    """
+    words = [w.strip() for w in term.split() if len(w.strip()) > 2]
+    return words[:maxWords] if len(words) > 1 else []
+
+def containsTerm(value, term):
+    """
+    Case-insensitive substring check mirroring the executed LIKE/MATCH semantics.
+    """
+    return isinstance(value, str) and term.lower() in value.lower()
+
+def buildSingleTermScan(term, dateFilter=None):
+    """
+    Build one query returning every project that any level 1 group could match:
+    the term in a searchable column or in keywords, or one of its split words in keywords.
+
+    Args:
+        term: The single search term
+        dateFilter: Optional year/date to filter by
+
+    Returns:
+        Query: built query
+    """
+    conditions = [contains(SEARCHABLE_COLUMNS + ['keywords'], term)]
+    conditions += [contains('keywords', word) for word in splitTermWords(term)]
+
+    return Query(allOf(anyOf(*conditions), dateCondition(dateFilter)))
+
+def scanSingleTerm(term, dateFilter=None):
+    """
+    Run the level 1 search in a single pass and tag each row with every column it matched.
+
+    Args:
+        term: The single search term
+        dateFilter: Optional year/date to filter by
+
+    Returns:
+        dict: {column: [matching projects]} for every SEARCHABLE_COLUMNS entry,
+              plus 'keywords' and 'keywords_split'
+    """
+    from database.setup import executeQueriesSQL
+
+    rows = executeQueriesSQL([buildSingleTermScan(term, dateFilter)])[0]
+    words = splitTermWords(term)
+
+    tagged = {column: [] for column in SEARCHABLE_COLUMNS + ['keywords', 'keywords_split']}
+
+    for row in rows:
+        for column in SEARCHABLE_COLUMNS + ['keywords']:
+            if containsTerm(row.get(column), term):
+                tagged[column].append(row)
+
+        if any(containsTerm(row.get('keywords'), word) for word in words):
+            tagged['keywords_split'].append(row)
+
+    return tagged
+
 # ==================================================
 # Helper Functions
 # ==================================================
@@ -310,6 +415,20 @@ def hasDuplicateProjects(newResults, existingGroups):
 # ==================================================
 
 def applyFallback(originalQueries):
+    """
+    Multi-level fallback (see runFallbackLevels), counted by the level it reached.
+    """
+    from utilities.metrics.setup import fallbackLevels
+
+    with span('fallback') as current:
+        result = runFallbackLevels(originalQueries)
+        current.set(level=result['fallback_level'])
+
+    fallbackLevels.inc(level=result['fallback_level'])
+
+    return result
+
+def runFallbackLevels(originalQueries):
     """
     Apply multi-level fallback based on terms extracted from queries.
 
@@ -331,84 +450,93 @@ def applyFallback(originalQueries):
     terms = extracted['terms']
     dateFilter = extracted['dateTerm']
 
-    print(f"DEBUG FALLBACK: Extracted terms: {terms}")
-    print(f"DEBUG FALLBACK: Date filter: {dateFilter}")
+    log.debug("Extracted terms: %s", terms)
+    log.debug("Date filter: %s", dateFilter)
 
     nonDateCount = len(terms)
 
     # LEVEL 1: Single non-date term - search all columns
     if nonDateCount == 1:
         term = terms[0]
-        print(f"DEBUG FALLBACK: Single term '{term}' - searching all columns")
+        log.debug("Single term %r - searching all columns", term)
 
         fallbackQueries = buildSingleTermFallback(term, dateFilter)
 
-        # Execute and collect results
-        allResults = executeQueriesSQL([q['query'] for q in fallbackQueries])
+        # One scan over the table, rows tagged with every column they matched
+        tagged = scanSingleTerm(term, dateFilter)
 
-        # Filter out empty results and keep only groups with results
-        # Also check for duplicate project sets
+        # Keep only groups with results, skipping duplicate project sets
         validGroups = []
-        for i, res in enumerate(allResults):
+        for fallbackQuery in fallbackQueries:
+            res = tagged[fallbackQuery['column']]
             if res and len(res) > 0:
                 # Only add if this group doesn't have the same projects as an existing group
                 isDuplicate = hasDuplicateProjects(res, validGroups)
                 if isDuplicate:
-                    print(f"DEBUG FALLBACK: Skipping duplicate group for column '{fallbackQueries[i]['column']}' with {len(res)} projects")
+                    log.debug("Skipping duplicate group for column %r with %d projects", fallbackQuery['column'], len(res))
                 else:
-                    print(f"DEBUG FALLBACK: Adding group for column '{fallbackQueries[i]['column']}' with {len(res)} projects")
+                    log.debug("Adding group for column %r with %d projects", fallbackQuery['column'], len(res))
                     validGroups.append({
-                        'query': fallbackQueries[i]['query'],
-                        'description': fallbackQueries[i]['description'],
+                        'query': fallbackQuery['query'],
+                        'description': fallbackQuery['description'],
                         'results': res
                     })
 
-        print(f"DEBUG FALLBACK: Found {len(validGroups)} unique groups with results")
+        log.debug("Found %d unique groups with results", len(validGroups))
 
         # Always check keywords fallback, regardless of how many groups we have
-        print(f"DEBUG FALLBACK: Checking keywords fallback (currently have {len(validGroups)} groups)")
+        log.debug("Checking keywords fallback (currently have %d groups)", len(validGroups))
         keywordsQuery = buildKeywordsFallback(term, dateFilter)
-        keywordsResults = executeQueriesSQL([keywordsQuery['query']])[0]
+        keywordsResults = tagged['keywords']
 
         if keywordsResults and len(keywordsResults) > 0:
             # Only add if not duplicate
             isDuplicate = hasDuplicateProjects(keywordsResults, validGroups)
             if isDuplicate:
-                print(f"DEBUG FALLBACK: Skipping keywords fallback - duplicate projects ({len(keywordsResults)} projects)")
+                log.debug("Skipping keywords fallback - duplicate projects (%d projects)", len(keywordsResults))
             else:
-                print(f"DEBUG FALLBACK: Adding keywords fallback with {len(keywordsResults)} projects")
+                log.debug("Adding keywords fallback with %d projects", len(keywordsResults))
                 validGroups.append({
                     'query': keywordsQuery['query'],
                     'description': keywordsQuery['description'],
                     'results': keywordsResults
                 })
         else:
-            print(f"DEBUG FALLBACK: Keywords fallback returned no results")
+            log.debug("Keywords fallback returned no results")
+
+        # If still no results, one ranked lookup over all the project text (infoPool included)
+        if not validGroups:
+            log.debug("No results found - trying ranked search")
+            rankedGroup = buildRankedFallback(term, dateFilter)
+
+            if rankedGroup:
+                log.debug("Ranked search found %d projects", len(rankedGroup['results']))
+                validGroups.append(rankedGroup)
 
         # If still no results, try splitting multi-word terms
         if not validGroups:
-            print(f"DEBUG FALLBACK: No results found - trying split words fallback")
+            log.debug("No results found - trying split words fallback")
             splitWordsQuery = buildSplitWordsFallback(term, dateFilter)
 
             if splitWordsQuery:
-                print(f"DEBUG FALLBACK: Split '{term}' into words: {splitWordsQuery['words']}")
-                splitWordsResults = executeQueriesSQL([splitWordsQuery['query']])[0]
+                log.debug("Split %r into words: %s", term, splitWordsQuery['words'])
+                splitWordsResults = tagged['keywords_split']
 
                 if splitWordsResults and len(splitWordsResults) > 0:
-                    print(f"DEBUG FALLBACK: Split words fallback found {len(splitWordsResults)} projects")
+                    log.debug("Split words fallback found %d projects", len(splitWordsResults))
                     validGroups.append({
                         'query': splitWordsQuery['query'],
                         'description': splitWordsQuery['description'],
                         'results': splitWordsResults
                     })
                 else:
-                    print(f"DEBUG FALLBACK: Split words fallback returned no results")
+                    log.debug("Split words fallback returned no results")
             else:
-                print(f"DEBUG FALLBACK: Term '{term}' is single word - skipping split words fallback")
+                log.debug("Term %r is single word - skipping split words fallback", term)
 
         # If still no results, go to final fallback
         if not validGroups:
-            print(f"DEBUG FALLBACK: No results found - returning random projects")
+            log.debug("No results found - returning random projects")
             randomQuery = buildRandomFallback()
             randomResults = executeQueriesSQL([randomQuery['query']])[0]
 
@@ -428,7 +556,18 @@ def applyFallback(originalQueries):
 
     # LEVEL 2: Multiple non-date terms - search keywords with OR
     elif nonDateCount > 1:
-        print(f"DEBUG FALLBACK: Multiple terms {terms} - searching keywords with OR")
+        log.debug("Multiple terms %s - searching keywords with OR", terms)
+
+        # Ranked lookup first: best matches over all the project text, in relevance order
+        rankedGroup = buildRankedFallback(' '.join(terms), dateFilter, terms)
+
+        if rankedGroup:
+            return {
+                'queries': [rankedGroup['query']],
+                'descriptions': [rankedGroup['description']],
+                'results': [rankedGroup['results']],
+                'fallback_level': 'ranked'
+            }
 
         multiTermQuery = buildMultiTermFallback(terms, dateFilter)
         multiTermResults = executeQueriesSQL([multiTermQuery['query']])[0]
@@ -442,7 +581,7 @@ def applyFallback(originalQueries):
             }
 
         # No results - go to final fallback
-        print(f"DEBUG FALLBACK: No results found - returning random projects")
+        log.debug("No results found - returning random projects")
         randomQuery = buildRandomFallback()
         randomResults = executeQueriesSQL([randomQuery['query']])[0]
 
@@ -455,7 +594,7 @@ def applyFallback(originalQueries):
 
     # LEVEL 3: No meaningful terms - return random
     else:
-        print(f"DEBUG FALLBACK: No terms found - returning random projects")
+        log.debug("No terms found - returning random projects")
         randomQuery = buildRandomFallback()
         randomResults = executeQueriesSQL([randomQuery['query']])[0]
 
@@ -0,0 +1,191 @@
+'''
+/dataGen/ranking.py
+-> BM25 ranked retrieval over the projects' text, held in compact arrays per catalog version
+'''
+
+import unicodedata
+import re
+
+import numpy as np
+
+from dataGen.catalogIndex import CatalogIndex, toCSR, topK
+
+# ==================================================
+# global vars
+# ==================================================
+
+# indexed fields and their weight (a token in the title counts as 3 occurrences)
+RANKED_FIELDS = {
+    'title': 3, 'author': 2, 'category': 2, 'location': 1,
+    'instruments': 2, 'keywords': 2, 'infoPool': 1,
+    'direction': 1, 'sound': 1, 'production': 1, 'research': 1,
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+MIN_TOKEN_LENGTH = 2
+DEFAULT_K = 30
+
+tokenPattern = re.compile(r'\w+')
+
+# ==================================================
+# tokens
+# ==================================================
+
+def foldText(text):
+    """
+    Lowercase and strip accents.
+    """
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+def getStopwords():
+    from dataGen.suggestions import wordsToIgnore
+    return {foldText(word) for word in wordsToIgnore}
+
+def tokenize(text, stopwords):
+    if not isinstance(text, str):
+        return []
+    return [
+        token for token in tokenPattern.findall(foldText(text))
+        if len(token) >= MIN_TOKEN_LENGTH and token not in stopwords
+    ]
+
+def queryWords(text):
+    """
+    Words of a prompt worth searching (original spelling, stopwords and years removed)
+    and the year it mentions, if any: (words, year).
+    """
+    stopwords = getStopwords()
+    words, year = [], None
+
+    for word in tokenPattern.findall(text or ''):
+        if re.fullmatch(r'(19|20)\d{2}', word):
+            year = year or word
+        elif len(word) >= MIN_TOKEN_LENGTH and foldText(word) not in stopwords:
+            words.append(word)
+
+    return list(dict.fromkeys(words)), year
+
+# ==================================================
+# index
+# ==================================================
+
+class RankedResults(list):
+    """
+    Result group already ordered by relevance: not shuffled when serialized, scores kept aside.
+    """
+
+    def __init__(self, rows, scores):
+        super().__init__(rows)
+        self.scores = scores
+
+class BM25Index:
+    """
+    Inverted index in CSR form: postings of term t are docs[indptr[t]:indptr[t + 1]]
+    with weighted term frequencies tf[...]. A query adds up each term's BM25 contribution
+    into one score vector.
+    """
+
+    def __init__(self, catalog):
+        self.version = catalog.version
+        self.stopwords = getStopwords()
+        self.ids = np.array([record.id for record in catalog.records], dtype=np.int64)
+        self.years = np.array(
+            [record.date.year if record.date else 0 for record in catalog.records], dtype=np.int32
+        )
+
+        vocabulary = {}
+        # per term: the documents holding it, and its weighted frequency in each
+        postings, frequencies = [], []
+        docLength = np.zeros(len(self.ids), dtype=np.float32)
+
+        for doc, record in enumerate(catalog.records):
+            counts = {}
+            for field, weight in RANKED_FIELDS.items():
+                for token in tokenize(getattr(record, field, None), self.stopwords):
+                    counts[token] = counts.get(token, 0) + weight
+
+            for token, count in counts.items():
+                term = vocabulary.setdefault(token, len(vocabulary))
+                if term == len(postings):
+                    postings.append([])
+                    frequencies.append([])
+                postings[term].append(doc)
+                frequencies[term].append(count)
+
+            docLength[doc] = sum(counts.values())
+
+        self.vocabulary = vocabulary
+        self.indptr, self.docs = toCSR(postings)
+        _, self.tf = toCSR(frequencies, dtype=np.float32)
+
+        documentFrequency = np.diff(self.indptr).astype(np.float32)
+        total = len(self.ids)
+        self.idf = np.log(1 + (total - documentFrequency + 0.5) / (documentFrequency + 0.5)).astype(np.float32)
+
+        averageLength = docLength.mean() if total else 1.0
+        # per-document part of the BM25 denominator
+        self.norm = (BM25_K1 * (1 - BM25_B + BM25_B * docLength / max(averageLength, 1e-6))).astype(np.float32)
+
+    def queryTerms(self, text):
+        terms = [self.vocabulary.get(token) for token in tokenize(text, self.stopwords)]
+        return list(dict.fromkeys(term for term in terms if term is not None))
+
+    def search(self, text, k=DEFAULT_K, year=None):
+        """
+        Top-k projects for a free-text query. Returns [(id, score)], best first.
+        """
+        terms = self.queryTerms(text)
+        if not terms:
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+
+        for term in terms:
+            start, end = self.indptr[term], self.indptr[term + 1]
+            docs, tf = self.docs[start:end], self.tf[start:end]
+            scores[docs] += self.idf[term] * tf * (BM25_K1 + 1) / (tf + self.norm[docs])
+
+        if year:
+            scores[self.years != int(year)] = 0
+
+        candidates = topK(scores, np.flatnonzero(scores > 0), k)
+        return [(int(self.ids[doc]), float(scores[doc])) for doc in candidates]
+
+    def describe(self):
+        return (
+            f"BM25 index v{self.version}: {len(self.ids)} projects, "
+            f"{len(self.vocabulary)} terms, {len(self.docs)} postings"
+        )
+
+# ==================================================
+# build and access
+# ==================================================
+
+rankedIndex = CatalogIndex(BM25Index)
+
+def rebuildRankedIndex(catalog):
+    return rankedIndex.rebuild(catalog)
+
+def getRankedIndex():
+    return rankedIndex.get()
+
+def searchRanked(text, k=DEFAULT_K, year=None):
+    """
+    Ranked lookup as a result group: RankedResults of project dicts, best first.
+    """
+    from database.catalog import getCatalog
+
+    catalog = getCatalog()
+    rows, scores = [], []
+
+    for pid, score in getRankedIndex().search(text, k=k, year=year):
+        record = catalog.get(pid)
+        if record is None:
+            continue
+        rows.append({"id": record.id, "title": record.title, "author": record.author, "category": record.category})
+        scores.append(round(score, 4))
+
+    return RankedResults(rows, scores)
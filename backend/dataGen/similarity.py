@@ -0,0 +1,155 @@
+'''
+/dataGen/similarity.py
+-> vectorized "more like this": sparse projects x tag tokens matrix, rebuilt for each catalog version
+'''
+
+import numpy as np
+
+from database.tagIndex import splitTags
+from dataGen.catalogIndex import CatalogIndex, toCSR, topK
+
+# ==================================================
+# global vars
+# ==================================================
+
+# multi-valued fields compared tag by tag, plus the publish year
+SIMILARITY_FIELDS = ['author', 'category', 'location', 'instruments', 'keywords', 'year']
+
+DEFAULT_K = 10
+
+# ==================================================
+# tokens
+# ==================================================
+
+def normalizeToken(value):
+    return ' '.join(value.casefold().split())
+
+def fieldTokens(record, field):
+    if field == 'year':
+        return [str(record.date.year)] if record.date else []
+    return list(dict.fromkeys(normalizeToken(tag) for tag in splitTags(getattr(record, field, None))))
+
+# ==================================================
+# index
+# ==================================================
+
+class SimilarityIndex:
+    """
+    Sparse token x project matrix in CSR form (postings of token t are
+    columns[indptr[t]:indptr[t + 1]]) with idf weights. A project's similarity to another
+    is the idf-weighted count of the tokens they share; filters are unions of postings.
+    """
+
+    def __init__(self, catalog):
+        self.version = catalog.version
+        self.ids = np.array([record.id for record in catalog.records], dtype=np.int64)
+        self.columnById = {record.id: i for i, record in enumerate(catalog.records)}
+
+        vocabulary = {}
+        postings = []
+        # transposed CSR, project -> its token rows (and each row's field)
+        projectRows, projectFields = [], []
+        self.projectPtr = np.zeros(len(self.ids) + 1, dtype=np.int64)
+
+        for column, record in enumerate(catalog.records):
+            for fieldIndex, field in enumerate(SIMILARITY_FIELDS):
+                for token in fieldTokens(record, field):
+                    row = vocabulary.setdefault((field, token), len(vocabulary))
+                    if row == len(postings):
+                        postings.append([])
+                    postings[row].append(column)
+                    projectRows.append(row)
+                    projectFields.append(fieldIndex)
+            self.projectPtr[column + 1] = len(projectRows)
+
+        self.projectRows = np.array(projectRows, dtype=np.int32)
+        self.projectFields = np.array(projectFields, dtype=np.int8)
+
+        self.vocabulary = vocabulary
+        self.indptr, self.columns = toCSR(postings)
+
+        documentFrequency = np.diff(self.indptr)
+        self.idf = np.log((1 + len(self.ids)) / (1 + documentFrequency)).astype(np.float32) + 1.0
+
+    def tokensOf(self, column, field=None):
+        start, end = self.projectPtr[column], self.projectPtr[column + 1]
+        rows = self.projectRows[start:end]
+        if field is None:
+            return rows
+        return rows[self.projectFields[start:end] == SIMILARITY_FIELDS.index(field)]
+
+    def postings(self, row):
+        return self.columns[self.indptr[row]:self.indptr[row + 1]]
+
+    def scores(self, column):
+        """
+        Similarity of every project to the project at 'column' (float32 vector).
+        """
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for row in self.tokensOf(column):
+            scores[self.postings(row)] += self.idf[row]
+        return scores
+
+    def sharesField(self, column, field):
+        """
+        Mask of the projects sharing at least one 'field' token with the project at 'column'.
+        """
+        mask = np.zeros(len(self.ids), dtype=bool)
+        for row in self.tokensOf(column, field):
+            mask[self.postings(row)] = True
+        return mask
+
+    def similar(self, projectId, k=DEFAULT_K, match=None, exclude=None):
+        """
+        Top-k projects most similar to 'projectId', optionally sharing a 'match' field value
+        and not sharing an 'exclude' field value. Returns [(id, score)], best first.
+        """
+        column = self.columnById.get(projectId)
+        if column is None:
+            return []
+
+        scores = self.scores(column)
+        mask = scores > 0
+        mask[column] = False
+
+        if match:
+            mask &= self.sharesField(column, match)
+        if exclude:
+            mask &= ~self.sharesField(column, exclude)
+
+        candidates = topK(scores, np.flatnonzero(mask), k)
+        return [(int(self.ids[c]), float(scores[c])) for c in candidates]
+
+    def rank(self, projectId, ids):
+        """
+        Order 'ids' by similarity to 'projectId' (stable between ties; unknown ids last).
+        """
+        column = self.columnById.get(projectId)
+        if column is None:
+            return list(ids)
+
+        scores = self.scores(column)
+
+        def order(pid):
+            known = self.columnById.get(pid)
+            return (1, 0.0) if known is None else (0, -scores[known])
+
+        return sorted(ids, key=order)
+
+    def describe(self):
+        return f"Similarity index v{self.version}: {len(self.ids)} projects x {len(self.vocabulary)} tokens"
+
+# ==================================================
+# build and access
+# ==================================================
+
+similarityIndex = CatalogIndex(SimilarityIndex)
+
+def rebuildSimilarityIndex(catalog):
+    return similarityIndex.rebuild(catalog)
+
+def getSimilarityIndex():
+    return similarityIndex.get()
+
+def getSimilarProjects(projectId, k=DEFAULT_K, match=None, exclude=None):
+    return getSimilarityIndex().similar(projectId, k=k, match=match, exclude=exclude)
@@ -0,0 +1,416 @@
+'''
+/dataGen/suggestionSets.py
+-> per-project suggestion candidates, precomputed after each import
+'''
+
+import threading
+import fcntl
+import json
+import time
+import os
+
+from database.setup import dbPath, getConnection, readPool
+from database.queryBuilder import Predicate, Group, TagPredicate, allOf
+from database.tagIndex import TAG_TABLE
+from utilities.tracing.setup import getLogger
+
+# ==================================================
+# global vars
+# ==================================================
+
+log = getLogger('suggestionSets')
+
+# ids of each distinct term (a tag value, a title word, a year...), stored once for every project using it
+POSTINGS_TABLE = 'suggestionPostings'
+# per project: its options with results, as expressions over posting ids (references, not id lists)
+SETS_TABLE = 'suggestionSetRefs'
+# catalog versions whose sets are complete
+BUILDS_TABLE = 'suggestionSetBuilds'
+
+# held (flock) while a process builds the sets: other workers wait, then find them built
+BUILD_LOCK_PATH = os.path.join(os.path.dirname(dbPath), 'suggestionSets.lock')
+
+# projects whose sets are written per (short) transaction
+WRITE_BATCH = 500
+
+buildLock = threading.Lock()
+
+# ==================================================
+# expressions
+# ==================================================
+
+# A condition is stored as an expression over postings:
+#   postingId                       projects with the term
+#   ['or', expr, ...]               union
+#   ['and', expr, ...]              intersection
+#   ['not', field, expr]            projects with a value in 'field' and not matching expr
+#                                   (SQL NOT LIKE / NOT IN over a nullable column)
+
+def postingIds(expr):
+    if isinstance(expr, int):
+        yield expr
+    elif expr[0] == 'not':
+        yield from postingIds(expr[2])
+    else:
+        for item in expr[1:]:
+            yield from postingIds(item)
+
+def matches(expr, pid, postings, catalog):
+    if isinstance(expr, int):
+        return pid in postings[expr]
+    if expr[0] == 'or':
+        return any(matches(item, pid, postings, catalog) for item in expr[1:])
+    if expr[0] == 'and':
+        return all(matches(item, pid, postings, catalog) for item in expr[1:])
+    return getattr(catalog.get(pid), expr[1]) is not None and not matches(expr[2], pid, postings, catalog)
+
+def estimate(expr, postings, catalog):
+    if isinstance(expr, int):
+        return len(postings[expr])
+    if expr[0] == 'or':
+        return sum(estimate(item, postings, catalog) for item in expr[1:])
+    if expr[0] == 'and':
+        return min(estimate(item, postings, catalog) for item in expr[1:])
+    return len(catalog)
+
+def candidates(expr, postings, catalog):
+    """
+    Ids that may match 'expr' (a superset), from its most selective positive part.
+    """
+    if isinstance(expr, int):
+        return postings[expr]
+    if expr[0] == 'or':
+        return (pid for item in expr[1:] for pid in candidates(item, postings, catalog))
+    if expr[0] == 'and':
+        smallest = min(expr[1:], key=lambda item: estimate(item, postings, catalog))
+        return candidates(smallest, postings, catalog)
+    return (record.id for record in catalog.records)
+
+def evaluate(expr, postings, catalog):
+    """
+    Ids matching 'expr', with set operations.
+    """
+    if isinstance(expr, int):
+        return postings[expr]
+    if expr[0] == 'or':
+        return set().union(*[evaluate(item, postings, catalog) for item in expr[1:]])
+
+    items = expr[1:] if expr[0] == 'and' else [expr]
+    positives = [evaluate(item, postings, catalog) for item in items if isinstance(item, int) or item[0] != 'not']
+    result = set.intersection(*sorted(positives, key=len)) if positives else {record.id for record in catalog.records}
+
+    for item in items:
+        if not isinstance(item, int) and item[0] == 'not':
+            field = item[1]
+            result = {
+                pid for pid in result.difference(evaluate(item[2], postings, catalog))
+                if getattr(catalog.get(pid), field) is not None
+            }
+
+    return result
+
+def resolve(expr, postings, catalog, excludeId):
+    """
+    Ids matching 'expr' except 'excludeId', ascending.
+    """
+    return sorted(pid for pid in evaluate(expr, postings, catalog) if pid != excludeId)
+
+def hasMatch(expr, postings, catalog, excludeId):
+    """
+    True if a project other than 'excludeId' matches 'expr'. Stops at the first one found.
+    """
+    return any(
+        pid != excludeId and matches(expr, pid, postings, catalog)
+        for pid in candidates(expr, postings, catalog)
+    )
+
+# ==================================================
+# storage
+# ==================================================
+
+def initSuggestionSets():
+    conn = getConnection()
+    try:
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {POSTINGS_TABLE} ("
+            "version INTEGER NOT NULL, "
+            "postingId INTEGER NOT NULL, "
+            "ids TEXT NOT NULL, "
+            "PRIMARY KEY (version, postingId))"
+        )
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {SETS_TABLE} ("
+            "version INTEGER NOT NULL, "
+            "projectId INTEGER NOT NULL, "
+            "data TEXT NOT NULL, "
+            "PRIMARY KEY (version, projectId))"
+        )
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {BUILDS_TABLE} ("
+            "version INTEGER PRIMARY KEY, "
+            "built_at REAL NOT NULL)"
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+def readStoredVersion():
+    """
+    Catalog version of the last complete build (None when there is none).
+    """
+    conn = getConnection()
+    try:
+        row = conn.execute(f"SELECT MAX(version) FROM {BUILDS_TABLE}").fetchone()
+    finally:
+        conn.close()
+
+    return row[0]
+
+def loadSuggestionSet(projectId, version):
+    """
+    Stored options of one project:
+    {'direct': {field: expr}, 'disruptive': {'match|exclude': [expr, usesDirectDescription]}},
+    or None when missing or built from another catalog version.
+    """
+    with readPool.connection() as conn:
+        row = conn.execute(
+            f"SELECT data FROM {SETS_TABLE} WHERE version = ? AND projectId = ?", (version, projectId)
+        ).fetchone()
+
+    return json.loads(row[0]) if row is not None else None
+
+def loadPostings(ids, version):
+    """
+    {postingId: set of project ids}, or None when one is missing (its build was replaced meanwhile).
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+
+    with readPool.connection() as conn:
+        rows = conn.execute(
+            f"SELECT postingId, ids FROM {POSTINGS_TABLE} "
+            f"WHERE version = ? AND postingId IN ({', '.join('?' * len(ids))})",
+            (version, *ids)
+        ).fetchall()
+
+    if len(rows) != len(ids):
+        return None
+
+    return {row[0]: set(json.loads(row[1])) for row in rows}
+
+# ==================================================
+# build
+# ==================================================
+
+class PostingIndex:
+    """
+    Turns conditions into expressions over postings, reading each distinct term once:
+    tag values from the tag table in one pass, other terms (words, years...) with one query each.
+    Terms are keyed on their compiled SQL, never on the display text.
+    """
+
+    def __init__(self, conn, catalog):
+        self.conn = conn
+        self.catalog = catalog
+        self.keys = {}
+        self.postings = {}
+        self.pending = []
+
+        self.tags = {}
+        for field, value, projectId in conn.execute(f"SELECT field, value, project_id FROM {TAG_TABLE}"):
+            self.tags.setdefault((field, value), []).append(projectId)
+
+    def posting(self, key, readIds):
+        postingId = self.keys.get(key)
+
+        if postingId is None:
+            ids = readIds()
+            postingId = self.keys[key] = len(self.keys)
+            self.postings[postingId] = set(ids)
+            self.pending.append((postingId, json.dumps(sorted(ids), separators=(',', ':'))))
+
+        return postingId
+
+    def tagPosting(self, field, value):
+        return self.posting(('tag', field, value), lambda: self.tags.get((field, value), []))
+
+    def sqlPosting(self, predicate):
+        whereSQL, params = predicate.compile()
+        return self.posting(
+            ('sql', whereSQL, tuple(params)),
+            lambda: [row[0] for row in self.conn.execute(f"SELECT id FROM projects WHERE {whereSQL}", params)]
+        )
+
+    def expression(self, condition):
+        if isinstance(condition, Group):
+            return [condition.joiner.lower(), *[self.expression(item) for item in condition.items]]
+
+        if isinstance(condition, TagPredicate):
+            if not condition.values:
+                return self.expression(condition.shown)
+
+            items = [self.tagPosting(condition.field, value) for value in condition.values]
+            expr = items[0] if len(items) == 1 else ['or' if condition.mode == 'any' else 'and', *items]
+            return ['not', condition.field, expr] if condition.negate else expr
+
+        if condition.op in ('notContains', 'notStartsWith'):
+            positive = Predicate(condition.columns, condition.op[3].lower() + condition.op[4:], condition.value)
+            return ['not', condition.column, self.sqlPosting(positive)]
+
+        return self.sqlPosting(condition)
+
+    def hasResults(self, expr, excludeId):
+        return hasMatch(expr, self.postings, self.catalog, excludeId)
+
+    def takePending(self):
+        pending, self.pending = self.pending, []
+        return pending
+
+def resolveMatch(field, project, index):
+    """
+    Same choice as buildQueryAndExecute: first candidate condition with results, otherwise the last.
+    Returns (condition, expr), or (None, None) when the field cannot be matched.
+    """
+    from dataGen.suggestions import matchCandidates
+
+    value = getattr(project, field, None)
+
+    if not value:
+        return None, None
+
+    condition, expr = None, None
+
+    for condition in matchCandidates(field, value):
+        expr = index.expression(condition)
+        if index.hasResults(expr, project.id):
+            break
+
+    return condition, expr
+
+def buildProjectSet(project, index):
+    """
+    {'direct': {field: expr}, 'disruptive': {'match|exclude': [expr, usesDirectDescription]}},
+    keeping only the options with results (once the project itself is left out).
+    """
+    from dataGen.suggestions import directOptions, disruptiveOptions, hasFieldData, excludeConditions
+
+    direct = {}
+    matches = {}
+
+    for opt in directOptions:
+        if not hasFieldData(opt["field"], project):
+            continue
+        condition, expr = matches[opt["field"]] = resolveMatch(opt["field"], project, index)
+        if expr is not None and index.hasResults(expr, project.id):
+            direct[opt["field"]] = expr
+
+    disruptive = {}
+
+    for opt in disruptiveOptions:
+        matchField, excludeField = opt["matchField"], opt["excludeField"]
+
+        if not hasFieldData(matchField, project):
+            continue
+
+        condition, matchExpr = matches.get(matchField) or resolveMatch(matchField, project, index)
+
+        if condition is None:
+            continue
+
+        excludeValue = getattr(project, excludeField, None)
+
+        if excludeValue:
+            expr = index.expression(allOf(condition, *excludeConditions(excludeField, excludeValue)))
+            if index.hasResults(expr, project.id):
+                disruptive[f"{matchField}|{excludeField}"] = [expr, False]
+        elif matchExpr is not None and index.hasResults(matchExpr, project.id):
+            # no exclude value: the plain match results are used, with a direct description
+            disruptive[f"{matchField}|{excludeField}"] = [matchExpr, True]
+
+    return {"direct": direct, "disruptive": disruptive}
+
+def writeBatch(index, version, sets):
+    """
+    New postings first, then the projects referencing them: a visible project row
+    always finds its postings.
+    """
+    conn = getConnection()
+    try:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {POSTINGS_TABLE} (version, postingId, ids) VALUES (?, ?, ?)",
+            [(version, postingId, ids) for postingId, ids in index.takePending()]
+        )
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {SETS_TABLE} (version, projectId, data) VALUES (?, ?, ?)",
+            [(version, projectId, json.dumps(data, separators=(',', ':'))) for projectId, data in sets]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+def clearVersion(version, keep):
+    """
+    Drop the rows of 'version' (keep=False) or of every other version (keep=True).
+    """
+    operator = '!=' if keep else '='
+    conn = getConnection()
+    try:
+        for table in (POSTINGS_TABLE, SETS_TABLE, BUILDS_TABLE):
+            conn.execute(f"DELETE FROM {table} WHERE version {operator} ?", (version,))
+        conn.commit()
+    finally:
+        conn.close()
+
+def rebuildSuggestionSets(catalog, onlyIfStale=False):
+    """
+    Compute every project's suggestion options for a catalog version and replace the stored sets.
+    One build runs at a time across processes; with onlyIfStale, a build already done is skipped.
+    """
+    with buildLock, open(BUILD_LOCK_PATH, 'a+') as lockFile:
+        fcntl.flock(lockFile, fcntl.LOCK_EX)
+
+        if onlyIfStale and readStoredVersion() == catalog.version:
+            return
+
+        start = time.time()
+
+        # leftovers of an interrupted build of this version
+        clearVersion(catalog.version, keep=False)
+
+        with readPool.connection() as conn:
+            index = PostingIndex(conn, catalog)
+            sets = []
+
+            for record in catalog.records:
+                sets.append((record.id, buildProjectSet(record, index)))
+                if len(sets) == WRITE_BATCH:
+                    writeBatch(index, catalog.version, sets)
+                    sets = []
+
+            writeBatch(index, catalog.version, sets)
+
+        clearVersion(catalog.version, keep=True)
+
+        conn = getConnection()
+        try:
+            conn.execute(f"INSERT INTO {BUILDS_TABLE} (version, built_at) VALUES (?, ?)", (catalog.version, time.time()))
+            conn.commit()
+        finally:
+            conn.close()
+
+    log.info(
+        "Suggestion sets v%s built for %d projects (%d distinct terms) in %.1fs.",
+        catalog.version, len(catalog), len(index.keys), time.time() - start
+    )
+
+def ensureSuggestionSets(catalog):
+    """
+    Rebuild in the background when the stored sets are missing or older than the catalog.
+    Workers booting together build them once: the others wait for the build lock and skip.
+    Requests fall back to live queries meanwhile.
+    """
+    if len(catalog) == 0 or readStoredVersion() == catalog.version:
+        return
+
+    threading.Thread(target=rebuildSuggestionSets, args=(catalog, True), daemon=True).start()
@@ -4,10 +4,18 @@
 '''
 
 from database.setup import executeQueriesSQL
+from database.queryBuilder import Query, contains, startsWith, notStartsWith, notEqual, allOf, anyOf, hasTag, hasAnyTag, lacksTag
 from database.models import serializeProjectMinimal
 from dataGen.descriptions import describeDirectSuggestion, describeDisruptiveSuggestion
+from utilities.metrics.setup import suggestionSeconds, suggestionsReturned, suggestionCandidates
+from utilities.tracing.setup import getLogger, span, annotate
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import contextvars
+import threading
 import random
 import asyncio
+import time
+import os
 
 # ignore when splitting by space
 wordsToIgnore = [
@@ -81,6 +89,101 @@ disruptiveOptions = [
     {"matchField": "date", "excludeField": "author"},
 ]
 
+log = getLogger('suggestions')
+
+# shared by every request: bounded query threads and one long-lived event loop
+ENGINE_WORKERS = int(os.getenv("SUGGESTIONS_WORKERS", 4))
+
+# query batches one request may have in flight at once, and queries per batch
+REQUEST_CONCURRENCY = int(os.getenv("SUGGESTIONS_REQUEST_CONCURRENCY", 2))
+BATCH_SIZE = int(os.getenv("SUGGESTIONS_BATCH_SIZE", 16))
+
+# seconds a request waits for its live suggestions before giving up on them
+LIVE_TIMEOUT = float(os.getenv("SUGGESTIONS_TIMEOUT", 10))
+
+engineExecutor = ThreadPoolExecutor(max_workers=ENGINE_WORKERS, thread_name_prefix="suggestions")
+engineLoop = None
+engineLock = threading.Lock()
+
+# ==================================================
+# engine
+# ==================================================
+
+def getEngineLoop():
+    """
+    Event loop running in a daemon thread, started on first use and reused by all requests.
+    """
+    global engineLoop
+    with engineLock:
+        if engineLoop is None:
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(engineExecutor)
+            threading.Thread(target=loop.run_forever, name="suggestions-loop", daemon=True).start()
+            engineLoop = loop
+        return engineLoop
+
+def runInEngine(loop, queries):
+    """
+    executeQueriesSQL on the engine executor, in a copy of the caller's context: executor
+    threads don't inherit it, and the 'sql' spans belong to the request's trace.
+    """
+    return loop.run_in_executor(engineExecutor, contextvars.copy_context().run, executeQueriesSQL, queries)
+
+class QueryBatcher:
+    """
+    Per-request query runner. Queries awaited in the same loop iteration are sent
+    together to executeQueriesSQL (one pooled connection per batch), and a query
+    repeated within the request (same compiled SQL and params, e.g. a disruptive option's
+    match) runs once.
+    """
+
+    def __init__(self, concurrency=REQUEST_CONCURRENCY, batchSize=BATCH_SIZE):
+        self.batchSize = batchSize
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.results = {}
+        self.pending = []
+
+    def execute(self, query):
+        key = query.key()
+        future = self.results.get(key)
+
+        if future is None:
+            future = self.results[key] = asyncio.get_running_loop().create_future()
+            if not self.pending:
+                asyncio.get_running_loop().call_soon(self.flush)
+            self.pending.append((query, future))
+
+        return asyncio.shield(future)
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        for i in range(0, len(pending), self.batchSize):
+            asyncio.ensure_future(self.run(pending[i:i + self.batchSize]))
+
+    async def run(self, batch):
+        loop = asyncio.get_running_loop()
+
+        async with self.semaphore:
+            try:
+                results = await runInEngine(loop, [query for query, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    return
+                # one bad query fails the whole batch: run them one by one so only it fails
+                log.warning("Suggestion query batch failed (%s), retrying its %d queries one by one.", e, len(batch))
+                for query, future in batch:
+                    try:
+                        rows = (await runInEngine(loop, [query]))[0]
+                    except Exception as queryError:
+                        future.set_exception(queryError)
+                    else:
+                        future.set_result(rows)
+                return
+
+        for (_, future), rows in zip(batch, results):
+            future.set_result(rows)
+
 # ==================================================
 # methods
 # ==================================================
@@ -97,26 +200,22 @@ def hasFieldData(field, project):
         return False
     return True
 
-async def buildQueryAndExecute(field, project):
-
-    value = getattr(project, field, None)
-
-    if not value:
-        return None, None
-
-    # Build exclusion clause to exclude current project
-    exclude_clause = f" AND id != {project.id}"
+def excludeCurrent(condition, project):
+    # every suggestion query excludes the current project (last condition, no terminator)
+    return Query(allOf(condition, notEqual('id', project.id)), terminator='')
 
+def matchCandidates(field, value):
+    """
+    Conditions matching projects that share 'field' with 'value', in the order they are tried:
+    the first one with results is used, otherwise the last one.
+    """
     # Special handling for date field
     if field == "date":
         try:
             year = value.strftime('%Y-%m-%d').split('-')[0]
-            query = f"SELECT * FROM projects WHERE date LIKE '{year}-%'{exclude_clause}"
-            #print(f"[Query - date year] {query}")
-            results = await asyncio.to_thread(executeQueriesSQL, [query])
-            return query, (results[0] if results else None)
         except:
-            return None, None
+            return []
+        return [startsWith('date', f"{year}-")]
 
     value_str = str(value)
 
@@ -124,42 +223,61 @@ async def buildQueryAndExecute(field, project):
     if ", " in value_str:
         # Split by ", " and create OR conditions
         elements = [elem.strip() for elem in value_str.split(", ")]
-        conditions = [f"{field} LIKE '%{elem}%'" for elem in elements if elem]
-        where_clause = " OR ".join(conditions)
-        query = f"SELECT * FROM projects WHERE ({where_clause}){exclude_clause}"
-        #print(f"[Query - comma split] {query}")
-        results = await asyncio.to_thread(executeQueriesSQL, [query])
-        return query, (results[0] if results else None)
-    else:
-        # Try exact match first
-        query_exact = f"SELECT * FROM projects WHERE {field} LIKE '%{value_str}%'{exclude_clause}"
-        #print(f"[Query - exact match] {query_exact}")
+        return [hasAnyTag(field, [elem for elem in elements if elem])]
 
-        # Execute query to check if it returns results
-        results = await asyncio.to_thread(executeQueriesSQL, [query_exact])
+    # Try exact match first, then split by space and filter out insignificant words
+    candidates = [hasTag(field, value_str)]
 
-        if results and results[0]:  # Has results
-            #print(f"[Query - exact match SUCCESS] Found {len(results[0])} results")
-            return query_exact, results[0]
-        else:
-            #print(f"[Query - exact match FAILED] No results, trying word split...")
-            # Split by space and filter out insignificant words
-            words = [word.strip() for word in value_str.split(" ")]
-            coreWords = [word for word in words if word.lower() not in wordsToIgnore and word]
-
-            if coreWords:
-                conditions = [f"{field} LIKE '%{word}%'" for word in coreWords]
-                where_clause = " OR ".join(conditions)
-                query = f"SELECT * FROM projects WHERE ({where_clause}){exclude_clause}"
-                #print(f"[Query - word split] {query}")
-                results = await asyncio.to_thread(executeQueriesSQL, [query])
-                return query, (results[0] if results else None)
-            else:
-                # Fallback to exact match if no significant words (already executed above)
-                #print(f"[Query - fallback to exact] {query_exact}")
-                return query_exact, (results[0] if results else None)
-
-async def getDirect(project):
+    words = [word.strip() for word in value_str.split(" ")]
+    coreWords = [word for word in words if word.lower() not in wordsToIgnore and word]
+
+    if coreWords:
+        candidates.append(anyOf(*[contains(field, word) for word in coreWords]))
+
+    return candidates
+
+def excludeConditions(field, value):
+    """
+    Conditions leaving out projects that share 'field' with 'value' (disruptive suggestions).
+    """
+    # Special handling for date field in exclude
+    if field == "date":
+        try:
+            year = value.strftime('%Y-%m-%d').split('-')[0]
+        except:
+            return []
+        return [notStartsWith('date', f"{year}-")]
+
+    value_str = str(value)
+
+    # Handle comma-separated values
+    if ", " in value_str:
+        elements = [elem.strip() for elem in value_str.split(", ")]
+        return [lacksTag(field, elem) for elem in elements if elem]
+
+    # Single value
+    return [lacksTag(field, value_str)]
+
+async def buildQueryAndExecute(field, project, batcher):
+
+    value = getattr(project, field, None)
+
+    if not value:
+        return None, None, None
+
+    query, results, matched = None, None, None
+
+    # 'matched' is the field condition alone (without the current project exclusion)
+    for matched in matchCandidates(field, value):
+        query = excludeCurrent(matched, project)
+        results = await batcher.execute(query)
+
+        if results:
+            break
+
+    return query, results, matched
+
+async def getDirect(project, batcher):
     # Pre-filter options to only include fields with data
     validOptions = [opt for opt in directOptions if hasFieldData(opt["field"], project)]
 
@@ -175,7 +293,7 @@ async def getDirect(project):
     candidates = validOptions[:candidateCount]
 
     # Execute all candidate queries concurrently using asyncio
-    tasks = [buildQueryAndExecute(opt["field"], project) for opt in candidates]
+    tasks = [buildQueryAndExecute(opt["field"], project, batcher) for opt in candidates]
     results_list = await asyncio.gather(*tasks, return_exceptions=True)
 
     # Map successful results
@@ -183,7 +301,7 @@ async def getDirect(project):
     for opt, result in zip(candidates, results_list):
         if isinstance(result, Exception):
             continue
-        query, results = result
+        query, results, _ = result
         if query and results:
             results_map[opt["field"]] = (query, results, opt)
 
@@ -222,14 +340,14 @@ async def getDirect(project):
 
     return selected
 
-async def executeDisruptiveQuery(option, project):
+async def executeDisruptiveQuery(option, project, batcher):
 
     # Pre-check if both fields have data
     if not hasFieldData(option["matchField"], project):
         return None
 
     # Build and execute match query for the matchField
-    match_query, match_results = await buildQueryAndExecute(option["matchField"], project)
+    match_query, match_results, match_condition = await buildQueryAndExecute(option["matchField"], project, batcher)
 
     if not match_query:
         return None
@@ -238,35 +356,18 @@ async def executeDisruptiveQuery(option, project):
     exclude_value = getattr(project, option["excludeField"], None)
 
     if exclude_value:
-        # Special handling for date field in exclude
-        if option["excludeField"] == "date":
-            try:
-                year = exclude_value.strftime('%Y-%m-%d').split('-')[0]
-                exclude_condition = f" AND date NOT LIKE '{year}-%'"
-            except:
-                exclude_condition = ""
-        else:
-            exclude_value_str = str(exclude_value)
-
-            # Handle comma-separated values
-            if ", " in exclude_value_str:
-                elements = [elem.strip() for elem in exclude_value_str.split(", ")]
-                not_conditions = [f"{option['excludeField']} NOT LIKE '%{elem}%'" for elem in elements if elem]
-                exclude_condition = " AND " + " AND ".join(not_conditions)
-            else:
-                # Single value
-                exclude_condition = f" AND {option['excludeField']} NOT LIKE '%{exclude_value_str}%'"
+        exclude_conditions = excludeConditions(option["excludeField"], exclude_value)
 
-        # Combine match query with exclude condition
-        final_query = match_query.replace(" AND id !=", exclude_condition + " AND id !=")
+        # Combine match condition with exclude conditions (the current project stays excluded last)
+        final_query = excludeCurrent(allOf(match_condition, *exclude_conditions), project)
 
         # Execute the disruptive query
-        results = await asyncio.to_thread(executeQueriesSQL, [final_query])
+        results = await batcher.execute(final_query)
 
-        if results and results[0]:
+        if results:
             # Generate dynamic description
             description = describeDisruptiveSuggestion(option["matchField"], option["excludeField"])
-            return (option, description, results[0])
+            return (option, description, results)
     else:
         # No exclude value, use match results (already executed)
         if match_results:
@@ -276,7 +377,7 @@ async def executeDisruptiveQuery(option, project):
 
     return None
 
-async def getDisruptive(project):
+async def getDisruptive(project, batcher):
     # Pre-filter options to only include those with valid match fields
     validOptions = [opt for opt in disruptiveOptions if hasFieldData(opt["matchField"], project)]
 
@@ -291,7 +392,7 @@ async def getDisruptive(project):
     candidates = validOptions[:candidateCount]
 
     # Execute all candidate queries concurrently using asyncio
-    tasks = [executeDisruptiveQuery(opt, project) for opt in candidates]
+    tasks = [executeDisruptiveQuery(opt, project, batcher) for opt in candidates]
     results_list_raw = await asyncio.gather(*tasks, return_exceptions=True)
 
     # Filter out None and exceptions
@@ -325,21 +426,136 @@ async def getDisruptive(project):
 
     return selected
 
+# ==================================================
+# precomputed sets
+# ==================================================
+
+def minimalProject(catalog, projectId):
+    record = catalog.get(projectId)
+    return serializeProjectMinimal({
+        "id": record.id, "title": record.title, "author": record.author, "category": record.category
+    })
+
+def selectPrecomputed(project, stored):
+    """
+    Same selection as getDirect / getDisruptive, over the stored options.
+    Returns [(description, expr)].
+    """
+    # direct: top weighted fields with data, then weighted sampling among those with results
+    validOptions = [opt for opt in directOptions if hasFieldData(opt["field"], project)]
+    validOptions.sort(key=lambda x: x["p"], reverse=True)
+
+    available = [opt for opt in validOptions[:nDirect * 2] if opt["field"] in stored["direct"]]
+    weights = [opt["p"] for opt in available]
+
+    selected = []
+    for _ in range(min(nDirect, len(available))):
+        selected_idx = random.choices(range(len(available)), weights=weights, k=1)[0]
+        opt = available.pop(selected_idx)
+        weights.pop(selected_idx)
+
+        selected.append((describeDirectSuggestion(None, opt["field"]), stored["direct"][opt["field"]]))
+
+    # disruptive: random candidates with results, then a random pick
+    validOptions = [opt for opt in disruptiveOptions if hasFieldData(opt["matchField"], project)]
+    random.shuffle(validOptions)
+
+    results_list = []
+    for opt in validOptions[:nDisruptive * 3]:
+        entry = stored["disruptive"].get(f"{opt['matchField']}|{opt['excludeField']}")
+        if entry:
+            results_list.append((opt, entry))
+
+    for opt, (expr, usesDirectDescription) in random.sample(results_list, min(nDisruptive, len(results_list))):
+        if usesDirectDescription:
+            description = describeDirectSuggestion(None, opt["matchField"])
+        else:
+            description = describeDisruptiveSuggestion(opt["matchField"], opt["excludeField"])
+
+        selected.append((description, expr))
+
+    return selected
+
+def getPrecomputedSuggestions(project):
+    """
+    Suggestions from the sets built after the last import, or None when they are not ready.
+    Only the postings of the selected options are read.
+    """
+    from database.catalog import getCatalog
+    from dataGen.suggestionSets import loadSuggestionSet, loadPostings, postingIds, resolve
+
+    catalog = getCatalog()
+    stored = loadSuggestionSet(project.id, catalog.version)
+
+    if stored is None:
+        return None
+
+    selected = selectPrecomputed(project, stored)
+    postings = loadPostings([postingId for _, expr in selected for postingId in postingIds(expr)], catalog.version)
+
+    if postings is None:
+        return None
+
+    return [
+        {
+            "description": description,
+            "projects": [minimalProject(catalog, pid) for pid in resolve(expr, postings, catalog, project.id)]
+        }
+        for description, expr in selected
+    ]
+
 # ==================================================
 # main
 # ==================================================
 
 def getSuggestions(project):
+    start = time.perf_counter()
+
+    with span('suggestions.precomputed'):
+        result = getPrecomputedSuggestions(project)
+
+    if result is None:
+        # Run on the shared engine loop instead of a new loop per request
+        with span('suggestions.live'):
+            # the request's context (and so its trace) follows the coroutine onto the engine loop
+            future = contextvars.copy_context().run(
+                asyncio.run_coroutine_threadsafe, _getSuggestionsAsync(project), getEngineLoop()
+            )
+            try:
+                result = future.result(timeout=LIVE_TIMEOUT)
+            except FutureTimeoutError:
+                # a stuck query must not hold the request thread: answer without suggestions
+                future.cancel()
+                log.warning("Live suggestions for project %s timed out after %.0fs.", project.id, LIVE_TIMEOUT)
+                result = []
+        recordSuggestionMetrics(result, 'live', start)
+        return result
+
+    # Shuffle projects within each suggestion, then the suggestions themselves
+    for suggestion in result:
+        random.shuffle(suggestion["projects"])
+    random.shuffle(result)
+
+    recordSuggestionMetrics(result, 'precomputed', start)
 
-    # Run async functions in sync context
-    return asyncio.run(_getSuggestionsAsync(project))
+    return result
+
+def recordSuggestionMetrics(result, source, start):
+    annotate(source=source, suggestions=len(result))
+    suggestionSeconds.observe(time.perf_counter() - start, source=source)
+    suggestionsReturned.observe(len(result), source=source)
+    for suggestion in result:
+        suggestionCandidates.observe(len(suggestion["projects"]), source=source)
 
 async def _getSuggestionsAsync(project):
 
+    # one batcher per request: queries of both branches are batched and deduplicated together
+    batcher = QueryBatcher()
+
     # Get 3 direct and 2 disruptive suggestions concurrently
     direct, disruptive = await asyncio.gather(
-        getDirect(project),
-        getDisruptive(project)
+        getDirect(project, batcher),
+        getDisruptive(project, batcher)
     )
 
     # Combine results
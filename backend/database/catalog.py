@@ -0,0 +1,240 @@
+'''
+/database/catalog.py
+-> immutable in-memory snapshot of the projects table, serving the read endpoints
+'''
+
+from collections import OrderedDict
+from functools import lru_cache
+from operator import attrgetter
+import threading
+import json
+import time
+
+from database.pagination import streamArray
+from utilities.httpcache.setup import Payload
+from utilities.tracing.setup import getLogger
+
+# ==================================================
+# global vars
+# ==================================================
+
+log = getLogger('catalog')
+
+PROJECT_FIELDS = (
+    'id', 'link', 'title', 'author', 'category', 'date',
+    'direction', 'sound', 'production', 'support', 'assistance', 'research',
+    'location', 'instruments', 'keywords', 'infoPool', 'created_at'
+)
+
+# serialized as ISO strings
+DATE_FIELDS = ('date', 'created_at')
+
+# pre-serialized /projects?fields= bodies kept per catalog (least recently used first out), besides the full one
+MAX_FIELDSET_PAYLOADS = 8
+
+# seconds between checks of the database import version (other workers may have imported)
+VERSION_CHECK_INTERVAL = 30
+
+currentCatalog = None
+buildLock = threading.Lock()
+lastVersionCheck = 0.0
+
+# ==================================================
+# field sets
+# ==================================================
+
+def parseFields(value):
+    """
+    '?fields=' value -> field tuple in PROJECT_FIELDS order (id always included).
+    Missing or empty: every field. Raises ValueError on unknown fields.
+    """
+    if not value:
+        return PROJECT_FIELDS
+
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = requested.difference(PROJECT_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+
+    requested.add('id')
+    return tuple(field for field in PROJECT_FIELDS if field in requested)
+
+def isoGetter(field):
+    get = attrgetter(field)
+
+    def getIso(record):
+        value = get(record)
+        return value.isoformat() if value else None
+
+    return getIso
+
+@lru_cache(maxsize=64)
+def compileSerializer(fields):
+    """
+    record -> dict of the given fields, with the per-field getters resolved once per field set.
+    """
+    getters = tuple(
+        (field, isoGetter(field) if field in DATE_FIELDS else attrgetter(field))
+        for field in fields
+    )
+
+    def serialize(record):
+        return {field: get(record) for field, get in getters}
+
+    return serialize
+
+def dumpCompact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+# ==================================================
+# records
+# ==================================================
+
+class ProjectRecord:
+    """
+    Read-only copy of a Project row. Exposes the same attributes and
+    serialize() output as the ORM model, without the session overhead.
+    """
+    __slots__ = PROJECT_FIELDS
+
+    def __init__(self, project):
+        for field in PROJECT_FIELDS:
+            object.__setattr__(self, field, getattr(project, field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ProjectRecord is immutable")
+
+    def serialize(self, fields=PROJECT_FIELDS):
+        return compileSerializer(fields)(self)
+
+    def __repr__(self):
+        return f'<ProjectRecord {self.id}>'
+
+class Catalog:
+    """
+    Versioned, immutable set of project records plus an id -> index map.
+    A new Catalog is built after each import and swapped in as a whole.
+    """
+    __slots__ = ('version', 'records', 'indexById', 'builtAt', 'payload', 'fieldsetPayloads', 'payloadLock')
+
+    def __init__(self, version, records):
+        self.version = version
+        self.records = tuple(records)
+        self.indexById = {record.id: i for i, record in enumerate(self.records)}
+        self.builtAt = time.time()
+        self.payload = None
+        self.fieldsetPayloads = OrderedDict()
+        self.payloadLock = threading.Lock()
+
+    def projectsPayload(self, fields=PROJECT_FIELDS):
+        """
+        Serialized /projects body (and compressed variants) for a field set.
+        The full listing is built once per catalog version; other field sets are looked up in
+        the MAX_FIELDSET_PAYLOADS most recently used, and None means streamProjects.
+        """
+        if fields != PROJECT_FIELDS:
+            with self.payloadLock:
+                payload = self.fieldsetPayloads.get(fields)
+                if payload is not None:
+                    self.fieldsetPayloads.move_to_end(fields)
+            return payload
+
+        if self.payload is None:
+            with self.payloadLock:
+                if self.payload is None:
+                    serialize = compileSerializer(fields)
+                    body = dumpCompact([serialize(record) for record in self.records]).encode('utf-8')
+                    self.payload = Payload(body, self.version)
+        return self.payload
+
+    def streamProjects(self, fields):
+        """
+        /projects body for a field set not in the cache, written record by record. Once fully
+        sent, it is kept (fast-compressed) in place of the least recently used field set.
+        """
+        chunks = []
+        for chunk in streamArray(self.records, compileSerializer(fields)):
+            chunks.append(chunk)
+            yield chunk
+
+        payload = Payload(''.join(chunks).encode('utf-8'), self.version, fast=True)
+        with self.payloadLock:
+            self.fieldsetPayloads[fields] = payload
+            self.fieldsetPayloads.move_to_end(fields)
+            while len(self.fieldsetPayloads) > MAX_FIELDSET_PAYLOADS:
+                self.fieldsetPayloads.popitem(last=False)
+
+    def get(self, projectId):
+        index = self.indexById.get(projectId)
+        return self.records[index] if index is not None else None
+
+    def __len__(self):
+        return len(self.records)
+
+# ==================================================
+# build and swap
+# ==================================================
+
+def readImportVersion():
+    from database.setup import getConnection
+
+    conn = getConnection()
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def bumpImportVersion():
+    """
+    Mark the database as changed so every worker rebuilds its catalog.
+    """
+    from database.setup import getConnection
+
+    conn = getConnection()
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0] + 1
+        conn.execute(f"PRAGMA user_version = {version}")
+        conn.commit()
+        return version
+    finally:
+        conn.close()
+
+def refreshCatalog():
+    """
+    Build a new catalog from the database and swap it in atomically.
+    Must run inside an app context.
+    """
+    global currentCatalog, lastVersionCheck
+    from database.models import Project
+
+    with buildLock:
+        version = readImportVersion()
+        records = [ProjectRecord(project) for project in Project.query.order_by(Project.id).all()]
+
+        catalog = Catalog(version, records)
+        catalog.projectsPayload()
+
+        currentCatalog = catalog
+        lastVersionCheck = time.monotonic()
+
+    log.info("Catalog v%s built with %d projects.", version, len(records))
+    return currentCatalog
+
+def getCatalog():
+    """
+    Current catalog snapshot. Rebuilt when another process imported a newer version.
+    """
+    global lastVersionCheck
+
+    catalog = currentCatalog
+
+    if catalog is None:
+        return refreshCatalog()
+
+    now = time.monotonic()
+    if now - lastVersionCheck > VERSION_CHECK_INTERVAL:
+        lastVersionCheck = now
+        if readImportVersion() != catalog.version:
+            return refreshCatalog()
+
+    return catalog
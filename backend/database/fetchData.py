@@ -3,14 +3,24 @@
 -> handle of the csv reading and db writing
 '''
 
+from contextlib import contextmanager
 from io import StringIO
 import requests, pandas as pd
 from dotenv import load_dotenv
+from sqlalchemy import select, insert, update, func
 import os, time
 
 from database.models import db, Project
 from database.reportBuilder import ReportBuilder
-from utilities.vimeo.setup import getVimeoDate
+from database.searchIndex import rebuildSearchIndex
+from database.tagIndex import rebuildTagIndex
+from database.catalog import bumpImportVersion, refreshCatalog
+from dataGen.suggestionSets import rebuildSuggestionSets
+from dataGen.similarity import rebuildSimilarityIndex
+from dataGen.ranking import rebuildRankedIndex
+from utilities.vimeo.setup import getVimeoDates
+from utilities.metrics.setup import importPhaseSeconds
+from utilities.tracing.setup import span, annotate
 
 load_dotenv()
 
@@ -55,139 +65,196 @@ def concatStrings(strings):
     
     return ''
 
+# ==================================================
+# row normalization and diff
+# ==================================================
+
+# fields written from the sheet, in the order they are compared and reported
+PROJECT_FIELDS = [
+    'title', 'author', 'link', 'category',
+    'direction', 'sound', 'production', 'support', 'assistance', 'research',
+    'location', 'instruments', 'keywords', 'infoPool'
+]
+
+def buildProjectFields(p, cleanedLink):
+    """
+    Normalized values of a sheet row, keyed by Project column.
+    """
+    return {
+        'title': p['Tema'] if isinstance(p['Tema'], str) else '',
+        'author': p['Nome'] if isinstance(p['Nome'], str) else '',
+        'link': cleanedLink,
+        'category': normalizeString(p['Categorias']),
+
+        'direction': normalizeString(p['Realizador']),
+        'sound': normalizeString(p['Som']),
+        'production': normalizeString(p['Produção']),
+        'support': normalizeString(p['Apoio']),
+        'assistance': normalizeString(p['Assistência']),
+        'research': normalizeString(p['Pesquisa']),
+
+        'location': concatStrings([p['Região'],p['Distrito/Ilha'],p['Concelho'],p['Local']]),
+
+        'instruments': normalizeString(p['Instrumentos']),
+
+        'keywords': normalizeString(concatStrings([p['Palavras Chave'],p['Conceitos-chave']])),
+        'infoPool': concatStrings([p['História (textos que acompanham vídeos)'],p['Outras Informações'],p['Biografias']])
+    }
+
+def loadExistingProjects():
+    """
+    Load every existing project's sheet-managed fields and date in one query.
+    Returns {id: (fields, date)}.
+    """
+    columns = [getattr(Project, f) for f in PROJECT_FIELDS]
+    rows = db.session.execute(select(Project.id, Project.date, *columns)).all()
+
+    return {row[0]: (dict(zip(PROJECT_FIELDS, row[2:])), row[1]) for row in rows}
+
+def cleanLink(link):
+    """
+    Strip spaces/newlines and a trailing non-digit from a sheet link.
+    """
+    cleanedLink = link.replace(' ', '').replace('\n', '') if isinstance(link, str) else link
+    if (isinstance(cleanedLink, str) and 'vimeo.com/' in cleanedLink and cleanedLink[-1].isdigit() == False): 
+        cleanedLink = cleanedLink[:-1]
+    return cleanedLink
+
+def isValidLink(cleanedLink):
+    return isinstance(cleanedLink, str) and 'vimeo.com/' in cleanedLink and cleanedLink[-1].isdigit()
+
+def collectMissingDates(df, existingProjects):
+    """
+    Ids of new projects and of existing ones without a date: the only Vimeo lookups needed.
+    """
+    pids = []
+    for link in df['Link']:
+        cleanedLink = cleanLink(link)
+        if not isValidLink(cleanedLink):
+            continue
+
+        pid = int(cleanedLink.split("/")[-1])
+        existing = existingProjects.get(pid)
+        if existing is None or existing[1] is None:
+            pids.append(pid)
+
+    return pids
+
+# ==================================================
+# bulk writes
+# ==================================================
+
+class PendingWrites:
+    """
+    Collects new and changed rows, written with bulk INSERT/UPDATE statements at the end of the import.
+    """
+    def __init__(self):
+        self.inserts = []
+        self.updates = []
+
+    def flush(self):
+        if self.inserts:
+            db.session.execute(insert(Project), self.inserts)
+        if self.updates:
+            db.session.execute(update(Project), self.updates)
+
+        db.session.commit()
+
+        written = len(self.inserts) + len(self.updates)
+        self.inserts = []
+        self.updates = []
+        return written
+
 # ==================================================
 # POST and PUT handle
 # ==================================================
 
-def insertProject(pid, p, cleanedLink, lineIndex, reporter):
-    checkpointCommit = False
-    
-    date = getVimeoDate(pid)
-   
-    if date == "RATE_LIMIT_EXCEEDED": 
-        checkpointCommit = True
-        print("Sleeping for 1 minute to prevent blocking.")
-        time.sleep(61)
-        date = getVimeoDate(pid)
-   
+def insertProject(pid, fields, date, lineIndex, reporter, writes):
     if isinstance(date, str) and "error" in date:
         reporter.addError(lineIndex, pid, date)
-        return checkpointCommit
-
-    newProject = Project(
-        id=pid, # use the vimeo id as project row id
-        link=cleanedLink,
-        title= p['Tema'] if isinstance(p['Tema'], str) else '',
-        author=p['Nome'] if isinstance(p['Nome'], str) else '',
-        category=normalizeString(p['Categorias']),
-        date=date,
-
-        direction=normalizeString(p['Realizador']),
-        sound=normalizeString(p['Som']),
-        production = normalizeString(p['Produção']),
-        support = normalizeString(p['Apoio']),
-        assistance = normalizeString(p['Assistência']),
-        research = normalizeString(p['Pesquisa']),
-        
-        location=concatStrings([p['Região'],p['Distrito/Ilha'],p['Concelho'],p['Local']]),
-
-        instruments = normalizeString(p['Instrumentos']),
-        
-        keywords = normalizeString(concatStrings([p['Palavras Chave'],p['Conceitos-chave']])),
-        infoPool = concatStrings([p['História (textos que acompanham vídeos)'],p['Outras Informações'],p['Biografias']])
-    )
+        return
 
-    db.session.add(newProject)
+    # use the vimeo id as project row id
+    writes.inserts.append({'id': pid, **fields, 'date': date})
     reporter.addCreatedProject(lineIndex, pid)
-    
-    if checkpointCommit:
-        db.session.commit()
 
-def updateProject(existingProject, p, lineIndex, cleanedLink, reporter):
-    checkpointCommit = False
-    
-    changes = []
-    
-    updates = [
-        ('title', p['Tema'] if isinstance(p['Tema'], str) else ''),
-        ('author', p['Nome'] if isinstance(p['Nome'], str) else ''),
-        ('link', cleanedLink),
-        ('category',normalizeString(p['Categorias'])),
-
-        ('direction', normalizeString(p['Realizador'])),
-        ('sound', normalizeString(p['Som'])),
-        ('production', normalizeString(p['Produção'])),
-        ('support', normalizeString(p['Apoio'])),
-        ('assistance', normalizeString(p['Assistência'])),
-        ('research', normalizeString(p['Pesquisa'])),
-        
-        ('location', concatStrings([p['Região'],p['Distrito/Ilha'],p['Concelho'],p['Local']])),
-        
-        ('instruments', normalizeString(p['Instrumentos'])),
-        
-        ('keywords', normalizeString(concatStrings([p['Palavras Chave'],p['Conceitos-chave']]))),
-        ('infoPool', concatStrings([p['História (textos que acompanham vídeos)'],p['Outras Informações'],p['Biografias']]))
-    ]
-
-    # avoid unecessary access to Vimeo API
-    if getattr(existingProject, "date") is None:
-        date = getVimeoDate(existingProject.id)
+def updateProject(pid, fields, existing, date, lineIndex, reporter, writes):
+    existingFields, existingDate = existing
 
-        if date == "RATE_LIMIT_EXCEEDED": 
-            checkpointCommit = True
-            print("Sleeping for 1 minute to prevent blocking.")
-            time.sleep(61)
-            date = getVimeoDate(existingProject.id)
+    changes = {}
 
+    # date was only fetched from Vimeo if missing
+    if existingDate is None:
         if isinstance(date, str) and "error" in date:
-            reporter.addError(lineIndex, existingProject.id, date)
-            return checkpointCommit
-        
-        updates.append(("date", date))
-    
-    for field, new_val in updates:
-        #print(field, new_val)
-        if getattr(existingProject, field) != new_val:
-            setattr(existingProject, field, new_val)
-            changes.append(field)
-    
+            reporter.addError(lineIndex, pid, date)
+            return
+
+        if date is not None:
+            changes['date'] = date
+
+    for field in PROJECT_FIELDS:
+        if existingFields[field] != fields[field]:
+            changes[field] = fields[field]
+
     if changes:
-        reporter.addUpdatedProject(lineIndex, existingProject.id, changes)
+        writes.updates.append({'id': pid, **changes})
+        reporter.addUpdatedProject(lineIndex, pid, [f for f in PROJECT_FIELDS + ['date'] if f in changes])
     else:
         reporter.addUnchangedLine(lineIndex)
-    
-    if checkpointCommit:
-        db.session.commit()
 
 # ==================================================
 # fetch logic
 # ==================================================
 
-def fetchCSV():
-    reporter = ReportBuilder()
+def readSheet(source):
+    """
+    CSV text of the sheet: downloaded when 'source' is a URL, read from disk otherwise
+    (local copies, benchmarks).
+    """
+    if source.startswith(('http://', 'https://')):
+        # fetch CSV data (certificates handle), UTF-8 encoding not to loose chars like 'Ç'
+        response = requests.get(source)
+        response.raise_for_status()
+        response.encoding = 'utf-8'
+        return response.text
+
+    with open(source.removeprefix('file://'), encoding='utf-8') as f:
+        return f.read()
+
+@contextmanager
+def importPhase(name):
+    with importPhaseSeconds.time(phase=name), span(f"import.{name}"):
+        yield
+
+def fetchCSV(reporter=None, source=None):
+    reporter = reporter or ReportBuilder()
+    writes = PendingWrites()
     visitedIds = {}
     duplicateIds = {} 
 
-    # fetch CSV data (certificates handle), UTF-8 encoding not to loose chars like 'Ç'
-    response = requests.get(GOOGLE_SHEETS_URL)
-    response.raise_for_status()
-    response.encoding = 'utf-8'
-
-    df = pd.read_csv(StringIO(response.text))
+    with importPhase('download'):
+        df = pd.read_csv(StringIO(readSheet(source or GOOGLE_SHEETS_URL)))
 
     reporter.initialize(len(df))
 
+    with importPhase('load_existing'):
+        existingProjects = loadExistingProjects()
+
+    # fetch every missing publish date up front, concurrently and within the Vimeo quota
+    with importPhase('vimeo_dates'):
+        dates = getVimeoDates(collectMissingDates(df, existingProjects))
+
+    rowsStart = time.perf_counter()
+
     for lineIndex, p in enumerate(df.iloc, 1):
 
-        print(f"{lineIndex}/{len(df)}")
+        reporter.setProgress(lineIndex, len(df))
         lineIndex = lineIndex + 1 # csv header compensation
 
-        cleanedLink = p['Link'].replace(' ', '').replace('\n', '') if isinstance(p['Link'], str) else p['Link']
-        if (isinstance(cleanedLink, str) and 'vimeo.com/' in cleanedLink and cleanedLink[-1].isdigit() == False): 
-            cleanedLink = cleanedLink[:-1]
+        cleanedLink = cleanLink(p['Link'])
        
         # check if link exists and is valid
-        if not isinstance(cleanedLink, str) or 'vimeo.com/' not in cleanedLink or not cleanedLink[-1].isdigit(): 
+        if not isValidLink(cleanedLink): 
             if pd.isna(cleanedLink) or str(cleanedLink).lower() == 'nan':
                 reporter.addNanLine(lineIndex)
                 continue
@@ -210,18 +277,42 @@ def fetchCSV():
         
         visitedIds[pid] = lineIndex
 
-        existingProject = Project.query.filter_by(id = pid).first()
+        fields = buildProjectFields(p, cleanedLink)
+        existing = existingProjects.get(pid)
         
-        if existingProject:
-            updateProject(existingProject, p, lineIndex, cleanedLink, reporter)
+        if existing:
+            updateProject(pid, fields, existing, dates.get(pid), lineIndex, reporter, writes)
         else:
             reporter.flushUnchangedBatch()
-            insertProject(pid, p, cleanedLink, lineIndex, reporter)
+            insertProject(pid, fields, dates.get(pid), lineIndex, reporter, writes)
+
+    importPhaseSeconds.observe(time.perf_counter() - rowsStart, phase='rows')
+    annotate(rows=len(df))
+
+    with importPhase('write'):
+        writes.flush()
         
     reporter.flushNanBatch()
     reporter.addDuplicateSummary(duplicateIds)
-    reporter.addDatabaseSummary(len(Project.query.all()))
-
-    db.session.commit()
+    reporter.addDatabaseSummary(db.session.scalar(select(func.count(Project.id))))
+
+    # keep the full-text and tag indexes in sync with the imported rows
+    with importPhase('search_index'):
+        rebuildSearchIndex()
+    with importPhase('tag_index'):
+        rebuildTagIndex()
+
+    # publish the new snapshot to this worker and flag it for the others
+    with importPhase('catalog'):
+        bumpImportVersion()
+        catalog = refreshCatalog()
+
+    # precompute each project's suggestion candidates, similarity matrix and BM25 index for the new catalog
+    with importPhase('suggestion_sets'):
+        rebuildSuggestionSets(catalog)
+    with importPhase('similarity'):
+        rebuildSimilarityIndex(catalog)
+    with importPhase('ranked'):
+        rebuildRankedIndex(catalog)
 
     return reporter.finalize()
\ No newline at end of file
@@ -113,4 +113,50 @@ class Interaction(db.Model):
             "score": self.score,
 
             "created_at": self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+    
+# -----------------------------
+# ImportJob model
+# -----------------------------
+
+class ImportJob(db.Model):
+    __tablename__ = 'importJobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+
+    trigger = db.Column(db.String(32)) # http, scheduler
+    status = db.Column(db.String(16), default='running') # running, done, failed, interrupted
+
+    # progress
+    currentLine = db.Column(db.Integer, default=0)
+    totalLines = db.Column(db.Integer, default=0)
+    created = db.Column(db.Integer, default=0)
+    updated = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Integer, default=0)
+
+    # result
+    report = db.Column(db.Text) # JSON events, see ReportBuilder.renderJSON
+    error = db.Column(db.String(512))
+
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def serialize(self):
+        return {
+            "id": self.id,
+
+            "trigger": self.trigger,
+            "status": self.status,
+
+            "progress": {
+                "currentLine": self.currentLine,
+                "totalLines": self.totalLines,
+                "created": self.created,
+                "updated": self.updated,
+                "errors": self.errors
+            },
+            "error": self.error,
+
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,251 @@
+'''
+/database/pagination.py
+-> keyset (cursor) pagination for the project and user activity listings, streamed as compact JSON
+'''
+
+from datetime import date, datetime, timedelta
+from bisect import bisect_right
+import base64
+import json
+
+# ==================================================
+# global vars
+# ==================================================
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# rows read per keyset query: bounds memory and read transaction length, whatever the table size
+FETCH_BATCH = 200
+
+ACTIVITY_COLUMNS = ['id', 'userInput', 'userPublicIP', 'modelOutput', 'score', 'created_at']
+
+# ==================================================
+# parameters
+# ==================================================
+
+class PageRequest:
+    """
+    Parsed listing parameters: page size, cursor (last id of the previous page) and filters.
+    Raises ValueError on invalid values.
+    """
+    __slots__ = ('limit', 'afterId', 'dateFrom', 'dateTo', 'scores')
+
+    def __init__(self, limit=None, afterId=None, dateFrom=None, dateTo=None, scores=None):
+        self.limit = limit
+        self.afterId = afterId
+        self.dateFrom = dateFrom
+        self.dateTo = dateTo
+        self.scores = scores
+
+    @classmethod
+    def fromArgs(cls, args):
+        limit = args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+        scores = args.get('score')
+        if scores is not None:
+            scores = [int(score) for score in scores.split(',')]
+
+        return cls(
+            limit=limit,
+            afterId=decodeCursor(args['cursor']) if args.get('cursor') else None,
+            dateFrom=parseBound(args.get('from')),
+            dateTo=parseBound(args.get('to'), upper=True),
+            scores=scores,
+        )
+
+def isPageRequest(args):
+    """
+    Any listing parameter turns a full listing into a page.
+    """
+    return any(key in args for key in ('limit', 'cursor', 'from', 'to', 'score'))
+
+def parseBound(value, upper=False):
+    """
+    ISO date or datetime -> datetime. A bare upper date covers its whole day (exclusive next midnight).
+    """
+    if not value:
+        return None
+    if len(value) == 10:
+        day = datetime.combine(date.fromisoformat(value), datetime.min.time())
+        return day + timedelta(days=1) if upper else day
+    return datetime.fromisoformat(value)
+
+def firstDayFrom(bound):
+    """
+    First day whose midnight is at or after 'bound': project dates are days, compared at midnight
+    (from=2024-05-01T12:00 starts on May 2nd, to=2024-05-01T12:00 still includes May 1st).
+    """
+    day = bound.date()
+    return day if bound.time() == datetime.min.time() else day + timedelta(days=1)
+
+def encodeCursor(lastId):
+    return base64.urlsafe_b64encode(json.dumps([lastId]).encode()).decode().rstrip('=')
+
+def decodeCursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        (lastId,) = json.loads(base64.urlsafe_b64decode(padded))
+        return int(lastId)
+    except (ValueError, TypeError) as e:
+        raise ValueError("invalid cursor") from e
+
+# ==================================================
+# streamed JSON
+# ==================================================
+
+def streamArray(items, serialize):
+    """
+    JSON array written item by item.
+    """
+    yield '['
+    for i, item in enumerate(items):
+        yield (',' if i else '') + json.dumps(serialize(item), ensure_ascii=False, separators=(',', ':'))
+    yield ']'
+
+def streamPage(items, serialize, limit, keyOf):
+    """
+    {"items": [...], "nextCursor": ...} written item by item. 'items' yields up to limit + 1
+    entries: the extra one only tells that another page exists.
+    """
+    yield '{"items":['
+    count, lastKey, hasMore = 0, None, False
+
+    for item in items:
+        if count == limit:
+            hasMore = True
+            break
+        yield (',' if count else '') + json.dumps(serialize(item), ensure_ascii=False, separators=(',', ':'))
+        count += 1
+        lastKey = keyOf(item)
+
+    # release the source (database connection) without reading further
+    if hasattr(items, 'close'):
+        items.close()
+
+    nextCursor = encodeCursor(lastKey) if hasMore else None
+    yield '],"nextCursor":' + json.dumps(nextCursor) + '}'
+
+# ==================================================
+# projects (catalog snapshot, ascending id)
+# ==================================================
+
+def iterCatalogProjects(catalog, page):
+    """
+    Catalog records after the cursor, within the date range. Records are ordered by id.
+    """
+    records = catalog.records
+    start = bisect_right(records, page.afterId, key=lambda record: record.id) if page.afterId is not None else 0
+
+    dateFrom = firstDayFrom(page.dateFrom) if page.dateFrom else None
+    dateTo = firstDayFrom(page.dateTo) if page.dateTo else None
+
+    for index in range(start, len(records)):
+        record = records[index]
+        if dateFrom or dateTo:
+            if record.date is None:
+                continue
+            if dateFrom and record.date < dateFrom:
+                continue
+            if dateTo and record.date >= dateTo:
+                continue
+        yield record
+
+def streamProjectsPage(catalog, page, serialize):
+    items = iterCatalogProjects(catalog, page)
+    return streamPage(items, serialize, page.limit, lambda record: record.id)
+
+# ==================================================
+# user activity (database, newest first)
+# ==================================================
+
+def initActivityIndex():
+    """
+    Index for the created_at range filter (id ordering uses the primary key).
+    """
+    from database.setup import getConnection
+
+    conn = getConnection()
+    try:
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_userActivity_created_at ON userActivity (created_at)")
+        conn.commit()
+    finally:
+        conn.close()
+
+def activityFilters(page):
+    conditions, params = [], []
+
+    if page.dateFrom:
+        conditions.append("created_at >= ?")
+        params.append(page.dateFrom.isoformat(sep=' '))
+    if page.dateTo:
+        conditions.append("created_at < ?")
+        params.append(page.dateTo.isoformat(sep=' '))
+    if page.scores:
+        conditions.append(f"score IN ({', '.join('?' * len(page.scores))})")
+        params.extend(page.scores)
+
+    return conditions, params
+
+def iterActivity(page, limit=None):
+    """
+    Interactions newest first, read in FETCH_BATCH keyset queries (one short read each).
+    Stops after 'limit' rows when given.
+    """
+    from database.setup import getConnection
+
+    conditions, params = activityFilters(page)
+    afterId = page.afterId
+    remaining = limit
+
+    conn = getConnection()
+    try:
+        while remaining is None or remaining > 0:
+            where = list(conditions)
+            values = list(params)
+            if afterId is not None:
+                where.append("id < ?")
+                values.append(afterId)
+
+            batch = FETCH_BATCH if remaining is None else min(FETCH_BATCH, remaining)
+            rows = conn.execute(
+                f"SELECT {', '.join(ACTIVITY_COLUMNS)} FROM userActivity"
+                f"{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY id DESC LIMIT ?",
+                (*values, batch)
+            ).fetchall()
+
+            yield from rows
+
+            if len(rows) < batch:
+                return
+            afterId = rows[-1]['id']
+            if remaining is not None:
+                remaining -= len(rows)
+    finally:
+        conn.close()
+
+def serializeActivityRow(row):
+    # same output as Interaction.serialize
+    created = row['created_at']
+    return {
+        "id": row['id'],
+
+        "userInput": row['userInput'],
+        "userPublicIP": row['userPublicIP'],
+        "modelOutput": row['modelOutput'],
+        "score": row['score'],
+
+        "created_at": datetime.fromisoformat(created).isoformat() if created else None
+    }
+
+def streamActivity(page=None):
+    """
+    Full listing (no page: a plain JSON array) or one page with its next cursor.
+    """
+    if page is None:
+        return streamArray(iterActivity(PageRequest()), serializeActivityRow)
+
+    items = iterActivity(page, limit=page.limit + 1)
+    return streamPage(items, serializeActivityRow, page.limit, lambda row: row['id'])
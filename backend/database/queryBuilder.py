@@ -0,0 +1,303 @@
+'''
+/database/queryBuilder.py
+-> structured predicates and queries over 'projects', compiled to parameterized SQL
+'''
+
+import re
+
+from database.searchIndex import FTS_COLUMNS, FTS_TABLE, canUseMatch, buildMatchExpression, rewriteLikeToMatch
+from database.tagIndex import TAG_FIELDS, TAG_TABLE, splitTags
+
+# ==================================================
+# global vars
+# ==================================================
+
+# single-quoted SQL string literal ('' is an escaped quote)
+literalPattern = re.compile(r"'((?:[^']|'')*)'")
+
+# operators whose right-hand literal can be a parameter (aliases, ESCAPE, IN lists... keep theirs)
+bindableOperatorPattern = re.compile(r"(?:[=<>]|\b(?:LIKE|GLOB|MATCH))\s*$", re.IGNORECASE)
+
+MATCH_SUBQUERY = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?"
+
+# ==================================================
+# helpers
+# ==================================================
+
+def quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+def isIndexed(columns):
+    return all(column in FTS_COLUMNS for column in columns)
+
+def bindLiterals(sql):
+    """
+    Replace the string literals compared by a raw SQL text (e.g. LLM output) by bound parameters,
+    so queries of the same shape share one prepared statement. Only literals right after a
+    comparison or LIKE / GLOB / MATCH are bound: SQLite rejects parameters elsewhere (aliases).
+    Returns (sql, params).
+    """
+    params, parts = [], []
+    end = 0
+
+    for match in literalPattern.finditer(sql):
+        before = sql[end:match.start()]
+        parts.append(before)
+
+        if bindableOperatorPattern.search(before):
+            params.append(match.group(1).replace("''", "'"))
+            parts.append('?')
+        else:
+            parts.append(match.group(0))
+
+        end = match.end()
+
+    parts.append(sql[end:])
+    return ''.join(parts), params
+
+def compileRawSQL(sql):
+    """
+    Raw SQL text -> (sql, params): LIKE scans moved to the full-text index, literals bound.
+    """
+    return bindLiterals(rewriteLikeToMatch(sql.strip()))
+
+# ==================================================
+# predicates
+# ==================================================
+
+class Predicate:
+    """
+    One condition on the projects table.
+    ops: 'contains' / 'notContains' (LIKE '%v%'), 'startsWith' / 'notStartsWith' (LIKE 'v%'),
+         'notEqual' (column != v)
+    'columns' may hold several columns for 'contains' (true if any of them contains the value).
+    """
+    __slots__ = ('columns', 'op', 'value')
+
+    def __init__(self, columns, op, value):
+        self.columns = (columns,) if isinstance(columns, str) else tuple(columns)
+        self.op = op
+        self.value = value
+
+    @property
+    def column(self):
+        return self.columns[0]
+
+    def display(self):
+        """
+        Human/LLM facing SQL text, with literal values.
+        """
+        if self.op == 'notEqual':
+            return f"{self.column} != {self.value}"
+
+        negate = 'NOT ' if self.op.startswith('not') else ''
+        pattern = f"%{self.value}%" if self.op in ('contains', 'notContains') else f"{self.value}%"
+
+        parts = [f"{column} {negate}LIKE {quote(pattern)}" for column in self.columns]
+        return parts[0] if len(parts) == 1 else "(" + " OR ".join(parts) + ")"
+
+    def compile(self):
+        """
+        Parameterized SQL fragment and its bound values: (sql, params).
+        """
+        if self.op == 'notEqual':
+            return f"{self.column} != ?", [self.value]
+
+        value = str(self.value)
+
+        if self.op in ('contains', 'notContains') and isIndexed(self.columns) and canUseMatch(value):
+            expression = buildMatchExpression(list(self.columns), value)
+            if self.op == 'contains':
+                return f"id IN ({MATCH_SUBQUERY})", [expression]
+            return f"({self.column} IS NOT NULL AND id NOT IN ({MATCH_SUBQUERY}))", [expression]
+
+        negate = 'NOT ' if self.op.startswith('not') else ''
+        pattern = f"%{value}%" if self.op in ('contains', 'notContains') else f"{value}%"
+
+        parts = [f"{column} {negate}LIKE ?" for column in self.columns]
+        sql = parts[0] if len(parts) == 1 else "(" + " OR ".join(parts) + ")"
+        return sql, [pattern] * len(parts)
+
+    def predicates(self):
+        return [self]
+
+class Group:
+    """
+    Predicates joined by AND ('all') or OR ('any'). OR groups are always parenthesized.
+    """
+    __slots__ = ('joiner', 'items')
+
+    def __init__(self, joiner, items):
+        self.joiner = joiner
+        self.items = [item for item in items if item is not None]
+
+    def wrap(self, text):
+        return f"({text})" if self.joiner == 'OR' else text
+
+    def display(self):
+        return self.wrap(f" {self.joiner} ".join(item.display() for item in self.items))
+
+    def compile(self):
+        fragments, params = [], []
+        for item in self.items:
+            sql, itemParams = item.compile()
+            fragments.append(sql)
+            params.extend(itemParams)
+        return self.wrap(f" {self.joiner} ".join(fragments)), params
+
+    def predicates(self):
+        return [p for item in self.items for p in item.predicates()]
+
+class TagPredicate:
+    """
+    Set lookup on a multi-valued field through the tag table:
+    projects having any / all of 'values' (or, negated, not having them).
+    'shown' is the equivalent LIKE condition, kept as the display text and for term extraction.
+    """
+    __slots__ = ('field', 'values', 'mode', 'negate', 'shown')
+
+    def __init__(self, field, values, mode, negate, shown):
+        self.field = field
+        self.values = values
+        self.mode = mode
+        self.negate = negate
+        self.shown = shown
+
+    def display(self):
+        return self.shown.display()
+
+    def compile(self):
+        # nothing to look up (e.g. a missing value): same condition as before, as a scan
+        if not self.values:
+            return self.shown.compile()
+
+        placeholders = ', '.join('?' * len(self.values))
+        subquery = f"SELECT project_id FROM {TAG_TABLE} WHERE field = ? AND value IN ({placeholders})"
+        params = [self.field] + list(self.values)
+
+        if self.mode == 'all' and len(self.values) > 1:
+            subquery += " GROUP BY project_id HAVING COUNT(*) = ?"
+            params.append(len(self.values))
+
+        if self.negate:
+            return f"({self.field} IS NOT NULL AND id NOT IN ({subquery}))", params
+        return f"id IN ({subquery})", params
+
+    def predicates(self):
+        return self.shown.predicates()
+
+def contains(columns, value):
+    return Predicate(columns, 'contains', value)
+
+def notContains(column, value):
+    return Predicate(column, 'notContains', value)
+
+def startsWith(column, value):
+    return Predicate(column, 'startsWith', value)
+
+def notStartsWith(column, value):
+    return Predicate(column, 'notStartsWith', value)
+
+def notEqual(column, value):
+    return Predicate(column, 'notEqual', value)
+
+def hasAnyTag(field, values):
+    """
+    Projects sharing at least one of 'values' in 'field' (shown as an OR of LIKEs).
+    """
+    shown = anyOf(*[contains(field, value) for value in values])
+    if field not in TAG_FIELDS:
+        return shown
+    return TagPredicate(field, list(dict.fromkeys(v.strip() for v in values if v.strip())), 'any', False, shown)
+
+def hasTag(field, value):
+    """
+    Projects with 'value' as one of the values of 'field' (shown as a LIKE).
+    """
+    if field not in TAG_FIELDS:
+        return contains(field, value)
+    return TagPredicate(field, splitTags(value), 'any', False, contains(field, value))
+
+def hasAllTags(field, value):
+    """
+    Projects having every value of the ", "-joined 'value' in 'field'.
+    """
+    if field not in TAG_FIELDS:
+        return contains(field, value)
+    return TagPredicate(field, splitTags(value), 'all', False, contains(field, value))
+
+def lacksTag(field, value):
+    if field not in TAG_FIELDS:
+        return notContains(field, value)
+    return TagPredicate(field, splitTags(value), 'any', True, notContains(field, value))
+
+def lacksAllTags(field, value):
+    """
+    Projects (with a value in 'field') not having every value of the ", "-joined 'value'.
+    """
+    if field not in TAG_FIELDS:
+        return notContains(field, value)
+    return TagPredicate(field, splitTags(value), 'all', True, notContains(field, value))
+
+def allOf(*items):
+    return Group('AND', items)
+
+def anyOf(*items):
+    return Group('OR', items)
+
+# ==================================================
+# query
+# ==================================================
+
+class Query(str):
+    """
+    A SELECT over 'projects'. The string value is the display SQL (sent to the client
+    and back to the LLM as PREV_SQL); compile() gives the parameterized statement.
+    Queries of the same shape compile to the same SQL text, reusing one prepared statement.
+    """
+
+    def __new__(cls, where=None, suffix='', terminator=';'):
+        text = "SELECT * FROM projects"
+        if where is not None:
+            text += f" WHERE {where.display()}"
+        if suffix:
+            text += f" {suffix}"
+        text += terminator
+
+        query = super().__new__(cls, text)
+        query.where = where
+        query.suffix = suffix
+        return query
+
+    def compile(self):
+        sql, params = "SELECT * FROM projects", []
+        if self.where is not None:
+            whereSQL, params = self.where.compile()
+            sql += f" WHERE {whereSQL}"
+        if self.suffix:
+            sql += f" {self.suffix}"
+        return sql + ";", params
+
+    def key(self):
+        """
+        What the query executes, (sql, params): the key for result caches. The display text is not
+        one, since a tag lookup shows the same LIKE text as a substring scan.
+        """
+        sql, params = self.compile()
+        return sql, tuple(params)
+
+    def predicates(self):
+        """
+        Flat list of the query's predicates (what term extraction recovers from raw SQL).
+        """
+        return self.where.predicates() if self.where is not None else []
+
+    def extend(self, *items):
+        """
+        New query with extra AND conditions (added after the existing ones).
+        """
+        where = allOf(self.where, *items) if self.where is not None else allOf(*items)
+        return Query(where, self.suffix, self.terminatorText())
+
+    def terminatorText(self):
+        return ';' if self.endswith(';') else ''
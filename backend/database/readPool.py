@@ -0,0 +1,116 @@
+'''
+/database/readPool.py
+-> thread-safe pool of long-lived, read-only, tuned SQLite connections
+'''
+
+from contextlib import contextmanager
+import threading
+import sqlite3
+import queue
+import time
+
+from utilities.metrics.setup import readPoolWaitSeconds, readPoolHoldSeconds, readPoolTimeouts, readPoolConnections
+
+# ==================================================
+# global vars
+# ==================================================
+
+# per-connection tuning, applied once when the connection is opened
+READ_PRAGMAS = [
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped reads
+    "PRAGMA cache_size = -16000",    # ~16 MB page cache
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA query_only = ON",
+]
+
+STATEMENT_CACHE_SIZE = 256
+ACQUIRE_TIMEOUT = 10
+
+# ==================================================
+# pool
+# ==================================================
+
+class ReadConnectionPool:
+    """
+    Lazily opens up to 'size' read-only connections and hands them out to threads.
+    Wait and hold times, timeouts and open / in-use connections go to /metrics.
+    """
+
+    def __init__(self, path, size=8):
+        self.path = path
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.created = 0
+
+    def createConnection(self):
+        conn = sqlite3.connect(
+            f"file:{self.path}?mode=ro",
+            uri=True,
+            timeout=5,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row
+
+        for pragma in READ_PRAGMAS:
+            conn.execute(pragma)
+
+        return conn
+
+    def acquire(self):
+        start = time.perf_counter()
+
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self.lock:
+                if self.created < self.size:
+                    self.created += 1
+                    create = True
+                else:
+                    create = False
+
+            if create:
+                try:
+                    conn = self.createConnection()
+                except Exception:
+                    with self.lock:
+                        self.created -= 1
+                    raise
+                readPoolConnections.inc(state='open')
+            else:
+                try:
+                    conn = self.idle.get(timeout=ACQUIRE_TIMEOUT)
+                except queue.Empty:
+                    readPoolTimeouts.inc()
+                    raise TimeoutError("No read connection available")
+
+        readPoolWaitSeconds.observe(time.perf_counter() - start)
+        readPoolConnections.inc(state='in_use')
+        return conn
+
+    def release(self, conn, heldFor):
+        readPoolHoldSeconds.observe(heldFor)
+        readPoolConnections.dec(state='in_use')
+        self.idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        start = time.perf_counter()
+        try:
+            yield conn
+        finally:
+            self.release(conn, time.perf_counter() - start)
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self.lock:
+                self.created -= 1
+            readPoolConnections.dec(state='open')
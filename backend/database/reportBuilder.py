@@ -1,15 +1,24 @@
 '''
 /database/reportBuilder.py
--> handle HTML report generation for CSV fetch
+-> collect structured CSV fetch events, rendered to HTML or JSON on demand
 '''
 
+import json
+
 class ReportBuilder:
-    def __init__(self):
-        self.report = ""
+    """
+    Records the import as a list of events (linear time), optionally forwarding
+    each one to a listener as it happens, so the report can be streamed.
+    """
+    def __init__(self, listener=None):
+        self.events = []
+        self.listener = listener
         self.unchangedStart = None
         self.unchangedEnd = None
         self.nanStart = None
         self.nanEnd = None
+        self.currentLine = 0
+        self.totalLines = 0
 
     def getStyles(self):
         return """
@@ -145,29 +154,44 @@ class ReportBuilder:
         </style>
         """
     
-    def appendMessage(self, msg):
-        self.report = self.report + '\n' + msg
+    @classmethod
+    def fromJSON(cls, report):
+        """
+        Rebuild a finished report from renderJSON output, to render it again.
+        """
+        reporter = cls()
+        reporter.events = json.loads(report)["events"]
+        return reporter
+
+    # ==================================================
+    # events
+    # ==================================================
+
+    def addEvent(self, eventType, **data):
+        event = {"type": eventType, **data}
+        self.events.append(event)
+        if self.listener:
+            self.listener(event)
+    
+    def setProgress(self, line_index, total_lines):
+        self.currentLine = line_index
+        self.totalLines = total_lines
     
     def initialize(self, total_lines):
-        self.report = self.getStyles()
-        self.report += f"<h1>CSV carregado com sucesso!</h1><h3>{total_lines} linhas encontradas.</h3>"
+        self.events = []
+        self.totalLines = total_lines
+        self.addEvent("header", totalLines=total_lines)
         self.unchangedStart = self.unchangedEnd = None
         self.nanStart = self.nanEnd = None
     
     def flushUnchangedBatch(self):
         if self.unchangedStart is not None:
-            if self.unchangedStart == self.unchangedEnd:
-                self.appendMessage(f"<span>Sem alterações na linha {self.unchangedStart}.<br></span>")
-            else:
-                self.appendMessage(f"<span>Sem alterações nas linhas {self.unchangedStart} a {self.unchangedEnd}.<br></span>")
+            self.addEvent("unchanged", start=self.unchangedStart, end=self.unchangedEnd)
             self.unchangedStart = self.unchangedEnd = None
     
     def flushNanBatch(self):
         if self.nanStart is not None:
-            if self.nanStart == self.nanEnd:
-                self.appendMessage(f"<span>Linha {self.nanStart} — link inválido (nan).<br></span>")
-            else:
-                self.appendMessage(f"<span>Linhas {self.nanStart} a {self.nanEnd} — link inválido (nan).<br></span>")
+            self.addEvent("nan", start=self.nanStart, end=self.nanEnd)
             self.nanStart = self.nanEnd = None
     
     def resetUnchangedBoundaries(self):
@@ -187,39 +211,101 @@ class ReportBuilder:
     def addInvalidLink(self, line_index, link):
         self.flushUnchangedBatch()
         self.flushNanBatch()
-        self.appendMessage(f"<span>Linha {line_index} — link inválido ({link}).<br></span>")
+        self.addEvent("invalid", line=line_index, link=str(link))
         self.resetUnchangedBoundaries()
     
     def addError(self, line_index, pid, error_msg):
         self.flushUnchangedBatch()
         self.resetUnchangedBoundaries()
         self.flushNanBatch()
-        self.appendMessage(f"<span>Linha {line_index} — Erro: {pid} — {error_msg}.<br></span>")
+        self.addEvent("error", line=line_index, pid=pid, message=str(error_msg))
     
     def addCreatedProject(self, line_index, pid):
-        self.appendMessage(f"<span>Linha {line_index} — Criado novo projeto: {pid}.<br></span>")
+        self.addEvent("created", line=line_index, pid=pid)
     
     def addUpdatedProject(self, line_index, pid, changes):
         self.flushUnchangedBatch()
-        self.appendMessage(f"<span>Linha {line_index} — Atualizado {pid}: {', '.join(changes)}.<br></span>")
+        self.addEvent("updated", line=line_index, pid=pid, changes=list(changes))
     
     def addDuplicateSummary(self, duplicate_ids):
         if not duplicate_ids:
             return
 
-        self.appendMessage(f"<h3>Resumo de Duplicados:</h3>")
-
-        for pid, lines in duplicate_ids.items():
-            if len(lines) == 2:
-                self.appendMessage(f"<span>- https://vimeo.com/{pid} repetido nas linhas {lines[0]} e {lines[1]}<br></span>")
-            else:
-                lines_str = ', '.join(map(str, lines[:-1])) + f" e {lines[-1]}"
-                self.appendMessage(f"<span>- https://vimeo.com/{pid} repetido nas linhas {lines_str}<br></span>")
+        self.addEvent("duplicates", items=[{"pid": pid, "lines": lines} for pid, lines in duplicate_ids.items()])
     
     def addDatabaseSummary(self, total_projects):
-        self.appendMessage(f"<h3>{total_projects} objetos na base de dados.</h3>")
+        self.addEvent("database", totalProjects=total_projects)
+
+    def addFailure(self, error_msg):
+        self.addEvent("failure", message=str(error_msg))
     
     def finalize(self):
         self.flushUnchangedBatch()
         self.flushNanBatch()
-        return self.report
\ No newline at end of file
+        return self.renderHTML()
+
+    # ==================================================
+    # rendering
+    # ==================================================
+
+    def renderEventHTML(self, event):
+        """
+        HTML fragment of one event, each message prefixed by a newline.
+        """
+        eventType = event["type"]
+
+        if eventType == "header":
+            return f"<h1>CSV carregado com sucesso!</h1><h3>{event['totalLines']} linhas encontradas.</h3>"
+
+        if eventType == "unchanged":
+            if event["start"] == event["end"]:
+                return f"\n<span>Sem alterações na linha {event['start']}.<br></span>"
+            return f"\n<span>Sem alterações nas linhas {event['start']} a {event['end']}.<br></span>"
+
+        if eventType == "nan":
+            if event["start"] == event["end"]:
+                return f"\n<span>Linha {event['start']} — link inválido (nan).<br></span>"
+            return f"\n<span>Linhas {event['start']} a {event['end']} — link inválido (nan).<br></span>"
+
+        if eventType == "invalid":
+            return f"\n<span>Linha {event['line']} — link inválido ({event['link']}).<br></span>"
+
+        if eventType == "error":
+            return f"\n<span>Linha {event['line']} — Erro: {event['pid']} — {event['message']}.<br></span>"
+
+        if eventType == "created":
+            return f"\n<span>Linha {event['line']} — Criado novo projeto: {event['pid']}.<br></span>"
+
+        if eventType == "updated":
+            return f"\n<span>Linha {event['line']} — Atualizado {event['pid']}: {', '.join(event['changes'])}.<br></span>"
+
+        if eventType == "duplicates":
+            parts = [f"\n<h3>Resumo de Duplicados:</h3>"]
+            for item in event["items"]:
+                pid, lines = item["pid"], item["lines"]
+                if len(lines) == 2:
+                    parts.append(f"\n<span>- https://vimeo.com/{pid} repetido nas linhas {lines[0]} e {lines[1]}<br></span>")
+                else:
+                    lines_str = ', '.join(map(str, lines[:-1])) + f" e {lines[-1]}"
+                    parts.append(f"\n<span>- https://vimeo.com/{pid} repetido nas linhas {lines_str}<br></span>")
+            return ''.join(parts)
+
+        if eventType == "database":
+            return f"\n<h3>{event['totalProjects']} objetos na base de dados.</h3>"
+
+        if eventType == "failure":
+            return f"\n<span>Erro na importação: {event['message']}.<br></span>"
+
+        return ""
+
+    def renderHTML(self):
+        return self.getStyles() + ''.join(self.renderEventHTML(event) for event in self.events)
+
+    def summary(self):
+        counts = {}
+        for event in self.events:
+            counts[event["type"]] = counts.get(event["type"], 0) + 1
+        return counts
+
+    def renderJSON(self):
+        return json.dumps({"events": self.events, "summary": self.summary()}, ensure_ascii=False, default=str)
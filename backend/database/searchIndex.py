@@ -0,0 +1,119 @@
+'''
+/database/searchIndex.py
+-> SQLite FTS5 full-text index over the searchable project columns
+'''
+
+import re
+
+# ==================================================
+# global vars
+# ==================================================
+
+FTS_TABLE = 'projects_fts'
+
+# columns mirrored into the full-text index
+FTS_COLUMNS = [
+    'title', 'author', 'category', 'direction', 'sound',
+    'production', 'support', 'assistance', 'research',
+    'location', 'instruments', 'keywords', 'infoPool'
+]
+
+# the trigram tokenizer only indexes substrings with 3+ characters
+MIN_MATCH_LENGTH = 3
+
+# <column> [NOT] LIKE '%term%' on an indexed column, without inner wildcards or quotes
+likePattern = re.compile(
+    r"\b(" + "|".join(FTS_COLUMNS) + r")\s+(NOT\s+)?LIKE\s+'%([^%_']+)%'",
+    re.IGNORECASE
+)
+
+# ==================================================
+# index maintenance
+# ==================================================
+
+def initSearchIndex():
+    """
+    Create the FTS5 table (external content over 'projects') if it does not exist yet,
+    and populate it on first creation.
+    """
+    from database.setup import getConnection
+
+    conn = getConnection()
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+        ).fetchone()
+
+        if not exists:
+            conn.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"{', '.join(FTS_COLUMNS)}, "
+                f"content='projects', content_rowid='id', tokenize='trigram')"
+            )
+            conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+            conn.commit()
+    finally:
+        conn.close()
+
+def rebuildSearchIndex():
+    """
+    Re-read every row of 'projects' into the index. Called after each CSV import.
+    """
+    from database.setup import getConnection
+
+    conn = getConnection()
+    try:
+        conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+        conn.commit()
+    finally:
+        conn.close()
+
+# ==================================================
+# query helpers
+# ==================================================
+
+def canUseMatch(term):
+    return len(term) >= MIN_MATCH_LENGTH
+
+def buildMatchExpression(columns, term):
+    """
+    Build an FTS5 MATCH expression searching a phrase in one or more columns.
+    With the trigram tokenizer a phrase behaves like a case-insensitive substring.
+    """
+    if isinstance(columns, str):
+        columns = [columns]
+
+    phrase = '"' + term.replace('"', '""') + '"'
+    return f"{{{' '.join(columns)}}} : {phrase}"
+
+def matchCondition(columns, term, negate=False):
+    """
+    SQL condition on 'projects' equivalent to '<column> LIKE %term%' (or NOT LIKE),
+    resolved through the full-text index.
+    """
+    expression = buildMatchExpression(columns, term).replace("'", "''")
+    subquery = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH '{expression}'"
+
+    if negate:
+        column = columns if isinstance(columns, str) else columns[0]
+        return f"({column} IS NOT NULL AND id NOT IN ({subquery}))"
+
+    return f"id IN ({subquery})"
+
+def rewriteLikeToMatch(sql):
+    """
+    Rewrite every '<column> [NOT] LIKE '%term%'' over an indexed column into an
+    index lookup. Terms too short for the trigram index are left as LIKE scans.
+    The original SQL text is kept for the client, only the executed text changes.
+    """
+    def replace(match):
+        column, negate, term = match.group(1), match.group(2), match.group(3)
+
+        if not canUseMatch(term):
+            return match.group(0)
+
+        # keep the declared column name casing (FTS columns are case-insensitive anyway)
+        column = next(c for c in FTS_COLUMNS if c.lower() == column.lower())
+        return matchCondition(column, term, negate=bool(negate))
+
+    return likePattern.sub(replace, sql)
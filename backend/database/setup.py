@@ -6,8 +6,14 @@
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.pool import QueuePool
 import sqlite3
+import time
 import os
 
+from database.queryBuilder import Query, compileRawSQL
+from database.readPool import ReadConnectionPool
+from utilities.metrics.setup import sqlQuerySeconds, sqlQueryRows
+from utilities.tracing.setup import span
+
 # ==================================================
 # global vars
 # ==================================================
@@ -15,7 +21,10 @@ import os
 db = SQLAlchemy()
 
 dbName = 'lastro.db'
-dbPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), dbName)
+dbPath = os.getenv("LASTRO_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), dbName))
+
+# long-lived read-only connections for raw SQL (executeQueriesSQL)
+readPool = ReadConnectionPool(dbPath, size=int(os.getenv("READ_POOL_SIZE", 8)))
 
 # ==================================================
 # initialize and config on app context
@@ -42,14 +51,33 @@ def initDatabase(app):
 
         db.init_app(app)
 
+        # WAL lets the read pool keep reading while an import writes
+        enableWAL()
+
         with app.app_context():
             db.create_all()
 
             from database.models import Project
-            from database.fetchData import fetchCSV
+            from utilities.jobs.setup import startImport
+            from database.searchIndex import initSearchIndex
+            from database.tagIndex import initTagIndex
+            from database.catalog import refreshCatalog
+            from dataGen.suggestionSets import initSuggestionSets, ensureSuggestionSets
+            from database.pagination import initActivityIndex
+
+            initSearchIndex()
+            initTagIndex()
+            initSuggestionSets()
+            initActivityIndex()
             
+            # first boot: one worker imports (single-flight), the others wait for it.
+            # the import builds the catalog and suggestion sets of its own process
             if Project.query.count() == 0:
-                fetchCSV()
+                jobId, joined = startImport('startup', wait=True)
+                if not joined:
+                    return
+
+            ensureSuggestionSets(refreshCatalog())
 
 # ==================================================
 # other methods
@@ -60,21 +88,37 @@ def getConnection():
     conn.row_factory = sqlite3.Row
     return conn
 
-def executeQueriesSQL(queries):
+def enableWAL():
     conn = getConnection()
-    results = []
-    
     try:
+        conn.execute("PRAGMA journal_mode = WAL")
+    finally:
+        conn.close()
+
+def executeQueriesSQL(queries):
+    results = []
+
+    with readPool.connection() as conn:
         c = conn.cursor()
 
         for sql in queries:
-            c.execute(sql.strip())
-            columns = [desc[0] for desc in c.description]
-            rows = [dict(zip(columns, row)) for row in c.fetchall()]
-            results.append(rows)
-        return results
-    finally:
-        conn.close()
+            # built queries bind their values; raw SQL (LLM output) gets its literals bound
+            # and its LIKE '%term%' scans served by the full-text index
+            kind = 'built' if isinstance(sql, Query) else 'raw'
+            start = time.perf_counter()
+
+            with span('sql', kind=kind) as current:
+                statement, params = sql.compile() if isinstance(sql, Query) else compileRawSQL(sql)
+                c.execute(statement, params)
+                columns = [desc[0] for desc in c.description]
+                rows = [dict(zip(columns, row)) for row in c.fetchall()]
+                results.append(rows)
+                current.set(statement=statement, rows=len(rows))
+
+            sqlQuerySeconds.observe(time.perf_counter() - start, kind=kind)
+            sqlQueryRows.observe(len(rows), kind=kind)
+
+    return results
 
 def recordInteraction(data,result):
     if data["cookieConsent"]:
@@ -0,0 +1,86 @@
+'''
+/database/tagIndex.py
+-> inverted index (field, value) -> project for the multi-valued, ", "-joined project fields
+'''
+
+# ==================================================
+# global vars
+# ==================================================
+
+TAG_TABLE = 'project_tags'
+
+# fields holding ", "-joined values (see normalizeString in fetchData)
+TAG_FIELDS = [
+    'author', 'category', 'direction', 'sound', 'production', 'support',
+    'assistance', 'research', 'location', 'instruments', 'keywords'
+]
+
+# ==================================================
+# helpers
+# ==================================================
+
+def splitTags(value):
+    """
+    'a, b, c' -> ['a', 'b', 'c'] (same split as the suggestion queries).
+    """
+    if not isinstance(value, str):
+        return []
+    return list(dict.fromkeys(part.strip() for part in value.split(", ") if part.strip()))
+
+# ==================================================
+# index maintenance
+# ==================================================
+
+def initTagIndex():
+    """
+    Create the tag table if it does not exist yet, and populate it on first creation.
+    """
+    from database.setup import getConnection
+
+    conn = getConnection()
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TAG_TABLE,)
+        ).fetchone()
+
+        if not exists:
+            # the primary key is the (field, value) -> project_id lookup index
+            conn.execute(
+                f"CREATE TABLE {TAG_TABLE} ("
+                "field TEXT NOT NULL, "
+                "value TEXT NOT NULL COLLATE NOCASE, "
+                "project_id INTEGER NOT NULL, "
+                "PRIMARY KEY (field, value, project_id)) WITHOUT ROWID"
+            )
+            conn.execute(f"CREATE INDEX idx_{TAG_TABLE}_project ON {TAG_TABLE} (project_id)")
+            fillTagIndex(conn)
+            conn.commit()
+    finally:
+        conn.close()
+
+def fillTagIndex(conn):
+    rows = conn.execute(f"SELECT id, {', '.join(TAG_FIELDS)} FROM projects").fetchall()
+
+    conn.executemany(
+        f"INSERT OR IGNORE INTO {TAG_TABLE} (field, value, project_id) VALUES (?, ?, ?)",
+        (
+            (field, tag, row['id'])
+            for row in rows
+            for field in TAG_FIELDS
+            for tag in splitTags(row[field])
+        )
+    )
+
+def rebuildTagIndex():
+    """
+    Re-read every row of 'projects' into the tag table. Called after each CSV import.
+    """
+    from database.setup import getConnection
+
+    conn = getConnection()
+    try:
+        conn.execute(f"DELETE FROM {TAG_TABLE}")
+        fillTagIndex(conn)
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,87 @@
+'''
+/tests/test_pagination.py
+-> listing parameters, cursors and date bounds of the paginated listings: python -m pytest tests (from /backend)
+'''
+
+from datetime import date, datetime
+from types import SimpleNamespace
+import json
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from database.pagination import (
+    PageRequest, decodeCursor, encodeCursor, iterCatalogProjects, parseBound, streamPage
+)
+
+# ==================================================
+# fixtures
+# ==================================================
+
+@pytest.fixture
+def catalog():
+    days = [date(2024, 4, 30), date(2024, 5, 1), date(2024, 5, 1), None, date(2024, 5, 2), date(2024, 5, 3)]
+    return SimpleNamespace(records=tuple(SimpleNamespace(id=i, date=day) for i, day in enumerate(days, 1)))
+
+def listedIds(catalog, **args):
+    return [record.id for record in iterCatalogProjects(catalog, PageRequest.fromArgs(MultiDict(args)))]
+
+# ==================================================
+# cursors
+# ==================================================
+
+@pytest.mark.parametrize("lastId", [0, 1, 123456789012])
+def testCursorRoundTrip(lastId):
+    assert decodeCursor(encodeCursor(lastId)) == lastId
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", encodeCursor("abc")[:-1] + "!"])
+def testInvalidCursorRaises(cursor):
+    with pytest.raises(ValueError):
+        decodeCursor(cursor)
+
+def testPagesFollowTheirCursors(catalog):
+    seen, cursor = [], None
+
+    while True:
+        args = {'limit': '2', **({'cursor': cursor} if cursor else {})}
+        page = PageRequest.fromArgs(MultiDict(args))
+        body = json.loads(''.join(streamPage(
+            iterCatalogProjects(catalog, page), lambda record: record.id, page.limit, lambda record: record.id
+        )))
+        seen.extend(body["items"])
+        cursor = body["nextCursor"]
+        if cursor is None:
+            break
+
+    assert seen == [record.id for record in catalog.records]
+
+# ==================================================
+# date bounds
+# ==================================================
+
+def testBareUpperDateCoversItsDay():
+    assert parseBound('2024-05-01', upper=True) == datetime(2024, 5, 2)
+    assert parseBound('2024-05-01') == datetime(2024, 5, 1)
+
+@pytest.mark.parametrize("args, ids", [
+    ({'from': '2024-05-01'}, [2, 3, 5, 6]),
+    ({'to': '2024-05-01'}, [1, 2, 3]),
+    ({'from': '2024-05-01', 'to': '2024-05-01'}, [2, 3]),
+    # a project date is a day, compared at its midnight
+    ({'to': '2024-05-01T12:00'}, [1, 2, 3]),
+    ({'to': '2024-05-01T00:00'}, [1]),
+    ({'from': '2024-05-01T12:00'}, [5, 6]),
+    ({'from': '2024-05-01T00:00', 'to': '2024-05-02T00:00'}, [2, 3]),
+    # undated projects are only listed without a date filter
+    ({'limit': '10'}, [1, 2, 3, 4, 5, 6]),
+])
+def testProjectDateBounds(catalog, args, ids):
+    assert listedIds(catalog, **args) == ids
+
+def testDateBoundsCombineWithCursor(catalog):
+    assert listedIds(catalog, to='2024-05-01T12:00', cursor=encodeCursor(2)) == [3]
+
+@pytest.mark.parametrize("args", [{'limit': '0'}, {'limit': '1001'}, {'from': '2024-13-01'}, {'cursor': '!!'}])
+def testInvalidPageParametersRaise(args):
+    with pytest.raises(ValueError):
+        PageRequest.fromArgs(MultiDict(args))
@@ -0,0 +1,86 @@
+'''
+/tests/test_queryBuilder.py
+-> literal binding of raw (LLM) SQL: python -m pytest tests (from /backend)
+'''
+
+import sqlite3
+
+import pytest
+
+from database.queryBuilder import Query, anyOf, bindLiterals, compileRawSQL, contains, hasAnyTag
+
+# ==================================================
+# fixtures
+# ==================================================
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY, title TEXT, author TEXT, date TEXT)")
+    conn.executemany(
+        "INSERT INTO projects (title, author, date) VALUES (?, ?, ?)",
+        [("Fado", "O'Neill", "2023-05-01"), ("Mar", "Ana", "2021-02-03")]
+    )
+    yield conn
+    conn.close()
+
+# ==================================================
+# bindLiterals
+# ==================================================
+
+@pytest.mark.parametrize("sql, expected, params", [
+    ("SELECT * FROM projects WHERE date < '2024-01-01'",
+     "SELECT * FROM projects WHERE date < ?", ['2024-01-01']),
+    ("SELECT * FROM projects WHERE author LIKE '%ana%' AND date >= '2020'",
+     "SELECT * FROM projects WHERE author LIKE ? AND date >= ?", ['%ana%', '2020']),
+    ("SELECT * FROM projects WHERE author not like '%a%'",
+     "SELECT * FROM projects WHERE author not like ?", ['%a%']),
+    ("SELECT * FROM projects WHERE author != 'Ana' OR author <> 'Rui'",
+     "SELECT * FROM projects WHERE author != ? OR author <> ?", ['Ana', 'Rui']),
+    ("SELECT * FROM projects WHERE author='O''Neill'",
+     "SELECT * FROM projects WHERE author=?", ["O'Neill"]),
+])
+def testBindsComparedLiterals(sql, expected, params):
+    assert bindLiterals(sql) == (expected, params)
+
+@pytest.mark.parametrize("sql", [
+    "SELECT title AS 'Título' FROM projects",
+    "SELECT * FROM projects WHERE author IN ('Ana', 'Rui')",
+    "SELECT * FROM projects WHERE title LIKE ? ESCAPE '\\'",
+    "SELECT 'a' || title FROM projects",
+])
+def testKeepsOtherLiterals(sql):
+    assert bindLiterals(sql) == (sql, [])
+
+def testQuotesInsideLiteralsAreNotOperators():
+    sql = "SELECT * FROM projects WHERE title = 'a = b' AND author LIKE '%x%'"
+    assert bindLiterals(sql) == ("SELECT * FROM projects WHERE title = ? AND author LIKE ?", ['a = b', '%x%'])
+
+# ==================================================
+# compiled raw SQL runs
+# ==================================================
+
+@pytest.mark.parametrize("sql, titles", [
+    ("SELECT title AS 'Título' FROM projects WHERE date < '2022-01-01'", ['Mar']),
+    ("SELECT title FROM projects WHERE author = 'O''Neill'", ['Fado']),
+    ("SELECT title FROM projects WHERE author IN ('Ana', 'Rui') OR date LIKE '%2023%' ORDER BY id", ['Fado', 'Mar']),
+])
+def testCompiledRawSQLExecutes(conn, sql, titles):
+    statement, params = compileRawSQL(sql)
+    assert [row[0] for row in conn.execute(statement, params)] == titles
+
+def testLikeOverIndexedColumnBindsMatchExpression():
+    statement, params = compileRawSQL("SELECT * FROM projects WHERE title LIKE '%saudade%'")
+    assert 'MATCH ?' in statement
+    assert "'" not in statement
+    assert len(params) == 1 and 'saudade' in params[0]
+
+# ==================================================
+# query identity
+# ==================================================
+
+def testTagLookupAndSubstringScanHaveDistinctKeys():
+    tags = Query(hasAnyTag('author', ['Maria', 'Silva']))
+    scan = Query(anyOf(contains('author', 'Maria'), contains('author', 'Silva')))
+    assert tags == scan
+    assert tags.key() != scan.key()
@@ -0,0 +1,248 @@
+'''
+/utilities/jobs/setup.py
+-> background CSV import jobs, single-flight across threads and worker processes
+'''
+
+from datetime import datetime
+import threading
+import fcntl
+import queue
+import uuid
+import time
+import json
+import os
+
+from database.setup import dbPath, getConnection
+from database.fetchData import fetchCSV
+from database.reportBuilder import ReportBuilder
+from utilities.tracing.setup import getLogger, trace
+
+# ==================================================
+# global vars
+# ==================================================
+
+# held (flock) by the process running an import, contains the running job id
+LOCK_PATH = os.path.join(os.path.dirname(dbPath), 'import.lock')
+
+log = getLogger('jobs')
+
+# seconds between progress writes to the importJobs table
+PROGRESS_INTERVAL = 2
+
+# finished jobs kept in memory for live event streams
+MAX_LOCAL_JOBS = 10
+
+appRef = None
+localJobs = {}
+localLock = threading.Lock()
+
+# ==================================================
+# local job
+# ==================================================
+
+class LocalJob:
+    """
+    An import running (or finished) in this process. Forwards report events to
+    live subscribers and keeps created/updated/error counts for the progress row.
+    """
+
+    def __init__(self, jobId, trigger, lockFile):
+        self.id = jobId
+        self.trigger = trigger
+        self.lockFile = lockFile
+        self.done = threading.Event()
+        self.subscribers = []
+        # events sent so far, replayed to new subscribers; only onEvent appends (under eventsLock),
+        # so an event is either replayed or delivered live, never both
+        self.history = []
+        self.eventsLock = threading.Lock()
+        self.counts = {"created": 0, "updated": 0, "error": 0}
+        self.reporter = ReportBuilder(listener=self.onEvent)
+
+    def onEvent(self, event):
+        if event["type"] in self.counts:
+            self.counts[event["type"]] += 1
+
+        with self.eventsLock:
+            self.history.append(event)
+            for subscriber in self.subscribers:
+                subscriber.put(event)
+
+    def subscribe(self):
+        """
+        Queue receiving every past and future event, then None when the job ends.
+        """
+        subscriber = queue.Queue()
+
+        with self.eventsLock:
+            for event in self.history:
+                subscriber.put(event)
+            if self.done.is_set():
+                subscriber.put(None)
+            else:
+                self.subscribers.append(subscriber)
+
+        return subscriber
+
+    def close(self):
+        with self.eventsLock:
+            self.done.set()
+            for subscriber in self.subscribers:
+                subscriber.put(None)
+            self.subscribers = []
+
+# ==================================================
+# job rows
+# ==================================================
+
+def insertJobRow(job):
+    conn = getConnection()
+    try:
+        # a crashed process releases its flock but leaves its row 'running'
+        conn.execute("UPDATE importJobs SET status = 'interrupted' WHERE status = 'running'")
+        conn.execute(
+            "INSERT INTO importJobs (id, trigger, status, currentLine, totalLines, created, updated, errors, started_at) "
+            "VALUES (?, ?, 'running', 0, 0, 0, 0, 0, ?)",
+            (job.id, job.trigger, datetime.utcnow().isoformat(sep=' '))
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+def updateJobRow(job, status=None, error=None):
+    reporter = job.reporter
+    fields = {
+        "currentLine": reporter.currentLine,
+        "totalLines": reporter.totalLines,
+        "created": job.counts["created"],
+        "updated": job.counts["updated"],
+        "errors": job.counts["error"],
+    }
+
+    if status:
+        fields["status"] = status
+        fields["finished_at"] = datetime.utcnow().isoformat(sep=' ')
+        fields["report"] = reporter.renderJSON()
+        fields["error"] = error
+
+    conn = getConnection()
+    try:
+        conn.execute(
+            f"UPDATE importJobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+            (*fields.values(), job.id)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+# ==================================================
+# run
+# ==================================================
+
+def reportProgress(job):
+    while not job.done.wait(PROGRESS_INTERVAL):
+        try:
+            updateJobRow(job)
+        except Exception as e:
+            log.warning("Error saving import progress: %s", e)
+
+def runJob(job):
+    threading.Thread(target=reportProgress, args=(job,), daemon=True).start()
+
+    status, error = 'done', None
+
+    with appRef.app_context():
+        try:
+            with trace('import', jobId=job.id, trigger=job.trigger):
+                fetchCSV(job.reporter)
+            log.info("CSV import %s (%s) completed.", job.id, job.trigger)
+        except Exception as e:
+            log.error("Error in CSV import %s (%s): %s", job.id, job.trigger, e)
+            job.reporter.addFailure(e)
+            status, error = 'failed', str(e)[:512]
+
+    try:
+        updateJobRow(job, status=status, error=error)
+    finally:
+        fcntl.flock(job.lockFile, fcntl.LOCK_UN)
+        job.lockFile.close()
+        job.close()
+
+def readLockOwner():
+    """
+    Id of the job holding the import lock in another process (written right after locking).
+    """
+    for _ in range(20):
+        with open(LOCK_PATH) as f:
+            jobId = f.read().strip()
+        if jobId:
+            return jobId
+        time.sleep(0.05)
+    return None
+
+def waitForLock():
+    """
+    Block until the import holding the lock in another process ends.
+    """
+    with open(LOCK_PATH, 'a+') as lockFile:
+        fcntl.flock(lockFile, fcntl.LOCK_SH)
+        fcntl.flock(lockFile, fcntl.LOCK_UN)
+
+def startImport(trigger, wait=False):
+    """
+    Start a CSV import in the background, or join the one already running
+    (in this process or another worker). With wait, returns once that import ended.
+    Returns (jobId, joined).
+    """
+    with localLock:
+        running = next((job for job in localJobs.values() if not job.done.is_set()), None)
+
+        if running is None:
+            lockFile = open(LOCK_PATH, 'a+')
+            try:
+                fcntl.flock(lockFile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lockFile.close()
+                ownerId = readLockOwner()
+                if wait:
+                    waitForLock()
+                return ownerId, True
+
+            job = LocalJob(uuid.uuid4().hex, trigger, lockFile)
+
+            lockFile.seek(0)
+            lockFile.truncate()
+            lockFile.write(job.id)
+            lockFile.flush()
+
+            insertJobRow(job)
+
+            # forget old finished jobs
+            finished = [i for i, j in localJobs.items() if j.done.is_set()]
+            for oldId in finished[:max(0, len(finished) - MAX_LOCAL_JOBS + 1)]:
+                del localJobs[oldId]
+            localJobs[job.id] = job
+
+    if running is not None:
+        if wait:
+            running.done.wait()
+        return running.id, True
+
+    thread = threading.Thread(target=runJob, args=(job,), daemon=True)
+    thread.start()
+
+    if wait:
+        job.done.wait()
+
+    return job.id, False
+
+def getLocalJob(jobId):
+    return localJobs.get(jobId)
+
+# ==================================================
+# initialize on app context
+# ==================================================
+
+def initJobs(app):
+    global appRef
+    appRef = app
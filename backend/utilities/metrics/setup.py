@@ -0,0 +1,247 @@
+'''
+/utilities/metrics/setup.py
+-> in-process counters and histograms for the query pipeline, exported on /metrics in Prometheus text format
+'''
+
+from contextlib import contextmanager
+from flask import Response
+import threading
+import time
+
+# ==================================================
+# global vars
+# ==================================================
+
+# seconds: from a cached lookup to a cold 8B model generation
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# seconds: in-process steps (parsing, serialization)
+FAST_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1)
+
+# seconds: import phases
+IMPORT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# seconds: waiting for / holding a pooled read connection (up to its acquire timeout)
+POOL_BUCKETS = (0.00001, 0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+
+# sizes: candidate and result counts
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+registry = []
+
+# ==================================================
+# metric types
+# ==================================================
+
+def formatLabels(labelNames, labelValues, extra=()):
+    pairs = list(zip(labelNames, labelValues)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def formatNumber(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """
+    Monotonic count per label set.
+    """
+
+    def __init__(self, name, documentation, labelNames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelNames = tuple(labelNames)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelNames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{formatLabels(self.labelNames, key)} {formatNumber(value)}")
+        return lines
+
+class Gauge:
+    """
+    Current value per label set, moved up and down.
+    """
+
+    def __init__(self, name, documentation, labelNames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelNames = tuple(labelNames)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelNames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{formatLabels(self.labelNames, key)} {formatNumber(value)}")
+        return lines
+
+class Histogram:
+    """
+    Cumulative buckets, sum and count per label set.
+    """
+
+    def __init__(self, name, documentation, labelNames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelNames = tuple(labelNames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelNames)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                # per-bucket counts (last one is +Inf), sum
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            else:
+                entry[0][-1] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of the 'with' block, in seconds (also when it raises).
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    labels = formatLabels(self.labelNames, key, [('le', formatNumber(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = formatLabels(self.labelNames, key)
+                lines.append(f"{self.name}_sum{labels} {formatNumber(total)}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+def renderMetrics():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+# ==================================================
+# pipeline metrics
+# ==================================================
+
+routerRequests = Counter(
+    'lastro_router_requests_total', 'Contextual intent lookups by how they were resolved.', ['source']
+)
+routerSeconds = Histogram(
+    'lastro_router_model_seconds', 'Router model request time (cache misses only).'
+)
+
+llmRequests = Counter(
+    'lastro_llm_requests_total', 'SQL model requests by mode and response cache result.', ['mode', 'cache']
+)
+llmCacheLookups = Counter(
+    'lastro_llm_cache_lookups_total', 'Model response cache lookups by tier that answered.', ['namespace', 'result']
+)
+llmSeconds = Histogram(
+    'lastro_llm_seconds', 'SQL model generation time (cache misses only).', ['mode', 'outcome']
+)
+llmFirstChunkSeconds = Histogram(
+    'lastro_llm_first_chunk_seconds', 'Time to the first streamed chunk of the SQL model.'
+)
+
+parseSeconds = Histogram(
+    'lastro_parse_seconds', 'Model output parsing time (stripQueries).', buckets=FAST_BUCKETS
+)
+sqlQuerySeconds = Histogram(
+    'lastro_sql_query_seconds', 'Time per query in executeQueriesSQL, fetch included.', ['kind']
+)
+sqlQueryRows = Histogram(
+    'lastro_sql_query_rows', 'Rows returned per query in executeQueriesSQL.', ['kind'], buckets=COUNT_BUCKETS
+)
+
+fallbackLevels = Counter(
+    'lastro_fallback_total', 'Fallbacks applied, by the level they reached.', ['level']
+)
+keywordExpansions = Counter(
+    'lastro_keyword_expansion_total', 'Keyword expansion checks by outcome.', ['outcome']
+)
+serializeSeconds = Histogram(
+    'lastro_serialize_seconds', 'Result serialization time (serializeResults).', buckets=FAST_BUCKETS
+)
+
+suggestionSeconds = Histogram(
+    'lastro_suggestions_seconds', 'getSuggestions time, by candidate source.', ['source']
+)
+suggestionsReturned = Histogram(
+    'lastro_suggestions_returned', 'Suggestions per getSuggestions call.', ['source'], buckets=COUNT_BUCKETS
+)
+suggestionCandidates = Histogram(
+    'lastro_suggestion_candidates', 'Candidate projects per suggestion.', ['source'], buckets=COUNT_BUCKETS
+)
+
+readPoolWaitSeconds = Histogram(
+    'lastro_read_pool_wait_seconds', 'Time to acquire a read connection (timeouts excluded).', buckets=POOL_BUCKETS
+)
+readPoolHoldSeconds = Histogram(
+    'lastro_read_pool_hold_seconds', 'Time a read connection is held per use.', buckets=POOL_BUCKETS
+)
+readPoolTimeouts = Counter(
+    'lastro_read_pool_timeouts_total', 'Read connection requests that timed out waiting for the pool.'
+)
+readPoolConnections = Gauge(
+    'lastro_read_pool_connections', 'Read connections, opened and currently in use.', ['state']
+)
+
+importPhaseSeconds = Histogram(
+    'lastro_import_phase_seconds', 'fetchCSV time per phase.', ['phase'], buckets=IMPORT_BUCKETS
+)
+
+logRecordsDropped = Counter(
+    'lastro_log_records_dropped_total', 'Log records dropped because the log queue was full.'
+)
+
+# ==================================================
+# initialize on app context
+# ==================================================
+
+def initMetrics(app):
+    """
+    Expose the metrics of this process on /metrics (each worker process keeps its own).
+    """
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(renderMetrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
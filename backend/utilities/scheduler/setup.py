@@ -5,7 +5,8 @@
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from database.fetchData import fetchCSV
+from utilities.jobs.setup import startImport
+from utilities.tracing.setup import getLogger
 
 # ==================================================
 # global vars
@@ -13,17 +14,22 @@ from database.fetchData import fetchCSV
 
 scheduler = BackgroundScheduler()
 
+log = getLogger('scheduler')
+
 # ==================================================
 # methods
 # ==================================================
 
-def jobToAppContext(app,jobFunction):
-    with app.app_context():
-        try:
-            result = jobFunction()
-            print(f"Scheduled CSV fetch completed.")
-        except Exception as e:
-            print(f"Error in scheduled CSV fetch: {e}")
+def scheduledImport():
+    # joins the import instead if one is already running (another worker or /fetch-csv)
+    try:
+        jobId, joined = startImport('scheduler', wait=True)
+        if joined:
+            log.info("Scheduled CSV fetch joined running import %s.", jobId)
+        else:
+            log.info("Scheduled CSV fetch completed.")
+    except Exception as e:
+        log.error("Error in scheduled CSV fetch: %s", e)
 
 # ==================================================
 # init and clean methods
@@ -32,7 +38,7 @@ def jobToAppContext(app,jobFunction):
 def initScheduler(app):
     # fetch data from CSV job
     scheduler.add_job(
-        func=lambda: jobToAppContext(app, fetchCSV),
+        func=scheduledImport,
         trigger='cron',
         hour=4, minute=0,
         timezone='Europe/Lisbon',
@@ -0,0 +1,396 @@
+'''
+/utilities/tracing/setup.py
+-> leveled logging through a non-blocking queue, and sampled request-scoped traces exported as JSON lines
+'''
+
+from logging.handlers import QueueHandler, QueueListener
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request
+from dotenv import load_dotenv
+from utilities.metrics.setup import logRecordsDropped
+import itertools
+import logging
+import atexit
+import random
+import queue
+import json
+import time
+import uuid
+import sys
+import os
+
+load_dotenv()
+
+# ==================================================
+# global vars
+# ==================================================
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# 'text' or 'json' (one object per line)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+# fraction of requests traced (0: tracing off), and where sampled traces go (stderr when unset)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0.0))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")
+# honour 'X-Trace: 1' from clients (off by default: any caller could force the cost of a trace)
+TRACE_HEADER_ENABLED = os.getenv("TRACE_HEADER_ENABLED", "0") == "1"
+
+# records waiting for the writer thread; past this, new records are dropped instead of blocking
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+# events kept per span (prompts and fallbacks can be chatty)
+MAX_SPAN_EVENTS = 100
+
+ROOT_LOGGER = 'lastro'
+TRACE_LOGGER = 'lastro.trace'
+
+currentSpan = ContextVar('currentSpan', default=None)
+
+listener = None
+
+# ==================================================
+# spans
+# ==================================================
+
+class Span:
+    """
+    A timed step of a sampled trace, with attributes and log events.
+    """
+    __slots__ = ('trace', 'spanId', 'parentId', 'name', 'start', 'end', 'attributes', 'events', 'error')
+
+    def __init__(self, trace, name, parentId, attributes):
+        self.trace = trace
+        self.spanId = next(trace.spanIds)
+        self.parentId = parentId
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.attributes = attributes
+        self.events = []
+        self.error = None
+        trace.spans.append(self)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def addEvent(self, level, message, args, attributes):
+        if len(self.events) >= MAX_SPAN_EVENTS:
+            return
+        event = {
+            "atMs": round((time.perf_counter() - self.trace.start) * 1000, 3),
+            "level": logging.getLevelName(level),
+            "message": message % args if args else message,
+        }
+        if attributes:
+            event["attributes"] = attributes
+        self.events.append(event)
+
+    def export(self):
+        return {
+            "spanId": self.spanId,
+            "parentId": self.parentId,
+            "name": self.name,
+            "startMs": round((self.start - self.trace.start) * 1000, 3),
+            "durationMs": round(((self.end or time.perf_counter()) - self.start) * 1000, 3),
+            "attributes": self.attributes,
+            "events": self.events,
+            "error": self.error,
+        }
+
+class NoopSpan:
+    """
+    Stand-in when the current request is not sampled: every call is a no-op.
+    """
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+NOOP_SPAN = NoopSpan()
+
+class Trace:
+    __slots__ = ('traceId', 'start', 'startedAt', 'spans', 'spanIds')
+
+    def __init__(self):
+        self.traceId = uuid.uuid4().hex
+        self.start = time.perf_counter()
+        self.startedAt = time.time()
+        self.spans = []
+        # spans can be opened concurrently (executor threads): ids come from an atomic counter
+        self.spanIds = itertools.count()
+
+    def export(self):
+        root = self.spans[0]
+        return {
+            "traceId": self.traceId,
+            "name": root.name,
+            "startedAt": self.startedAt,
+            "durationMs": round(((root.end or time.perf_counter()) - root.start) * 1000, 3),
+            "spans": [span.export() for span in self.spans],
+        }
+
+def shouldSample(force=False):
+    return force or (TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE)
+
+def startTrace(name, sampled, **attributes):
+    """
+    Open the root span of a new trace in the current context (None when not sampled).
+    Returns (context token, root span) for endTrace.
+    """
+    root = Span(Trace(), name, None, attributes) if sampled else None
+    return currentSpan.set(root), root
+
+def leaveTrace(started):
+    try:
+        currentSpan.reset(started[0])
+    except ValueError:
+        # left from another context: just clear this one
+        currentSpan.set(None)
+
+def finishTrace(root, error=None):
+    root.end = time.perf_counter()
+    if error is not None:
+        root.error = repr(error)
+
+    exportTrace(root.trace)
+
+def endTrace(started, error=None):
+    leaveTrace(started)
+
+    if started[1] is not None:
+        finishTrace(started[1], error)
+
+@contextmanager
+def trace(name, sampled=None, **attributes):
+    """
+    Root span outside of a request (imports, scheduled jobs). Sampled like requests by default.
+    """
+    started = startTrace(name, shouldSample() if sampled is None else sampled, **attributes)
+    error = None
+    try:
+        yield started[1] or NOOP_SPAN
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        endTrace(started, error)
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Child span of the current one; a shared no-op when the trace is not sampled.
+    """
+    parent = currentSpan.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+
+    child = Span(parent.trace, name, parent.spanId, attributes)
+    token = currentSpan.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = repr(e)
+        raise
+    finally:
+        child.end = time.perf_counter()
+        currentSpan.reset(token)
+
+def streamWithTrace(chunks):
+    """
+    Keep a streamed response in the request's trace: chunks are generated under the root span,
+    and the trace is exported when the stream ends rather than when the view returns.
+    """
+    started = g.get('trace')
+    if started is None or started[1] is None:
+        return chunks
+
+    g.traceStreamed = True
+    root = started[1]
+
+    def generate():
+        error = None
+        iterator = iter(chunks)
+        try:
+            while True:
+                token = currentSpan.set(root)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    currentSpan.reset(token)
+                yield chunk
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            finishTrace(root, error)
+
+    return generate()
+
+def annotate(**attributes):
+    """
+    Set attributes on the current span, if the request is sampled.
+    """
+    current = currentSpan.get()
+    if current is not None:
+        current.set(**attributes)
+
+def exportTrace(trace):
+    logging.getLogger(TRACE_LOGGER).info(json.dumps(trace.export(), ensure_ascii=False, default=str))
+
+# ==================================================
+# logging
+# ==================================================
+
+class TraceLogger:
+    """
+    Leveled logger with lazy %-formatting. Records go to the log when their level is enabled,
+    and to the current span when the request is sampled; otherwise a call costs a level check.
+    """
+    __slots__ = ('logger',)
+
+    def __init__(self, name):
+        self.logger = logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+    def log(self, level, message, *args, **attributes):
+        current = currentSpan.get()
+        if current is not None:
+            current.addEvent(level, message, args, attributes)
+
+        if self.logger.isEnabledFor(level):
+            traceId = current.trace.traceId if current is not None else None
+            self.logger.log(level, message, *args, extra={"traceId": traceId, "attributes": attributes})
+
+    def debug(self, message, *args, **attributes):
+        self.log(logging.DEBUG, message, *args, **attributes)
+
+    def info(self, message, *args, **attributes):
+        self.log(logging.INFO, message, *args, **attributes)
+
+    def warning(self, message, *args, **attributes):
+        self.log(logging.WARNING, message, *args, **attributes)
+
+    def error(self, message, *args, **attributes):
+        self.log(logging.ERROR, message, *args, **attributes)
+
+def getLogger(name):
+    return TraceLogger(name)
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, 'traceId', None):
+            entry["traceId"] = record.traceId
+        if getattr(record, 'attributes', None):
+            entry["attributes"] = record.attributes
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Never blocks the caller: when the writer thread falls behind and the queue is full,
+    the record is dropped and counted.
+    """
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            logRecordsDropped.inc()
+
+class LoggerFilter(logging.Filter):
+    def __init__(self, prefix, include):
+        super().__init__()
+        self.prefix = prefix
+        self.include = include
+
+    def filter(self, record):
+        return record.name.startswith(self.prefix) == self.include
+
+def configureLogging():
+    """
+    Route 'lastro' records through a bounded queue to a writer thread (idempotent).
+    """
+    global listener
+
+    if listener is not None:
+        return
+
+    logStream = logging.StreamHandler(sys.stdout)
+    logStream.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(
+        '%(asctime)s %(levelname)s %(name)s: %(message)s'
+    ))
+    logStream.addFilter(LoggerFilter(TRACE_LOGGER, include=False))
+
+    traceOutput = logging.FileHandler(TRACE_EXPORT_PATH, encoding='utf-8') if TRACE_EXPORT_PATH else logging.StreamHandler(sys.stderr)
+    traceOutput.setFormatter(logging.Formatter('%(message)s'))
+    traceOutput.addFilter(LoggerFilter(TRACE_LOGGER, include=True))
+
+    logQueue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(DroppingQueueHandler(logQueue))
+    root.propagate = False
+
+    # traces are exported whatever the log level
+    logging.getLogger(TRACE_LOGGER).setLevel(logging.INFO)
+
+    listener = QueueListener(logQueue, logStream, traceOutput)
+    listener.start()
+    atexit.register(stopLogging)
+
+def stopLogging():
+    """
+    Write out the queued records and stop the writer thread.
+    """
+    global listener
+
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+# ==================================================
+# initialize on app context
+# ==================================================
+
+def initTracing(app):
+    """
+    One trace per request: sampled at TRACE_SAMPLE_RATE, or forced with an 'X-Trace: 1' header
+    when TRACE_HEADER_ENABLED.
+    """
+    configureLogging()
+
+    @app.before_request
+    def beginRequestTrace():
+        sampled = shouldSample(force=TRACE_HEADER_ENABLED and request.headers.get('X-Trace') == '1')
+        g.trace = startTrace(f"{request.method} {request.path}", sampled, endpoint=request.endpoint)
+
+    @app.after_request
+    def tagRequestTrace(response):
+        annotate(status=response.status_code)
+        current = currentSpan.get()
+        if current is not None:
+            response.headers['X-Trace-Id'] = current.trace.traceId
+        return response
+
+    @app.teardown_request
+    def finishRequestTrace(error=None):
+        started = g.pop('trace', None)
+        if started is None:
+            return
+
+        # streamed responses finish their trace themselves (streamWithTrace)
+        if g.pop('traceStreamed', False):
+            leaveTrace(started)
+        else:
+            endTrace(started, error)
@@ -0,0 +1,121 @@
+'''
+/utilities/vimeo/cache.py
+-> on-disk cache of vimeo video metadata, with negative caching of failed lookups
+'''
+
+from datetime import date
+import threading
+import sqlite3
+import time
+import os
+
+# ==================================================
+# global vars
+# ==================================================
+
+CACHE_PATH = os.getenv(
+    "VIMEO_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vimeo_cache.db')
+)
+
+# resolved dates never change; they are only revalidated (conditionally) after this long
+REFRESH_AFTER = int(os.getenv("VIMEO_REFRESH_AFTER", 180 * 24 * 3600))
+
+# definitive failures (404, 403...) vs transient ones (5xx, timeouts, retries exhausted)
+NEGATIVE_TTL = int(os.getenv("VIMEO_NEGATIVE_TTL", 7 * 24 * 3600))
+TRANSIENT_TTL = int(os.getenv("VIMEO_TRANSIENT_TTL", 6 * 3600))
+
+# ==================================================
+# cache
+# ==================================================
+
+class VimeoMetadataCache:
+    """
+    vimeo_id -> created_time, fetch status, validators (ETag / Last-Modified) and expiry.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def getConn(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self.conn.row_factory = sqlite3.Row
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS videos ("
+                "vimeo_id INTEGER PRIMARY KEY, "
+                "created_time TEXT, "
+                "status TEXT NOT NULL, "
+                "error TEXT, "
+                "etag TEXT, "
+                "last_modified TEXT, "
+                "fetched_at REAL NOT NULL, "
+                "expires_at REAL NOT NULL)"
+            )
+            self.conn.commit()
+        return self.conn
+
+    def getMany(self, pids):
+        """
+        Returns {pid: row} for the ids present in the cache (expired or not).
+        """
+        pids = list(pids)
+        entries = {}
+
+        with self.lock:
+            conn = self.getConn()
+            # stay under SQLite's bound parameter limit
+            for i in range(0, len(pids), 500):
+                chunk = pids[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT * FROM videos WHERE vimeo_id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                entries.update({row['vimeo_id']: row for row in rows})
+
+        return entries
+
+    def putMany(self, results):
+        """
+        Store fetch results: {pid: metadata dict from VimeoClient.fetchMetadata}.
+        """
+        now = time.time()
+        rows = []
+
+        for pid, meta in results.items():
+            if meta['status'] == 'ok':
+                expiresAt = now + REFRESH_AFTER
+                createdTime = meta['date'].isoformat()
+            else:
+                expiresAt = now + (TRANSIENT_TTL if meta.get('transient') else NEGATIVE_TTL)
+                createdTime = None
+
+            rows.append((
+                pid, createdTime, meta['status'], meta.get('error'),
+                meta.get('etag'), meta.get('lastModified'), now, expiresAt
+            ))
+
+        if not rows:
+            return
+
+        with self.lock:
+            conn = self.getConn()
+            conn.executemany(
+                "INSERT OR REPLACE INTO videos "
+                "(vimeo_id, created_time, status, error, etag, last_modified, fetched_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+
+def isFresh(row, now=None):
+    return row['expires_at'] > (now or time.time())
+
+def rowToResult(row):
+    """
+    Cached row -> the value getVimeoDate returns (date or error string).
+    """
+    if row['status'] == 'ok':
+        return date.fromisoformat(row['created_time'])
+    return row['error']
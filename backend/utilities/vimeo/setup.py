@@ -3,39 +3,297 @@
 -> handle vimeo api communications
 '''
 
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from datetime import datetime
+import threading
 import requests
+import random
+import time
 import os
 
+from utilities.vimeo.cache import VimeoMetadataCache, isFresh, rowToResult
+from utilities.tracing.setup import getLogger
+
 load_dotenv()
 
 # ==================================================
 # global vars
 # ==================================================
 
+log = getLogger('vimeo')
+
 # vimeo token for publish dates fetch
 VIMEO_TOKEN = os.getenv("VIMEO_TOKEN")
 
+VIMEO_API_URL = "https://api.vimeo.com/videos"
+
+MAX_WORKERS = int(os.getenv("VIMEO_MAX_WORKERS", 8))
+MAX_RETRIES = 5
+# 429 waits are not retries (waiting out the window works); this only stops a server that never lets us through
+MAX_RATE_LIMIT_WAITS = 30
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+REQUEST_TIMEOUT = 15
+
+# request rate used until Vimeo reports the actual quota in its headers
+DEFAULT_RATE = 4.0
+
+# ==================================================
+# rate limiting
+# ==================================================
+
+def parseResetTime(value):
+    """
+    X-RateLimit-Reset is an ISO date ('2024-01-01T10:00:00+00:00'); accept epoch seconds too.
+    Returns a unix timestamp or None.
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+class TokenBucket:
+    """
+    Shared by all workers. The refill rate follows Vimeo's rate-limit headers:
+    the remaining quota is spread over the time left until the window resets.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, capacity=MAX_WORKERS):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updatedAt = time.monotonic()
+        self.pausedUntil = 0.0
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updatedAt) * self.rate)
+        self.updatedAt = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+
+                if now < self.pausedUntil:
+                    wait = self.pausedUntil - now
+                else:
+                    self.refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.pausedUntil = max(self.pausedUntil, time.monotonic() + seconds)
+            self.tokens = 0
+
+    def updateFromHeaders(self, headers):
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = parseResetTime(headers.get("X-RateLimit-Reset"))
+
+        if remaining is None or reset is None:
+            return
+
+        try:
+            remaining = int(remaining)
+        except ValueError:
+            return
+
+        secondsLeft = max(reset - time.time(), 1.0)
+
+        if remaining <= 0:
+            self.pause(secondsLeft)
+            return
+
+        with self.lock:
+            self.refill(time.monotonic())
+            self.rate = max(remaining / secondsLeft, 0.01)
+            self.tokens = min(self.tokens, remaining)
+
+# ==================================================
+# client
+# ==================================================
+
+class VimeoClient:
+    """
+    Pooled HTTP session, shared token bucket and retry with exponential backoff.
+    """
+
+    def __init__(self, token=VIMEO_TOKEN, maxWorkers=MAX_WORKERS):
+        self.maxWorkers = maxWorkers
+        self.bucket = TokenBucket(capacity=maxWorkers)
+
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"bearer {token}"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=maxWorkers)
+        self.session.mount("https://", adapter)
+
+    def backoff(self, attempt):
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+        time.sleep(delay * (0.5 + random.random() / 2))
+
+    def fetchMetadata(self, pid, cached=None):
+        """
+        Fetch a video's metadata. With a cached entry, the request is conditional
+        (If-None-Match / If-Modified-Since) and a 304 keeps the cached date.
+        Returns {'status': 'ok', 'date', 'etag', 'lastModified'}
+             or {'status': 'error', 'error' (containing 'error'), 'transient'}.
+        """
+        headers = {}
+        if cached is not None and cached['status'] == 'ok':
+            if cached['etag']:
+                headers["If-None-Match"] = cached['etag']
+            if cached['last_modified']:
+                headers["If-Modified-Since"] = cached['last_modified']
+
+        attempt = 0
+        rateLimitWaits = 0
+
+        while attempt < MAX_RETRIES and rateLimitWaits < MAX_RATE_LIMIT_WAITS:
+            self.bucket.acquire()
+
+            try:
+                response = self.session.get(
+                    f"{VIMEO_API_URL}/{pid}",
+                    params={"fields": "created_time"},
+                    headers=headers,
+                    timeout=REQUEST_TIMEOUT
+                )
+            except requests.RequestException as e:
+                log.warning("Vimeo request failed for %s (%s), retrying.", pid, e)
+                self.backoff(attempt)
+                attempt += 1
+                continue
+
+            self.bucket.updateFromHeaders(response.headers)
+
+            if response.status_code == 304 and headers:
+                return {
+                    "status": "ok",
+                    "date": rowToResult(cached),
+                    "etag": response.headers.get("ETag", cached['etag']),
+                    "lastModified": response.headers.get("Last-Modified", cached['last_modified'])
+                }
+
+            if response.status_code == 200:
+                data = response.json()
+                dt = datetime.fromisoformat(data.get("created_time").replace("Z", "+00:00"))
+                return {
+                    "status": "ok",
+                    "date": dt.date(),
+                    "etag": response.headers.get("ETag"),
+                    "lastModified": response.headers.get("Last-Modified")
+                }
+
+            if response.status_code == 429: # Rate limit exceeded
+                retryAfter = response.headers.get("Retry-After")
+                reset = parseResetTime(response.headers.get("X-RateLimit-Reset"))
+                if retryAfter and retryAfter.isdigit():
+                    wait = int(retryAfter)
+                elif reset:
+                    wait = max(reset - time.time(), 1.0)
+                else:
+                    wait = 61
+                log.warning("Vimeo API rate limit exceeded — 429, pausing %.0fs", wait)
+                self.bucket.pause(wait)
+                rateLimitWaits += 1
+                continue
+
+            if response.status_code >= 500:
+                self.backoff(attempt)
+                attempt += 1
+                continue
+
+            try:
+                body = response.json()
+            except ValueError:
+                body = {"error": response.text}
+            log.error("Vimeo API error: %s", body)
+            return {"status": "error", "error": f"{body}", "transient": False}
+
+        return {
+            "status": "error",
+            "error": f"{{'error': 'Vimeo request for {pid} failed after {attempt} attempts and {rateLimitWaits} rate limit waits'}}",
+            "transient": True
+        }
+
+    def fetchDate(self, pid):
+        """
+        Returns the publish date of a video, or an error string (containing 'error').
+        """
+        meta = self.fetchMetadata(pid)
+        return meta['date'] if meta['status'] == 'ok' else meta['error']
+
+    def fetchDates(self, pids, cache=None):
+        """
+        Fetch publish dates concurrently with a bounded worker pool.
+        With a cache, fresh entries (resolved or known-bad) are answered without a request,
+        stale ones are revalidated, and every fetch result is stored.
+        Returns {pid: date or error string}.
+        """
+        pids = list(dict.fromkeys(pids))
+        if not pids:
+            return {}
+
+        results = {}
+        cached = cache.getMany(pids) if cache else {}
+
+        now = time.time()
+        toFetch = []
+        for pid in pids:
+            entry = cached.get(pid)
+            if entry is not None and isFresh(entry, now):
+                results[pid] = rowToResult(entry)
+            else:
+                toFetch.append(pid)
+
+        if cache:
+            log.info("Vimeo cache: %d of %d ids resolved without a request.", len(results), len(pids))
+
+        if toFetch:
+            with ThreadPoolExecutor(max_workers=min(self.maxWorkers, len(toFetch))) as executor:
+                fetched = dict(zip(toFetch, executor.map(
+                    lambda pid: self.fetchMetadata(pid, cached.get(pid)), toFetch
+                )))
+
+            if cache:
+                cache.putMany(fetched)
+
+            for pid, meta in fetched.items():
+                results[pid] = meta['date'] if meta['status'] == 'ok' else meta['error']
+
+        return results
+
+client = None
+clientLock = threading.Lock()
+
+metadataCache = VimeoMetadataCache()
+
+def getClient():
+    global client
+    with clientLock:
+        if client is None:
+            client = VimeoClient()
+        return client
+
 # ==================================================
 # methods
 # ==================================================
 
 def getVimeoDate(pid):
-    url = f"https://api.vimeo.com/videos/{pid}"
-    headers = {
-        "Authorization": f"bearer {VIMEO_TOKEN}"
-    }
-
-    response = requests.get(url, headers=headers)
-
-    if response.status_code == 200:
-        data = response.json()
-        dt = datetime.fromisoformat(data.get("created_time").replace("Z", "+00:00"))
-        return dt.date()
-    elif response.status_code == 429: # Rate limit exceeded
-        print("Vimeo API rate limit exceeded — 429")
-        return "RATE_LIMIT_EXCEEDED"
-    else:
-        print("Error:", response.json())
-        return f"{response.json()}"
\ No newline at end of file
+    return getClient().fetchDate(pid)
+
+def getVimeoDates(pids):
+    return getClient().fetchDates(pids, cache=metadataCache)